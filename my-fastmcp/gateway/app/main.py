@@ -1,11 +1,15 @@
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import uvicorn
 import sys
 from pathlib import Path
 
 # MCP Bridge 라우터 import
-from .mcp_bridge import router as mcp_router
+from .mcp_bridge import router as mcp_router, mcp_pool, mcp_catalog
+from .responses import CompressionMiddleware
 
 # 서브라우터 import를 위한 경로 추가
 # Docker 컨테이너 내부에서는 /app/services에 있고, 로컬에서는 상대 경로 사용
@@ -42,10 +46,23 @@ if agent_path.exists():
         spec_agent.loader.exec_module(agent_module)
         agent_router = agent_module.agent_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # MCP 세션 풀을 미리 연결하고 도구/프롬프트 카탈로그를 받아 둔 뒤, 종료 시 정리
+    await mcp_pool.start()
+    await mcp_catalog.start()
+    try:
+        yield
+    finally:
+        await mcp_catalog.close()
+        await mcp_pool.close()
+
+
 app = FastAPI(
     title="Gateway API",
     description="Gateway 서비스 API - MCP Bridge 포함",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS 설정
@@ -57,6 +74,9 @@ app.add_middleware(
     allow_headers=["*"],  # 모든 헤더 허용
 )
 
+# 응답 압축 (br/gzip, RESPONSE_COMPRESS_MIN_BYTES 이상만)
+app.add_middleware(CompressionMiddleware)
+
 # 메인 라우터 생성
 main_router = APIRouter()
 
@@ -64,6 +84,12 @@ main_router = APIRouter()
 async def read_root():
     return {"message": "Hello World - Gateway API with MCP Bridge"}
 
+
+@main_router.get("/metrics")
+def metrics() -> Response:
+    """Prometheus 스크레이프 엔드포인트"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # 라우터를 앱에 포함
 app.include_router(main_router)
 
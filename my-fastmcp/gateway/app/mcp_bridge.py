@@ -7,16 +7,50 @@ Frontend용 REST API 엔드포인트를 제공합니다.
 
 from __future__ import annotations
 
-from typing import List, Optional
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
+from prometheus_client import Histogram
+
+from .responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
 
 # MCP Server 엔드포인트 (Streamable HTTP)
-MCP_SERVER_URL = "http://localhost:8000/mcp"
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8000/mcp")
+
+# MCP 세션 풀 설정
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))                          # 상주 세션 수
+MCP_POOL_CHECKOUT_TIMEOUT = float(os.getenv("MCP_POOL_CHECKOUT_TIMEOUT", "5"))  # 세션 대기 최대 시간(초)
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "30"))                  # MCP 호출 1건 최대 시간(초)
+MCP_POOL_PING_AFTER = float(os.getenv("MCP_POOL_PING_AFTER", "30"))            # 이 시간 이상 놀던 세션은 ping으로 확인
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))           # 세션 연결 + initialize 최대 시간(초)
+
+# MCP 카탈로그(도구/프롬프트 목록) 캐시 설정
+MCP_CATALOG_REFRESH_SECONDS = float(os.getenv("MCP_CATALOG_REFRESH_SECONDS", "300"))  # 주기적 갱신 간격(초)
+MCP_PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("MCP_PROMPT_CACHE_MAX_ENTRIES", "256"))  # 렌더링된 프롬프트 캐시 크기
+# 렌더링된 프롬프트 유효 시간(초). 프롬프트 본문만 바뀌고 목록 메타데이터는 그대로인 경우를 위해 (0이면 만료 없음)
+MCP_PROMPT_CACHE_TTL_SECONDS = float(os.getenv("MCP_PROMPT_CACHE_TTL_SECONDS", "300"))
 
 router = APIRouter(prefix="/mcp", tags=["mcp"])
 
+# MCP 브리지 호출 시간 (도구/프롬프트 이름과 결과별)
+MCP_BRIDGE_CALL_SECONDS = Histogram(
+    "gateway_mcp_call_seconds",
+    "Gateway → MCP Server 호출 시간(초)",
+    ["kind", "name", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
 
 # =========================
 # Request/Response 스키마
@@ -49,11 +83,15 @@ class DraftRequest(BaseModel):
 class MappingCandidate(BaseModel):
     code: str
     reason: str
+    matched_keywords: List[str] = []
+    score: float = 0.0
 
 
 class MappingResult(BaseModel):
     candidates: List[MappingCandidate]
     coverage_comment: str
+    confidence: float = 0.0
+    degraded: bool = False
 
 
 class ValidationIssue(BaseModel):
@@ -69,26 +107,340 @@ class ValidationResult(BaseModel):
     issues: List[ValidationIssue]
 
 
+# =========================
+# MCP 세션 풀
+#  - 요청마다 Client를 만들고 MCP 초기화 핸드셰이크를 하는 대신,
+#    Gateway lifespan에서 초기화된 세션을 미리 만들어 두고 빌려 씀
+# =========================
+
+class _PooledSession:
+    def __init__(
+        self,
+        url: str,
+        message_handler: Optional[MessageHandler] = None,
+        connect_timeout: float = MCP_CONNECT_TIMEOUT,
+    ):
+        self.url = url
+        self.message_handler = message_handler
+        self.connect_timeout = connect_timeout
+        self.client: Optional[Client] = None
+        self.last_used = 0.0
+        self.broken = False
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+    async def connect(self) -> None:
+        await self.close()
+        client = Client(self.url, message_handler=self.message_handler)
+        # 서버가 연결만 받고 initialize에서 멈춰도 빌려 간 요청이 무한정 기다리지 않도록 제한
+        try:
+            await asyncio.wait_for(client.__aenter__(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as exc:
+                logger.warning(f"MCP session cleanup after connect timeout failed: {exc}")
+            raise
+        self.client = client
+        self.broken = False
+        self.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as exc:
+                logger.warning(f"MCP session close error: {exc}")
+
+
+class MCPClientPool:
+    """
+    초기화가 끝난 MCP 클라이언트 세션을 size개 유지하는 풀.
+
+    - session(): 세션을 빌려 쓰는 async context manager (checkout_timeout 안에 못 빌리면 503)
+    - 오래 놀던 세션은 ping으로 확인하고, 끊겼거나 호출 중 연결 오류가 난 세션은 다시 연결
+    - 연결(재연결 포함)은 connect_timeout 안에 끝나야 함 (넘으면 asyncio.TimeoutError → 504)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int,
+        checkout_timeout: float,
+        ping_after: float,
+        message_handler: Optional[MessageHandler] = None,
+        connect_timeout: float = MCP_CONNECT_TIMEOUT,
+    ):
+        self.url = url
+        self.size = max(1, size)
+        self.message_handler = message_handler
+        self.connect_timeout = connect_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self._idle: Optional[asyncio.Queue] = None
+        self._sessions: List[_PooledSession] = []
+        self._reconnects = 0
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        self._idle = asyncio.Queue()
+        self._sessions = [
+            _PooledSession(self.url, self.message_handler, self.connect_timeout)
+            for _ in range(self.size)
+        ]
+        results = await asyncio.gather(*(s.connect() for s in self._sessions), return_exceptions=True)
+        for session, result in zip(self._sessions, results):
+            if isinstance(result, Exception):
+                # MCP Server가 아직 안 떠 있어도 Gateway는 뜨고, 세션은 첫 사용 시 다시 연결
+                logger.warning(f"MCP session connect failed (will retry on checkout): {result}")
+                session.broken = True
+            self._idle.put_nowait(session)
+
+    async def close(self) -> None:
+        if not self.started:
+            return
+        await asyncio.gather(*(s.close() for s in self._sessions), return_exceptions=True)
+        self._sessions = []
+        self._idle = None
+
+    async def _ensure_healthy(self, session: _PooledSession) -> None:
+        if session.broken or not session.connected:
+            self._reconnects += 1
+            await session.connect()
+            return
+        if time.monotonic() - session.last_used >= self.ping_after:
+            try:
+                await asyncio.wait_for(session.client.ping(), timeout=self.checkout_timeout)
+            except Exception:
+                self._reconnects += 1
+                await session.connect()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Client]:
+        if not self.started:
+            await self.start()
+        idle = self._idle
+        try:
+            session = await asyncio.wait_for(idle.get(), timeout=self.checkout_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="MCP session pool exhausted")
+
+        try:
+            await self._ensure_healthy(session)
+            yield session.client
+        except HTTPException:
+            raise
+        except BaseException:
+            # 연결 상태를 알 수 없으므로 다음 checkout 때 다시 연결
+            session.broken = True
+            raise
+        finally:
+            session.last_used = time.monotonic()
+            idle.put_nowait(session)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "connected": sum(1 for s in self._sessions if s.connected and not s.broken),
+            "reconnects": self._reconnects,
+        }
+
+
+# =========================
+# MCP 카탈로그 캐시
+#  - 도구/프롬프트 목록을 시작 시 한 번 받아 두고, 주기적으로 또는
+#    서버의 list_changed 알림을 받으면 다시 받아옴
+#  - 프롬프트 요청은 목록 조회 없이 바로 get_prompt를 호출하고,
+#    같은 인자로 렌더링한 결과는 로컬 LRU에 MCP_PROMPT_CACHE_TTL_SECONDS 동안 보관
+# =========================
+
+def _prompt_messages_text(result: Any) -> str:
+    """get_prompt 결과의 메시지들에서 텍스트만 이어 붙입니다."""
+    prompt_text = ""
+    for msg in result.messages:
+        if hasattr(msg, 'content'):
+            if isinstance(msg.content, str):
+                prompt_text += msg.content
+            elif hasattr(msg.content, 'text'):
+                prompt_text += msg.content.text
+    return prompt_text
+
+
+class MCPCatalog:
+    """
+    MCP Server의 도구/프롬프트 목록과 렌더링된 프롬프트를 보관하는 캐시.
+
+    - start(): 첫 로드 + 백그라운드 갱신 루프 시작 (서버가 안 떠 있어도 실패하지 않음)
+    - mark_stale(): list_changed 알림 등으로 목록이 바뀌었음을 알림 → 즉시 갱신
+    - render_prompt(): (이름, 인자) 단위로 캐시된 프롬프트 텍스트를 반환
+    """
+
+    def __init__(self, refresh_seconds: float, prompt_cache_max_entries: int, prompt_cache_ttl_seconds: float = 0):
+        self.refresh_seconds = refresh_seconds
+        self.prompt_cache_max_entries = max(0, prompt_cache_max_entries)
+        self.prompt_cache_ttl_seconds = prompt_cache_ttl_seconds
+        self.tools: Dict[str, Any] = {}
+        self.prompts: Dict[str, Any] = {}
+        self.loaded = False
+        self.refreshed_at: Optional[float] = None
+        # (이름, 인자 JSON) → (렌더링 텍스트, 렌더링 시각(monotonic))
+        self._rendered: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._stale: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stale = asyncio.Event()
+        try:
+            await self.refresh()
+        except Exception as exc:
+            logger.warning(f"MCP catalog load failed (will retry in background): {exc}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def mark_stale(self) -> None:
+        if self._stale is not None:
+            self._stale.set()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._stale.wait(), timeout=self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._stale.clear()
+            try:
+                await self.refresh()
+            except Exception as exc:
+                logger.warning(f"MCP catalog refresh failed: {exc}")
+
+    async def refresh(self) -> None:
+        async with mcp_pool.session() as client:
+            tools = await asyncio.wait_for(client.list_tools(), timeout=MCP_CALL_TIMEOUT)
+            prompts = await asyncio.wait_for(client.list_prompts(), timeout=MCP_CALL_TIMEOUT)
+
+        new_prompts = {prompt.name: prompt for prompt in prompts}
+        if new_prompts != self.prompts:
+            # 프롬프트 정의가 바뀌었으면 예전 렌더링 결과는 버림
+            self._rendered.clear()
+        self.tools = {tool.name: tool for tool in tools}
+        self.prompts = new_prompts
+        self.loaded = True
+        self.refreshed_at = time.time()
+        self._refreshes += 1
+
+    async def render_prompt(self, name: str, arguments: Dict[str, Any]) -> str:
+        # 목록을 받아 둔 상태에서 없는 이름이면 서버에 묻지 않고 바로 404
+        if self.loaded and name not in self.prompts:
+            raise HTTPException(status_code=404, detail=f"Prompt '{name}' not found")
+
+        key = (name, json.dumps(arguments, ensure_ascii=False, sort_keys=True))
+        cached = self._rendered.get(key)
+        if cached is not None:
+            prompt_text, rendered_at = cached
+            if not self.prompt_cache_ttl_seconds or time.monotonic() - rendered_at < self.prompt_cache_ttl_seconds:
+                self._rendered.move_to_end(key)
+                self._hits += 1
+                return prompt_text
+            del self._rendered[key]   # 만료: 서버에서 다시 렌더링
+
+        self._misses += 1
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with mcp_pool.session() as client:
+                result = await asyncio.wait_for(
+                    client.get_prompt(name, arguments=arguments),
+                    timeout=MCP_CALL_TIMEOUT,
+                )
+            outcome = "ok"
+        finally:
+            MCP_BRIDGE_CALL_SECONDS.labels("prompt", name, outcome).observe(time.perf_counter() - started)
+        prompt_text = _prompt_messages_text(result)
+
+        if self.prompt_cache_max_entries:
+            self._rendered[key] = (prompt_text, time.monotonic())
+            while len(self._rendered) > self.prompt_cache_max_entries:
+                self._rendered.popitem(last=False)
+        return prompt_text
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "refreshed_at": self.refreshed_at,
+            "refreshes": self._refreshes,
+            "tools": len(self.tools),
+            "prompts": len(self.prompts),
+            "rendered_entries": len(self._rendered),
+            "rendered_hits": self._hits,
+            "rendered_misses": self._misses,
+        }
+
+
+class _CatalogChangeHandler(MessageHandler):
+    """서버의 tools/prompts list_changed 알림을 받으면 카탈로그를 갱신 대상으로 표시합니다."""
+
+    async def on_tool_list_changed(self, notification) -> None:
+        mcp_catalog.mark_stale()
+
+    async def on_prompt_list_changed(self, notification) -> None:
+        mcp_catalog.mark_stale()
+
+
+mcp_catalog = MCPCatalog(MCP_CATALOG_REFRESH_SECONDS, MCP_PROMPT_CACHE_MAX_ENTRIES, MCP_PROMPT_CACHE_TTL_SECONDS)
+mcp_pool = MCPClientPool(
+    MCP_SERVER_URL,
+    MCP_POOL_SIZE,
+    MCP_POOL_CHECKOUT_TIMEOUT,
+    MCP_POOL_PING_AFTER,
+    message_handler=_CatalogChangeHandler(),
+)
+
+
 # =========================
 # MCP Client 헬퍼 함수
 # =========================
 
 async def call_mcp_tool(tool_name: str, arguments: dict) -> dict:
     """
-    MCP Server의 도구를 호출합니다.
+    MCP Server의 도구를 호출합니다. (풀에서 세션을 빌려 사용)
     
     Args:
         tool_name: 호출할 도구 이름
         arguments: 도구에 전달할 인자
         
     Returns:
-        도구 실행 결과
+        도구 실행 결과 (구조화 출력이 있으면 그 dict, 없으면 result.data)
     """
-    client = Client(MCP_SERVER_URL)
-    
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        async with client:
-            result = await client.call_tool(tool_name, arguments)
+        async with mcp_pool.session() as client:
+            result = await asyncio.wait_for(
+                client.call_tool(tool_name, arguments),
+                timeout=MCP_CALL_TIMEOUT,
+            )
             
             if result.is_error:
                 raise HTTPException(
@@ -96,12 +448,42 @@ async def call_mcp_tool(tool_name: str, arguments: dict) -> dict:
                     detail=f"MCP tool error: {result.content}"
                 )
             
+            outcome = "ok"
+            # 구조화 출력은 JSON dict 그대로 넘김 (result.data는 dict가 아닌 객체로 복원될 수 있음)
+            # 엔드포인트에서 응답 모델로 검증함
+            if result.structured_content is not None:
+                return result.structured_content
             return result.data
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError as exc:
+        outcome = "timeout"
+        raise HTTPException(
+            status_code=504,
+            detail=f"MCP tool call timed out: {tool_name}"
+        ) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to call MCP Server: {str(exc)}"
         ) from exc
+    finally:
+        MCP_BRIDGE_CALL_SECONDS.labels("tool", tool_name, outcome).observe(time.perf_counter() - started)
+
+
+def _parse_tool_result(model: type[BaseModel], tool_name: str, result: Any) -> BaseModel:
+    """
+    MCP 도구 결과를 Gateway 응답 모델로 검증합니다.
+    MCP Server와 Gateway 스키마가 어긋나면 잘못된 응답을 그대로 내보내지 않고 502로 돌려줍니다.
+    """
+    try:
+        return model.model_validate(result)
+    except ValidationError as exc:
+        logger.warning("MCP tool %s returned an unexpected result: %s", tool_name, exc)
+        raise HTTPException(
+            status_code=502,
+            detail=f"MCP tool {tool_name} returned an invalid result"
+        ) from exc
 
 
 # =========================
@@ -109,9 +491,10 @@ async def call_mcp_tool(tool_name: str, arguments: dict) -> dict:
 # =========================
 
 @router.post("/map", response_model=MappingResult)
-async def map_to_ifrs_endpoint(payload: MapRequest) -> MappingResult:
+async def map_to_ifrs_endpoint(payload: MapRequest) -> FastJSONResponse:
     """
     TCFD/ESG 텍스트를 IFRS S2 요구사항에 매핑합니다.
+    MCP Server 결과를 MappingResult로 한 번 검증한 뒤 그 모델을 바로 인코딩합니다.
     """
     result = await call_mcp_tool("map_to_ifrs_s2", {
         "raw_text": payload.raw_text,
@@ -119,13 +502,14 @@ async def map_to_ifrs_endpoint(payload: MapRequest) -> MappingResult:
         "jurisdiction": payload.jurisdiction,
     })
     
-    return MappingResult(**result)
+    return FastJSONResponse(_parse_tool_result(MappingResult, "map_to_ifrs_s2", result))
 
 
 @router.post("/validate", response_model=ValidationResult)
-async def validate_endpoint(payload: ValidateRequest) -> ValidationResult:
+async def validate_endpoint(payload: ValidateRequest) -> FastJSONResponse:
     """
     작성된 공시 문단이 IFRS S2 요구사항을 충족하는지 검증합니다.
+    MCP Server 결과를 ValidationResult로 한 번 검증한 뒤 그 모델을 바로 인코딩합니다.
     """
     result = await call_mcp_tool("validate_disclosure", {
         "codes": payload.codes,
@@ -133,7 +517,7 @@ async def validate_endpoint(payload: ValidateRequest) -> ValidationResult:
         "industry": payload.industry,
     })
     
-    return ValidationResult(**result)
+    return FastJSONResponse(_parse_tool_result(ValidationResult, "validate_disclosure", result))
 
 
 @router.post("/prompts/map-expert")
@@ -141,38 +525,17 @@ async def expert_prompt_endpoint(payload: ExpertPromptRequest) -> dict:
     """
     IFRS S2 전문가 역할의 LLM 프롬프트를 생성합니다.
     """
-    # 프롬프트는 MCP prompt 기능을 사용
-    client = Client(MCP_SERVER_URL)
-    
+    # 프롬프트는 MCP prompt 기능을 사용 (카탈로그 캐시 경유)
     try:
-        async with client:
-            prompts = await client.list_prompts()
-            
-            # map_to_ifrs_s2_expert 프롬프트 찾기
-            for prompt in prompts:
-                if prompt.name == "map_to_ifrs_s2_expert":
-                    result = await client.get_prompt(
-                        prompt.name,
-                        arguments={
-                            "raw_text": payload.raw_text,
-                            "industry": payload.industry,
-                            "jurisdiction": payload.jurisdiction,
-                        }
-                    )
-                    # 프롬프트 메시지 텍스트 추출
-                    prompt_text = ""
-                    for msg in result.messages:
-                        if hasattr(msg, 'content'):
-                            if isinstance(msg.content, str):
-                                prompt_text += msg.content
-                            elif hasattr(msg.content, 'text'):
-                                prompt_text += msg.content.text
-                    return {"prompt": prompt_text}
-            
-            raise HTTPException(
-                status_code=404,
-                detail="Prompt 'map_to_ifrs_s2_expert' not found"
-            )
+        prompt_text = await mcp_catalog.render_prompt(
+            "map_to_ifrs_s2_expert",
+            {
+                "raw_text": payload.raw_text,
+                "industry": payload.industry,
+                "jurisdiction": payload.jurisdiction,
+            },
+        )
+        return {"prompt": prompt_text}
     except HTTPException:
         raise
     except Exception as exc:
@@ -187,37 +550,16 @@ async def draft_prompt_endpoint(payload: DraftRequest) -> dict:
     """
     IFRS S2 공시 문단 초안 생성 프롬프트를 생성합니다.
     """
-    client = Client(MCP_SERVER_URL)
-    
     try:
-        async with client:
-            prompts = await client.list_prompts()
-            
-            # draft_ifrs_s2_disclosure 프롬프트 찾기
-            for prompt in prompts:
-                if prompt.name == "draft_ifrs_s2_disclosure":
-                    result = await client.get_prompt(
-                        prompt.name,
-                        arguments={
-                            "codes": payload.codes,
-                            "company_profile": payload.company_profile,
-                            "source_text": payload.source_text,
-                        }
-                    )
-                    # 프롬프트 메시지 텍스트 추출
-                    prompt_text = ""
-                    for msg in result.messages:
-                        if hasattr(msg, 'content'):
-                            if isinstance(msg.content, str):
-                                prompt_text += msg.content
-                            elif hasattr(msg.content, 'text'):
-                                prompt_text += msg.content.text
-                    return {"prompt": prompt_text}
-            
-            raise HTTPException(
-                status_code=404,
-                detail="Prompt 'draft_ifrs_s2_disclosure' not found"
-            )
+        prompt_text = await mcp_catalog.render_prompt(
+            "draft_ifrs_s2_disclosure",
+            {
+                "codes": payload.codes,
+                "company_profile": payload.company_profile,
+                "source_text": payload.source_text,
+            },
+        )
+        return {"prompt": prompt_text}
     except HTTPException:
         raise
     except Exception as exc:
@@ -227,25 +569,42 @@ async def draft_prompt_endpoint(payload: DraftRequest) -> dict:
         ) from exc
 
 
+@router.get("/catalog")
+async def catalog_endpoint() -> dict:
+    """
+    캐시된 MCP 도구/프롬프트 목록을 반환합니다. (MCP Server 왕복 없음)
+    """
+    return {
+        "tools": sorted(mcp_catalog.tools),
+        "prompts": {
+            name: [arg.name for arg in (prompt.arguments or [])]
+            for name, prompt in sorted(mcp_catalog.prompts.items())
+        },
+        "stats": mcp_catalog.stats(),
+    }
+
+
 @router.get("/health")
 async def health_check() -> dict:
     """
     MCP Server 연결 상태를 확인합니다.
     """
-    client = Client(MCP_SERVER_URL)
-    
     try:
-        async with client:
-            tools = await client.list_tools()
+        async with mcp_pool.session() as client:
+            tools = await asyncio.wait_for(client.list_tools(), timeout=MCP_CALL_TIMEOUT)
             return {
                 "status": "healthy",
                 "mcp_server": MCP_SERVER_URL,
                 "available_tools": [tool.name for tool in tools],
+                "pool": mcp_pool.stats(),
+                "catalog": mcp_catalog.stats(),
             }
     except Exception as exc:
         return {
             "status": "unhealthy",
             "mcp_server": MCP_SERVER_URL,
             "error": str(exc),
+            "pool": mcp_pool.stats(),
+            "catalog": mcp_catalog.stats(),
         }
 
@@ -0,0 +1,146 @@
+"""
+빠른 JSON 응답 + 응답 압축
+
+- FastJSONResponse: 이미 검증된 결과를 response_model 재검증 없이 바로 바이트로 인코딩
+  (모델은 pydantic-core, dict/list는 orjson)
+- CompressionMiddleware: Accept-Encoding을 보고 br > gzip 순으로 협상
+  (gzip은 Starlette GZipMiddleware에 맡기고, br만 여기서 직접 압축)
+
+MCP Server(my_mcp_server/responses.py)와 Gateway(gateway/app/responses.py)는 따로 배포되므로
+같은 파일을 각자 둡니다. 두 파일이 한 글자라도 다르면
+my_mcp_server/tests/test_responses.py::test_gateway_copy_is_identical이 실패합니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Optional
+
+import orjson
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import brotli   # 선택 의존성: 없으면 gzip만 협상
+except ImportError:
+    brotli = None
+
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+# 이보다 큰 본문은 이벤트 루프를 막지 않도록 스레드에서 br 압축
+_BROTLI_IN_THREAD_BYTES = 256 * 1024
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse와 같은 출력(공백 없음, 비ASCII 그대로)을 더 빠르게 만드는 응답 클래스.
+    엔드포인트가 이 응답을 직접 돌려주면 FastAPI의 response_model 재검증도 생략됩니다.
+    (response_model은 OpenAPI 문서용으로만 남음)
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return pydantic_core.to_json(content)
+        return orjson.dumps(
+            content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding에서 쓸 압축 방식을 고릅니다. (br 우선, q=0은 거부로 간주)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    협상 결과가 gzip이면 GZipMiddleware로 넘기고, br이면 한 번에 끝나는 응답 본문만 직접 압축합니다.
+    GZipMiddleware는 q=0을 보지 않으므로 협상은 여기서 먼저 합니다.
+    passthrough_suffixes로 끝나는 경로(NDJSON/SSE 스트림)는 레코드가 바로 나가도록 압축하지 않습니다.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = RESPONSE_COMPRESS_MIN_BYTES,
+        passthrough_suffixes: tuple[str, ...] = (),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.passthrough_suffixes = passthrough_suffixes
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=RESPONSE_GZIP_LEVEL)
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if scope["type"] == "http" and not scope["path"].endswith(self.passthrough_suffixes):
+            encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "gzip":
+            await self.gzip(scope, receive, send)
+        elif encoding == "br":
+            await self.app(scope, receive, self._brotli_send(send))
+        else:
+            await self.app(scope, receive, send)
+
+    def _brotli_send(self, send):
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message   # 첫 본문을 보고 압축 여부를 정할 때까지 보류
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message["type"] != "http.response.body"
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= _BROTLI_IN_THREAD_BYTES:
+                body = await asyncio.to_thread(brotli.compress, body, quality=RESPONSE_BROTLI_QUALITY)
+            else:
+                body = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+            headers["content-encoding"] = "br"
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        return send_compressed
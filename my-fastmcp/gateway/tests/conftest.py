@@ -0,0 +1,65 @@
+"""
+Gateway 테스트 공통 설정.
+gateway 패키지를 `gateway.app...`로 import 하도록 my-fastmcp 디렉터리를 경로에 넣고,
+MCP 서버 대신 연결/ping 동작을 조절할 수 있는 스텁 Client를 제공합니다.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from gateway.app import mcp_bridge  # noqa: E402
+
+
+class StubClient:
+    """fastmcp.Client 대역. 연결/ping 실패와 지연을 controller로 조절합니다."""
+
+    def __init__(self, controller, url, message_handler=None):
+        self.controller = controller
+        self.url = url
+        self.message_handler = message_handler
+        self._connected = False
+        controller.created.append(self)
+
+    async def __aenter__(self):
+        if self.controller.connect_delay:
+            await asyncio.sleep(self.controller.connect_delay)
+        if self.controller.connect_error is not None:
+            raise self.controller.connect_error
+        self._connected = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def ping(self):
+        self.controller.pings += 1
+        if self.controller.ping_error is not None:
+            raise self.controller.ping_error
+        return True
+
+
+class StubController:
+    def __init__(self):
+        self.created = []
+        self.pings = 0
+        self.connect_delay = 0.0
+        self.connect_error = None
+        self.ping_error = None
+
+    def client(self, url, message_handler=None):
+        return StubClient(self, url, message_handler)
+
+
+@pytest.fixture
+def stub_mcp(monkeypatch):
+    controller = StubController()
+    monkeypatch.setattr(mcp_bridge, "Client", controller.client)
+    return controller
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from gateway.app import mcp_bridge
+
+
+class FakeCatalogClient:
+    """list_tools/list_prompts/get_prompt만 흉내 내는 MCP Client 대역."""
+
+    def __init__(self):
+        self.tools = [SimpleNamespace(name="map_to_ifrs_s2")]
+        self.prompts = [SimpleNamespace(name="map_to_ifrs_s2_expert", description="v1")]
+        self.list_calls = 0
+        self.renders = []
+
+    async def list_tools(self):
+        return list(self.tools)
+
+    async def list_prompts(self):
+        self.list_calls += 1
+        return list(self.prompts)
+
+    async def get_prompt(self, name, arguments=None):
+        self.renders.append((name, arguments))
+        text = f"{name}:{arguments['raw_text']}#{len(self.renders)}"
+        return SimpleNamespace(messages=[SimpleNamespace(content=SimpleNamespace(text=text))])
+
+
+@pytest.fixture
+def mcp_server(monkeypatch):
+    client = FakeCatalogClient()
+
+    @asynccontextmanager
+    async def session():
+        yield client
+
+    monkeypatch.setattr(mcp_bridge, "mcp_pool", SimpleNamespace(session=session))
+    return client
+
+
+def make_catalog(monkeypatch=None, **overrides):
+    options = dict(refresh_seconds=60, prompt_cache_max_entries=8, prompt_cache_ttl_seconds=0)
+    options.update(overrides)
+    catalog = mcp_bridge.MCPCatalog(**options)
+    if monkeypatch is not None:
+        monkeypatch.setattr(mcp_bridge, "mcp_catalog", catalog)
+    return catalog
+
+
+def render(catalog, raw_text, name="map_to_ifrs_s2_expert"):
+    return catalog.render_prompt(name, {"raw_text": raw_text})
+
+
+def test_unknown_prompt_is_rejected_from_the_cached_catalog(mcp_server):
+    catalog = make_catalog()
+
+    async def main():
+        await catalog.refresh()
+        with pytest.raises(HTTPException) as exc_info:
+            await render(catalog, "x", name="no_such_prompt")
+        return exc_info.value
+
+    exc = asyncio.run(main())
+    assert exc.status_code == 404
+    assert mcp_server.renders == []   # 서버에 묻지 않음
+
+
+def test_rendered_prompts_are_evicted_least_recently_used_first(mcp_server):
+    catalog = make_catalog(prompt_cache_max_entries=2)
+
+    async def main():
+        await catalog.refresh()
+        await render(catalog, "a")
+        await render(catalog, "b")
+        await render(catalog, "a")   # a가 가장 최근 사용
+        await render(catalog, "c")   # b가 밀려남
+        await render(catalog, "a")
+        await render(catalog, "b")
+
+    asyncio.run(main())
+    assert [arguments["raw_text"] for _name, arguments in mcp_server.renders] == ["a", "b", "c", "b"]
+    assert catalog.stats()["rendered_entries"] == 2
+
+
+def test_rendered_prompt_expires_after_ttl(mcp_server):
+    catalog = make_catalog(prompt_cache_ttl_seconds=0.05)
+
+    async def main():
+        await catalog.refresh()
+        first = await render(catalog, "a")
+        cached = await render(catalog, "a")
+        await asyncio.sleep(0.06)
+        expired = await render(catalog, "a")
+        return first, cached, expired
+
+    first, cached, expired = asyncio.run(main())
+    assert first == cached != expired
+    assert len(mcp_server.renders) == 2
+
+
+def test_rendered_prompts_are_dropped_when_prompt_definitions_change(mcp_server):
+    catalog = make_catalog()
+
+    async def main():
+        await catalog.refresh()
+        await render(catalog, "a")
+        await catalog.refresh()            # 정의가 그대로면 캐시 유지
+        kept = catalog.stats()["rendered_entries"]
+        mcp_server.prompts = [SimpleNamespace(name="map_to_ifrs_s2_expert", description="v2")]
+        await catalog.refresh()
+        return kept, catalog.stats()["rendered_entries"]
+
+    kept, dropped = asyncio.run(main())
+    assert (kept, dropped) == (1, 0)
+
+
+def test_list_changed_notification_triggers_a_refresh(mcp_server, monkeypatch):
+    catalog = make_catalog(monkeypatch)
+    handler = mcp_bridge._CatalogChangeHandler()
+
+    async def main():
+        await catalog.start()
+        mcp_server.prompts = mcp_server.prompts + [SimpleNamespace(name="draft_ifrs_s2_disclosure")]
+        await handler.on_prompt_list_changed(None)
+        deadline = time.monotonic() + 1.0
+        while catalog.stats()["refreshes"] < 2 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await catalog.close()
+
+    asyncio.run(main())
+    assert catalog.stats()["refreshes"] == 2   # refresh_seconds(60초)를 기다리지 않음
+    assert "draft_ifrs_s2_disclosure" in catalog.prompts
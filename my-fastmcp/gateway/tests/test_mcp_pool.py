@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from gateway.app import mcp_bridge
+
+
+def make_pool(**overrides):
+    options = dict(url="http://mcp.test/mcp", size=1, checkout_timeout=0.05, ping_after=60, connect_timeout=0.05)
+    options.update(overrides)
+    return mcp_bridge.MCPClientPool(**options)
+
+
+def test_checkout_times_out_with_503_when_all_sessions_are_busy(stub_mcp):
+    pool = make_pool()
+
+    async def main():
+        await pool.start()
+        async with pool.session():
+            with pytest.raises(HTTPException) as exc_info:
+                async with pool.session():
+                    pass
+        await pool.close()
+        return exc_info.value
+
+    exc = asyncio.run(main())
+    assert exc.status_code == 503
+
+
+def test_idle_session_is_pinged_and_reconnected_when_ping_fails(stub_mcp):
+    pool = make_pool(ping_after=0)
+
+    async def main():
+        await pool.start()
+        async with pool.session() as client:
+            first = client
+        stub_mcp.ping_error = RuntimeError("gone")
+        async with pool.session() as client:
+            second = client
+        await pool.close()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert stub_mcp.pings == 2
+    assert first is not second
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_fresh_session_is_not_pinged(stub_mcp):
+    pool = make_pool(ping_after=60)
+
+    async def main():
+        await pool.start()
+        async with pool.session():
+            pass
+        await pool.close()
+
+    asyncio.run(main())
+    assert stub_mcp.pings == 0 and len(stub_mcp.created) == 1
+
+
+def test_session_that_failed_mid_call_is_reconnected_on_next_checkout(stub_mcp):
+    pool = make_pool()
+
+    async def main():
+        await pool.start()
+        with pytest.raises(RuntimeError):
+            async with pool.session():
+                raise RuntimeError("connection reset")
+        async with pool.session() as client:
+            return client
+
+    client = asyncio.run(main())
+    assert len(stub_mcp.created) == 2 and client is stub_mcp.created[-1]
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_gateway_starts_with_server_down_and_connects_on_first_checkout(stub_mcp):
+    pool = make_pool(size=2)
+    stub_mcp.connect_error = OSError("connection refused")
+
+    async def main():
+        await pool.start()
+        down = pool.stats()
+        stub_mcp.connect_error = None
+        async with pool.session() as client:
+            connected = client.is_connected()
+        return down, connected
+
+    down, connected = asyncio.run(main())
+    assert down["connected"] == 0 and down["idle"] == 2
+    assert connected and pool.stats()["connected"] == 1
+
+
+def test_reconnect_that_hangs_in_initialize_is_bounded(stub_mcp, monkeypatch):
+    pool = make_pool(connect_timeout=0.05)
+    monkeypatch.setattr(mcp_bridge, "mcp_pool", pool)
+
+    async def main():
+        await pool.start()
+        stub_mcp.connect_delay = 10   # 연결은 받았지만 initialize 응답이 오지 않음
+        pool._sessions[0].broken = True
+        started = time.monotonic()
+        with pytest.raises(HTTPException) as exc_info:
+            await mcp_bridge.call_mcp_tool("map_to_ifrs_s2", {})
+        return exc_info.value, time.monotonic() - started
+
+    exc, elapsed = asyncio.run(main())
+    assert exc.status_code == 504
+    assert elapsed < 1.0
+    assert pool.stats()["idle"] == 1   # 세션은 풀로 돌아옴 (다음 checkout 때 다시 연결)
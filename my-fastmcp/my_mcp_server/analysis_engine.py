@@ -0,0 +1,709 @@
+"""
+문서 분석 엔진 (순수 CPU 계산부)
+
+- RULES 키워드 매칭, 검증 신호, 필수 요소 감지, 문장 분리, 문장 배치 분석 행 계산
+- 병렬 분석 워커 프로세스는 이 모듈만 import 합니다.
+  (OpenAI 클라이언트 / LLM 캐시 / Prometheus / FastAPI 등 server.py의 무거운 초기화를 피함)
+- Pydantic 응답 객체 조립과 메트릭 계측은 server.py가 담당합니다.
+  (워커에서 잰 단계별 시간은 결과에 실어 보내고, 부모 프로세스가 기록)
+"""
+
+import re
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# =========================
+# 간단한 키워드 → IFRS S2 코드 룰
+# (데모/프로토타입용)
+# =========================
+
+RULES = [
+    # (키워드 리스트, 코드, 이유)
+    (["governance", "거버넌스", "이사회",
+    "ESG위원회", "ESG 위원회", "ESG 협의체",
+    "기후 관련 위험 및 기회에 대한 이사회의 감독",
+    "기후 관련 위험 및 기회에 대한 경영진의 책임"],
+    "5–7",
+    "기후 관련 리스크와 기회를 감독·관리하는 이사회/위원회/경영진의 역할을 설명하는 내용으로 보입니다."),
+
+
+    (["기후 리스크 관리", "기후 관련 리스크 관리", "기후 관련 위험 관리",
+    "climate risk management",
+    "기후 리스크 식별", "기후 관련 위험 식별",
+    "기후 관련 리스크 평가", "기후 관련 위험 평가"],
+    "24–25",
+    "기후 관련 리스크를 식별·평가·우선순위화·모니터링하는 프로세스를 설명하는 내용으로 보입니다."),
+
+    (["기후 관련 비즈니스 기회", "기후 관련 기회", "climate-related opportunity",
+    "기후 관련 비즈니스", "저탄소 솔루션", "저탄소 서비스", "저탄소 물류"],
+    "10(a)",
+    "기후 관련 비즈니스 기회(저탄소 솔루션·서비스 등)를 설명하는 내용으로 보입니다."),
+
+    (["climate risk", "climate-related risk", "climate-related risks",
+    "기후 리스크", "기후 관련 리스크", "기후변화 리스크",
+    "기후 관련 위험", "전환 리스크", "물리적 리스크",
+    "탄소세", "탄소배출권", "배출권"],
+    "10(b)",
+    "기후 관련 리스크(전환/물리적, 탄소세·배출권 등)가 기업 전망과 재무에 미치는 영향을 다루는 내용으로 보입니다."),
+
+
+    (["value chain", "가치사슬", "supply chain", "밸류체인",
+    "공급망", "협력사", "협력회사", "업스트림 운송", "다운스트림"],
+    "13",
+    "기후 관련 리스크와 기회가 비즈니스 모델과 가치사슬(공급망, 협력사 등)에 미치는 영향을 설명하는 내용으로 보입니다."),
+
+    (["기후변화 대응 전략", "기후변화 대응", "기후 관련 대응 방안",
+    "탄소중립", "탄소 중립", "Net Zero Roadmap", "넷제로 로드맵",
+    "온실가스 감축 활동", "재생에너지 확대", "전환 계획", "transition plan"],
+    "14",
+    "기후 관련 리스크와 기회에 대응하기 위한 전략·전환 계획(transition plan)과 주요 실행 과제를 설명하는 내용으로 보입니다."),
+
+
+
+    (["재무영향", "재무 영향", "재무적 영향",
+    "매출", "영업이익", "비용", "손익",
+    "현금흐름", "cash flow", "cash flows",
+    "재무상태표", "손익계산서"],
+    "15–16",
+    "기후 관련 리스크와 기회가 재무상태·재무성과·현금흐름에 미치는 현재 및 예상 재무적 영향을 설명하는 내용으로 보입니다."),
+
+
+    (["기후 시나리오", "시나리오 분석", "scenario analysis",
+    "1.5℃ 시나리오", "2℃ 시나리오", "RCP", "탄소가격 시나리오"],
+    "22–23,25",
+    "기후 관련 시나리오 분석과 그 결과를 활용한 기후 탄력성 평가 및 리스크 식별을 설명하는 내용으로 보입니다."),
+
+
+    (["감축 목표", "온실가스 감축", "배출량 감축 목표",
+    "net zero", "Net Zero", "넷제로",
+    "재생에너지 100", "재생에너지 100%"],
+    "33–36",
+    "온실가스 배출 및 에너지 전환과 관련된 정량적 목표와 그 이행 현황을 설명하는 내용으로 보입니다."),
+
+
+    (["Scope 1", "Scope 2", "Scope 3", "scope 1", "scope 2", "scope 3",
+    "스코프1", "스코프2", "스코프3",
+    "tCO2eq", "온실가스 배출량"],
+    "29(a)–29(c)",
+    "Scope 1/2/3 온실가스 배출량 등 핵심 배출 지표를 공시하는 내용으로 보입니다."),
+]
+
+# =========================
+# RULES 키워드 매처
+#  - RULES 키워드는 서버 시작 시 한 번만 소문자 / 공백 제거 형태로 정리
+#  - 대표 키워드는 소문자 원문에 대한 `in` 검사(C 구현 부분 문자열 검색)로 찾고,
+#    원문에서 못 찾은 룰만 공백을 모두 지운 그림자 문자열에서 다시 찾음
+#  - 공백/대소문자 무시: "ESG위원회" == "ESG 위원회" == "esg\n위원회"
+#  - find_rule_hits는 모든 히트를 원문 오프셋과 함께 돌려줌 (키워드마다 str.find, 한 번에 훑는 오토마톤 아님)
+# =========================
+
+_WHITESPACE_RUN = re.compile(r"\s+")
+
+
+def _normalize_keyword(keyword: str) -> str:
+    """키워드에서 공백을 모두 제거하고 소문자로 바꿉니다."""
+    return "".join(keyword.split()).lower()
+
+
+def _lower_keep_offsets(text: str) -> str:
+    """
+    text.lower()와 같되 길이가 바뀌지 않게 합니다. (오프셋을 원문에 그대로 쓰기 위함)
+    "İ"처럼 소문자가 두 글자가 되는 문자는 원래 글자로 둡니다.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(low if len(low) == 1 else ch for ch, low in ((ch, ch.lower()) for ch in text))
+
+
+def _iter_find(text: str, sub: str) -> Iterator[int]:
+    """text에서 sub가 나오는 모든 위치 (겹치는 히트 포함)."""
+    pos = text.find(sub)
+    while pos >= 0:
+        yield pos
+        pos = text.find(sub, pos + 1)
+
+
+def _shadow_to_original(lowered: str):
+    """
+    공백을 모두 지운 그림자 문자열의 위치를 원문 위치로 바꾸는 함수를 만듭니다.
+    공백 덩어리마다 (그림자에서 그 뒤 글자의 위치, 지금까지 지운 글자 수)를 기록해 두고 bisect로 찾습니다.
+    """
+    shadow_starts: List[int] = []
+    removed: List[int] = [0]
+    for match in _WHITESPACE_RUN.finditer(lowered):
+        shadow_starts.append(match.start() - removed[-1])
+        removed.append(removed[-1] + match.end() - match.start())
+    return lambda pos: pos + removed[bisect_right(shadow_starts, pos)]
+
+
+class RuleKeywordMatcher:
+    """
+    RULES의 룰별 키워드를 미리 정리해 두고, 룰마다 대표 매칭 키워드 하나를 찾습니다.
+    - 원문에 글자 그대로(대소문자만 무시) 등장한 키워드가 있으면 그중 리스트에서 가장 앞선 것
+    - 없으면 공백을 무시해야만 매칭되는 키워드 중 가장 앞선 것
+    """
+
+    def __init__(self, rules):
+        self._keywords: List[Tuple[str, ...]] = [tuple(keywords) for keywords, _code, _reason in rules]
+        self._lowered: List[Tuple[str, ...]] = [tuple(kw.lower() for kw in kws) for kws in self._keywords]
+        self._normalized: List[Tuple[str, ...]] = [
+            tuple(_normalize_keyword(kw) for kw in kws) for kws in self._keywords
+        ]
+        # 룰별 (대표 키워드 인덱스, 정규화 키워드, 같은 정규화 키워드로 묶이는 소문자 표기들)
+        # "net zero" / "Net Zero" / "넷제로"처럼 정규화하면 같은 키워드는 리스트에서 앞선 표기로 보고함
+        self._variants: List[Tuple[Tuple[int, str, Tuple[str, ...]], ...]] = []
+        for lowered_kws, normalized_kws in zip(self._lowered, self._normalized):
+            first_index: Dict[str, int] = {}
+            spellings: Dict[str, Dict[str, None]] = {}
+            for kw_index, (low, norm) in enumerate(zip(lowered_kws, normalized_kws)):
+                first_index.setdefault(norm, kw_index)
+                spellings.setdefault(norm, {})[low] = None
+            self._variants.append(tuple(
+                (kw_index, norm, tuple(spellings[norm])) for norm, kw_index in first_index.items()
+            ))
+
+    def normalized_keywords(self, rule_index: int) -> Tuple[str, ...]:
+        return self._normalized[rule_index]
+
+    def find_rule_hits(self, raw_text: str) -> List[Tuple[int, str, int, int]]:
+        """
+        모든 룰 히트를 (룰 인덱스, 키워드 원래 표기, 시작, 끝) 목록으로 반환합니다. (시작 오프셋 순)
+        오프셋은 raw_text 기준이며, 공백을 사이에 끼고 매칭된 경우 그 공백까지 [시작, 끝) 범위에 포함됩니다.
+        - 정규화 키워드마다 소문자 원문에서 표기 그대로 찾고(오프셋을 바로 얻음),
+          공백 제거 그림자 문자열의 히트 수와 같으면 그대로 씀
+        - 공백 변형 히트가 더 있는 키워드만 그림자 위치를 원문 위치로 되돌려 씀
+        """
+        lowered = _lower_keep_offsets(raw_text)
+        shadow = "".join(lowered.split())
+        to_original = None   # 그림자 위치 → 원문 위치 (공백 변형 히트가 있을 때만 만듦)
+        hits: List[Tuple[int, str, int, int]] = []
+        for rule_index, variants in enumerate(self._variants):
+            for kw_index, kw, spellings in variants:
+                keyword = self._keywords[rule_index][kw_index]
+                literal = [
+                    (rule_index, keyword, pos, pos + len(spelling))
+                    for spelling in spellings
+                    for pos in _iter_find(lowered, spelling)
+                ]
+                shadow_positions = list(_iter_find(shadow, kw))
+                if len(shadow_positions) == len(literal):
+                    hits.extend(literal)
+                    continue
+                if to_original is None:
+                    to_original = _shadow_to_original(lowered)
+                hits.extend(
+                    (rule_index, keyword, to_original(pos), to_original(pos + len(kw) - 1) + 1)
+                    for pos in shadow_positions
+                )
+        hits.sort(key=lambda hit: (hit[2], hit[0], hit[3]))
+        return hits
+
+    def first_keywords(self, raw_text: str) -> Dict[int, str]:
+        """룰 인덱스 → 대표 키워드(RULES에 정의된 원래 표기)."""
+        lowered = raw_text.lower()
+        shadow: Optional[str] = None
+        found: Dict[int, str] = {}
+        for rule_index, keywords in enumerate(self._lowered):
+            for kw_index, kw in enumerate(keywords):
+                if kw in lowered:
+                    found[rule_index] = self._keywords[rule_index][kw_index]
+                    break
+            else:
+                if shadow is None:
+                    shadow = "".join(lowered.split())
+                for kw_index, kw in enumerate(self._normalized[rule_index]):
+                    if kw in shadow:
+                        found[rule_index] = self._keywords[rule_index][kw_index]
+                        break
+        return found
+
+
+# 서버 시작 시 한 번만 정리
+_RULE_MATCHER = RuleKeywordMatcher(RULES)
+
+
+def _first_keyword_by_rule(raw_text: str) -> Dict[int, str]:
+    """
+    룰별로 대표 매칭 키워드 하나를 반환합니다.
+    기존 "룰마다 첫 번째로 걸린 키워드 하나만" 규칙과 동일한 결과를 내고,
+    공백 변형으로만 잡히는 경우에만 새 히트가 추가됩니다.
+    """
+    return _RULE_MATCHER.first_keywords(raw_text)
+
+
+def find_rule_hits(raw_text: str) -> List[Tuple[int, str, int, int]]:
+    """RULES의 모든 키워드 히트를 (룰 인덱스, 키워드, 시작, 끝) 원문 오프셋과 함께 반환합니다."""
+    return _RULE_MATCHER.find_rule_hits(raw_text)
+
+
+def _has_number(text: str) -> bool:
+    """정량 정보(숫자)가 들어있는지 간단히 체크."""
+    return bool(re.search(r"\d", text))
+
+
+# =========================
+# 검증 신호 (텍스트 → 신호 비트 → 이슈 ID)
+#  - 이슈 ID에 대응하는 이슈 객체(VALIDATION_ISSUES)는 server.py에 있음
+# =========================
+
+_SIGNAL_GOVERNANCE = 1 << 0  # 이사회/위원회/board 언급
+_SIGNAL_SCENARIO = 1 << 1    # 시나리오/scenario 언급
+_SIGNAL_NUMBER = 1 << 2      # 숫자(정량 정보)
+_SIGNAL_SCOPE12 = 1 << 3     # Scope 1·2 언급
+_SIGNAL_SCOPE3 = 1 << 4      # Scope 3 언급
+_SIGNAL_BASE_YEAR = 1 << 5   # 기준연도 언급
+
+
+def _validation_signals(draft_text: str) -> int:
+    """검증에 필요한 텍스트 신호를 비트마스크로 계산합니다."""
+    text_lower = draft_text.lower()
+    signals = 0
+    if "이사회" in draft_text or "위원회" in draft_text or "board" in text_lower:
+        signals |= _SIGNAL_GOVERNANCE
+    if "시나리오" in draft_text or "scenario" in text_lower:
+        signals |= _SIGNAL_SCENARIO
+    if _has_number(draft_text):
+        signals |= _SIGNAL_NUMBER
+    if (
+        "scope 1" in text_lower or "scope1" in text_lower or "스코프1" in draft_text
+        or "scope 2" in text_lower or "scope2" in text_lower or "스코프2" in draft_text
+    ):
+        signals |= _SIGNAL_SCOPE12
+    if "scope 3" in text_lower or "scope3" in text_lower or "스코프3" in draft_text:
+        signals |= _SIGNAL_SCOPE3
+    if "기준연도" in draft_text or "base year" in text_lower:
+        signals |= _SIGNAL_BASE_YEAR
+    return signals
+
+
+def _validation_issue_ids(codes: Tuple[str, ...], signals: int) -> Tuple[str, ...]:
+    """코드 목록과 텍스트 신호로부터 발생할 이슈 ID를 순서대로 반환합니다."""
+    issue_ids: List[str] = []
+
+    # 1) 거버넌스(S2-5 / 10(b) 일부) 관련: 이사회/위원회 표현이 있는지
+    if any("s2-5" in c.lower() or "governance" in c.lower() for c in codes):
+        if not signals & _SIGNAL_GOVERNANCE:
+            issue_ids.append("governance_board_missing")
+
+    # 2) 시나리오 분석(S2-15 / 22–23) 관련: '시나리오' 언급 & 어느 정도 정량성
+    if any("s2-15" in c.lower() or "22" in c or "23" in c for c in codes):
+        if not signals & _SIGNAL_SCENARIO:
+            issue_ids.append("scenario_missing")
+        elif not signals & _SIGNAL_NUMBER:
+            issue_ids.append("scenario_quantitative_missing")
+
+    # 3) 지표와 목표(S2-9 / 29–36) 관련: Scope 1·2·3, 기준연도, 목표치
+    if any("29" in c or "30" in c or "s2-9" in c.lower() for c in codes):
+        if not signals & _SIGNAL_SCOPE12:
+            issue_ids.append("scope12_missing")
+        if not signals & _SIGNAL_SCOPE3:
+            issue_ids.append("scope3_missing")
+        if not signals & _SIGNAL_BASE_YEAR:
+            issue_ids.append("base_year_missing")
+        if not signals & _SIGNAL_NUMBER:
+            issue_ids.append("target_number_missing")
+
+    return tuple(issue_ids)
+
+
+# =========================
+# 필수 요소 감지 테이블 (선언적 정의)
+#  - 요소 key별로 키워드/정규식/숫자 필요 여부만 선언하면 됨
+#  - 요소별 키워드/정규식은 서버 시작 시 한 번만 정리하고, 요소마다 한 번만 판정
+#    (첫 키워드가 걸리면 그 요소의 나머지 키워드는 보지 않음)
+# =========================
+
+@dataclass(frozen=True)
+class ElementDetector:
+    present_reason: str                 # present일 때 reason
+    absent_reason: str                  # 누락일 때 reason
+    keywords: Tuple[str, ...] = ()      # 대소문자 구분 부분 문자열
+    keywords_ci: Tuple[str, ...] = ()   # 대소문자 무시 부분 문자열
+    patterns: Tuple[str, ...] = ()      # 정규식 (하나라도 매칭되면 충족)
+    needs_number: bool = False          # 숫자(정량 정보)가 함께 있어야 present
+
+
+ELEMENT_DETECTORS: Dict[str, ElementDetector] = {
+    "risk_type": ElementDetector(
+        keywords=("전환 리스크", "물리적 리스크", "기후 리스크",
+                  "기후 관련 리스크", "기후 관련 위험", "기회", "비즈니스 기회"),
+        present_reason="기후 관련 리스크/기회 유형이 언급되어 있습니다.",
+        absent_reason="기후 관련 리스크/기회 유형이 문단에서 뚜렷이 보이지 않습니다.",
+    ),
+    "time_horizon": ElementDetector(
+        keywords=("단기", "중기", "장기"),
+        patterns=(r"20\d{2}\s*년",),
+        present_reason="시간대(연도 또는 단기/중기/장기)가 명시되어 있습니다.",
+        absent_reason="시간대(연도 또는 단기/중기/장기)가 명시되어 있지 않습니다.",
+    ),
+    # ✅ S2-9 취지에 맞춰 전략과 재무 영향의 연결고리를 명시하도록 피드백 수정
+    "financial_impact": ElementDetector(
+        keywords=("비용", "매출", "손익", "영업이익", "투자", "현금흐름", "손실", "영향"),
+        needs_number=True,
+        present_reason="재무적 영향(비용/매출/손익 등 + 숫자)이 포함되어 있습니다.",
+        absent_reason="재무적 영향(비용/매출/손익 등 + 숫자)이 충분히 설명되어 있지 않습니다. 이 전략이 기업의 재무 성과(예: 비용 절감, 매출 증대)에 미치는 영향을 명시해 주세요.",
+    ),
+    # ✅ S2-9 취지에 맞춰 어떤 리스크에 대한 대응인지 명시하도록 피드백 수정
+    "strategic_response": ElementDetector(
+        keywords=("전략", "계획", "로드맵", "대응", "완화", "전환", "투자 확대", "재생에너지", "감축 활동"),
+        present_reason="대응 전략/전환 계획이 서술되어 있습니다.",
+        absent_reason="대응 전략/전환 계획이 구체적으로 서술되어 있지 않습니다. 이 전략이 어떤 기후 리스크 또는 기회에 대응하기 위한 것인지 명시해 주세요.",
+    ),
+    # ✅ S2-9 취지에 맞춰 전략의 효과를 측정하는 목표치에 집중하도록 피드백 수정
+    #    (tCO2e와 같은 원시 지표 요구는 제거하고 목표나 비율에 집중)
+    "quantitative_metrics": ElementDetector(
+        keywords=("비율", "%", "지표", "목표", "감축률"),
+        needs_number=True,
+        present_reason="전략의 정량적 목표나 지표가 포함되어 있습니다.",
+        absent_reason="전략의 정량적 목표나 지표가 전략의 효과를 측정할 수 있는 정량적 목표(예: 감축 목표 비율, 투자 금액)가 부족합니다.",
+    ),
+    "scenario_description": ElementDetector(
+        keywords_ci=("시나리오", "scenario", "1.5", "2℃", "4℃", "nze", "넷제로"),
+        present_reason="사용한 기후 시나리오가 언급되어 있습니다.",
+        absent_reason="사용한 기후 시나리오가 명시되어 있지 않습니다.",
+    ),
+    "key_assumptions": ElementDetector(
+        keywords=("가정", "전제", "가정 하에", "탄소 가격", "수요", "성장률", "가격"),
+        present_reason="시나리오에 사용한 주요 가정/전제가 설명되어 있습니다.",
+        absent_reason="시나리오에 사용한 주요 가정/전제가 설명되지 않습니다.",
+    ),
+    "resilience_evaluation": ElementDetector(
+        keywords=("탄력성", "resilience", "견조", "유지 가능", "영향을 흡수", "버틸 수"),
+        present_reason="기후 탄력성(전략이 시나리오를 버틸 수 있는지)에 대한 평가는 포함되어 있습니다.",
+        absent_reason="기후 탄력성(전략이 시나리오를 버틸 수 있는지)에 대한 평가는 거의 포함되어 있지 않습니다.",
+    ),
+    "scope_coverage": ElementDetector(
+        keywords=("스코프1", "스코프2", "스코프3"),
+        keywords_ci=("scope 1", "scope1", "scope 2", "scope2", "scope 3", "scope3"),
+        present_reason="Scope 1·2·3 배출 범위가 언급되어 있습니다.",
+        absent_reason="Scope 1·2·3 배출 범위가 언급되지 않습니다.",
+    ),
+    "base_year": ElementDetector(
+        keywords=("기준연도",),
+        keywords_ci=("base year",),
+        patterns=(r"20\d{2}\s*년.*기준",),
+        present_reason="기준연도(Base year)가 명시되어 있습니다.",
+        absent_reason="기준연도(Base year)가 명시되어 있지 않습니다.",
+    ),
+    "target_value": ElementDetector(
+        keywords=("감축", "목표", "줄이", "낮추", "달성"),
+        needs_number=True,
+        present_reason="정량 목표 수치가 포함되어 있습니다.",
+        absent_reason="정량 목표 수치가 구체적인 수치 없이 서술만 있습니다.",
+    ),
+    "progress": ElementDetector(
+        keywords=("달성률", "진행률", "이행 상황", "성과", "추세", "year-on-year", "YoY"),
+        present_reason="목표 달성 현황/추세가 설명되어 있습니다.",
+        absent_reason="목표 달성 현황/추세가 거의 설명되지 않습니다.",
+    ),
+}
+
+class _CompiledElementDetectors:
+    """
+    ELEMENT_DETECTORS를 한 번에 평가할 수 있도록 컴파일한 결과.
+    detect(text)는 요소 key별 비트가 켜진 present 비트마스크를 반환합니다.
+    """
+
+    def __init__(self, detectors: Dict[str, ElementDetector]):
+        self.bits: Dict[str, int] = {key: 1 << i for i, key in enumerate(detectors)}
+        self.number_mask = 0
+        # 요소별 (비트, 대소문자 구분 키워드, 소문자 키워드, 정규식)
+        self._elements: List[Tuple[int, Tuple[str, ...], Tuple[str, ...], Tuple["re.Pattern", ...]]] = []
+
+        for key, det in detectors.items():
+            bit = self.bits[key]
+            if det.needs_number:
+                self.number_mask |= bit
+            self._elements.append((
+                bit,
+                det.keywords,
+                tuple(kw.lower() for kw in det.keywords_ci),
+                tuple(re.compile(p) for p in det.patterns),
+            ))
+        self._needs_lowered = any(keywords_ci for _bit, _kws, keywords_ci, _rx in self._elements)
+
+    def detect(self, text: str) -> int:
+        return self.finalize(*self.detect_raw(text))
+
+    def detect_raw(self, text: str) -> Tuple[int, bool]:
+        """
+        숫자 조건을 적용하기 전의 키워드/정규식 비트마스크와 숫자 포함 여부를 반환합니다.
+        텍스트를 여러 조각으로 나눠 판정할 때는 조각별 결과를 OR로 합친 뒤 finalize하면 됩니다.
+        """
+        found = 0
+        lowered = text.lower() if self._needs_lowered else text
+        for bit, keywords, keywords_ci, regexes in self._elements:
+            if (
+                any(kw in text for kw in keywords)
+                or any(kw in lowered for kw in keywords_ci)
+                or any(regex.search(text) for regex in regexes)
+            ):
+                found |= bit
+        return found, _has_number(text)
+
+    def finalize(self, raw_mask: int, has_number: bool) -> int:
+        if not has_number:
+            return raw_mask & ~self.number_mask
+        return raw_mask
+
+    def is_present(self, mask: int, key: str) -> Optional[bool]:
+        bit = self.bits.get(key)
+        if bit is None:
+            return None
+        return bool(mask & bit)
+
+
+# 서버 시작 시 한 번만 컴파일
+_ELEMENT_DETECTORS = _CompiledElementDetectors(ELEMENT_DETECTORS)
+
+
+# =========================
+# 문장 분리 (오프셋 기반)
+#  - 원문을 한 번만 훑어 문장 (start, end) 오프셋을 내고, 문자열 복사는 실제로 필요한 문장만
+#  - 경계: 줄바꿈 / 문장부호(.!?。, 닫는 따옴표·괄호 포함) 뒤 공백 /
+#    공백 없이 붙은 한국어 종결(다·요·음 + 문장부호, 예: "…했다.다음")
+#  - 소수점(1.5℃), 약어(e.g., U.S., Dr. 등) 뒤에서는 나누지 않음
+# =========================
+
+_SENTENCE_BOUNDARY = re.compile(
+    # str.splitlines()와 같은 줄 경계
+    r"(?P<br>\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029])"
+    r"|(?P<end>[.!?。]+[\"'”’)\]」』]*)(?=\s)"
+    r"|(?<=[다요음])(?P<ko>[.!?]+)(?=[\w(\[“‘])"
+)
+_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "jr", "sr", "st", "vs", "no", "fig", "vol", "approx",
+    "dept", "est", "inc", "ltd", "co", "corp", "ref", "cf", "al",
+})
+_DOTTED_INITIALS = re.compile(r"(?:[a-z]\.)+[a-z]")
+
+
+def _is_abbreviation(text: str, dot: int, floor: int) -> bool:
+    """text[dot] == "." 앞 단어가 약어(e.g, U.S, Dr 등)인지 확인합니다."""
+    k = dot
+    while k > floor and ((text[k - 1].isascii() and text[k - 1].isalpha()) or text[k - 1] == "."):
+        k -= 1
+    word = text[k:dot].lower()
+    return word in _ABBREVIATIONS or _DOTTED_INITIALS.fullmatch(word) is not None
+
+
+def _iter_sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """문장마다 앞뒤 공백을 제외한 [start, end) 오프셋을 순서대로 냅니다 (빈 문장 제외)."""
+    start = 0
+    for m in _SENTENCE_BOUNDARY.finditer(text):
+        if m.lastgroup == "br":
+            cut = m.start()
+        else:
+            if m.lastgroup == "end" and m.end() - m.start() == 1 and text[m.start()] == "." and _is_abbreviation(text, m.start(), start):
+                continue
+            cut = m.end()
+        s, e = start, cut
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            yield s, e
+        start = m.end()
+    s, e = start, len(text)
+    while s < e and text[s].isspace():
+        s += 1
+    while e > s and text[e - 1].isspace():
+        e -= 1
+    if s < e:
+        yield s, e
+
+
+# =========================
+# 문장 배치 분석 (행 계산)
+#  - 문장 목록 전체를 한 번에 스캔해 문장별 룰 비트셋 → 그룹 비트셋 → 검증 신호를 계산
+#  - 결과는 (문장 인덱스, 오프셋, 그룹 비트셋, 이슈 ID) 행이며, Pydantic 객체는 server.py에서 조립
+# =========================
+
+def _paragraph_code_to_group_code(paragraph_code: str) -> Optional[str]:
+    """
+    룰/매핑 결과에서 나오는 IFRS S2 단락 코드(예: "5–7", "22–23,25", "29(a)–29(c)")
+    를 S2 그룹 코드(예: "S2-5", "S2-15", "S2-9")로 변환합니다.
+    """
+    if not paragraph_code:
+        return None
+
+    normalized = paragraph_code.replace(" ", "")
+    # 거버넌스: 5–7
+    if "5–7" in normalized or "5-7" in normalized:
+        return "S2-5"
+    # 시나리오 분석: 22–23, 25
+    if "22–23" in normalized or "22-23" in normalized or "25" in normalized:
+        return "S2-15"
+    # 지표/배출: 29(a)–29(c), 33–36 등
+    if "29(a)" in normalized or "29(a)–29(c)" in normalized or "29(a)-29(c)" in normalized:
+        return "S2-9"
+    if "33" in normalized or "34" in normalized or "35" in normalized or "36" in normalized:
+        return "S2-9"
+
+    return None
+
+
+# 룰 인덱스별로 연결되는 S2 그룹 코드 (없으면 None)
+_RULE_GROUP_CODES: List[Optional[str]] = [
+    _paragraph_code_to_group_code(code) for _keywords, code, _reason in RULES
+]
+# SentenceSuggestion.ifrs_codes 정렬 순서와 같은 순서로 그룹 비트를 부여
+_SORTED_GROUP_CODES: List[str] = sorted({gc for gc in _RULE_GROUP_CODES if gc})
+_GROUP_BITS: Dict[str, int] = {gc: 1 << i for i, gc in enumerate(_SORTED_GROUP_CODES)}
+_RULE_GROUP_BITS: List[int] = [_GROUP_BITS[gc] if gc else 0 for gc in _RULE_GROUP_CODES]
+# 그룹 비트별 (공백 제거 + 소문자) 키워드 목록 (중복 제거)
+_GROUP_KEYWORDS: List[Tuple[int, Tuple[str, ...]]] = [
+    (bit, tuple(dict.fromkeys(
+        kw
+        for rule_index, rule_bit in enumerate(_RULE_GROUP_BITS)
+        if rule_bit == bit
+        for kw in _RULE_MATCHER.normalized_keywords(rule_index)
+    )))
+    for bit in _GROUP_BITS.values()
+]
+
+# 너무 짧은 문장은 제외 (예: 캡션, 제목 등)
+_MIN_SENTENCE_LENGTH = 10
+
+
+@lru_cache(maxsize=None)
+def _group_issue_ids(group_mask: int, signals: int) -> Tuple[str, ...]:
+    """그룹 비트셋 + 검증 신호 조합별 이슈 ID (그룹 코드 정렬 순서대로 이어 붙임)."""
+    return tuple(
+        issue_id
+        for gc in _SORTED_GROUP_CODES
+        if group_mask & _GROUP_BITS[gc]
+        for issue_id in _validation_issue_ids((gc,), signals)
+    )
+
+
+def _span_group_masks(text: str, spans: List[Tuple[int, int]]) -> List[int]:
+    """
+    문장별 S2 그룹 비트셋을 만듭니다.
+    문장마다 공백 제거 + 소문자화한 조각을 이어 붙인 그림자 문자열에서 그룹 키워드를 str.find로 찾고,
+    히트 위치로 문장을 찾습니다. (문장 경계를 넘는 히트는 버림 → 문장 단위 매핑과 동일한 결과)
+    """
+    if not spans:
+        return []
+    pieces = ["".join(text[start:end].lower().split()) for start, end in spans]
+    shadow = "".join(pieces)
+    bounds = list(accumulate(len(piece) for piece in pieces))   # 문장 i = [bounds[i-1], bounds[i])
+
+    masks = [0] * len(spans)
+    for bit, keywords in _GROUP_KEYWORDS:
+        for kw in keywords:
+            pos = shadow.find(kw)
+            while pos >= 0:
+                i = bisect_right(bounds, pos)
+                if pos + len(kw) <= bounds[i]:
+                    masks[i] |= bit
+                    pos = shadow.find(kw, bounds[i])   # 이 문장은 이미 켜졌으니 다음 문장부터
+                else:
+                    pos = shadow.find(kw, pos + 1)
+    return masks
+
+
+def _joined_spans(sentences: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """문장 문자열 목록을 "\n"으로 이어 붙인 버퍼와 각 문장의 오프셋."""
+    spans: List[Tuple[int, int]] = []
+    pos = 0
+    for sent in sentences:
+        spans.append((pos, pos + len(sent)))
+        pos += len(sent) + 1
+    return "\n".join(sentences), spans
+
+
+# 배치 분석 중간 결과 한 행: (문장 인덱스, 시작 오프셋, 끝 오프셋, 그룹 비트셋, 이슈 ID들)
+_SentenceRow = Tuple[int, int, int, int, Tuple[str, ...]]
+# 배치 분석 단계별 소요 시간(초): (룰 매칭, 검증)
+_StageSeconds = Tuple[float, float]
+
+
+def _span_batch_rows_timed(text: str, spans: List[Tuple[int, int]]) -> Tuple[List[_SentenceRow], _StageSeconds]:
+    """
+    노출 대상 문장만 골라 (인덱스, 시작, 끝, 그룹 비트셋, 이슈 ID) 행으로 반환합니다. 문자열은 후보 문장만 잘라 씁니다.
+    룰 매칭/검증 단계 소요 시간도 함께 반환합니다.
+    """
+    started = time.perf_counter()
+    group_masks = _span_group_masks(text, spans)
+    matched = time.perf_counter()
+    rows: List[_SentenceRow] = []
+
+    for idx, ((start, end), group_mask) in enumerate(zip(spans, group_masks)):
+        # 짧은 문장 / 어떤 S2 그룹과도 연관이 없는 문장은 스킵
+        if not group_mask or end - start < _MIN_SENTENCE_LENGTH:
+            continue
+
+        issue_ids = _group_issue_ids(group_mask, _validation_signals(text[start:end]))
+        # 이 문장에 대해 실제로 문제가 없으면 굳이 노출하지 않음
+        if not issue_ids:
+            continue
+
+        rows.append((idx, start, end, group_mask, issue_ids))
+
+    return rows, (matched - started, time.perf_counter() - matched)
+
+
+def _span_batch_rows(text: str, spans: List[Tuple[int, int]]) -> List[_SentenceRow]:
+    """_span_batch_rows_timed에서 행만 반환합니다."""
+    return _span_batch_rows_timed(text, spans)[0]
+
+
+def _sentence_batch_rows_timed(sentences: List[str]) -> Tuple[List[_SentenceRow], _StageSeconds]:
+    """문장 문자열 목록용 _span_batch_rows_timed (오프셋은 이어 붙인 버퍼 기준)."""
+    return _span_batch_rows_timed(*_joined_spans(sentences))
+
+
+def _sentence_batch_rows(sentences: List[str]) -> List[_SentenceRow]:
+    """문장 문자열 목록용 _span_batch_rows (오프셋은 이어 붙인 버퍼 기준)."""
+    return _sentence_batch_rows_timed(sentences)[0]
+
+
+# =========================
+# 병렬 분석 워커 (프로세스 풀에서 실행)
+# =========================
+
+# 샤드 하나의 분석 결과:
+#   (문장 수, 노출 문장 행들(샤드 기준 오프셋), 필수 요소 raw 비트마스크, 숫자 포함 여부,
+#    (문장 분리, 룰 매칭, 검증) 소요 시간(초))
+# 워커 프로세스의 메트릭은 부모의 /metrics에 잡히지 않으므로 단계 시간은 부모가 받아 기록합니다.
+_ShardResult = Tuple[int, List[_SentenceRow], int, bool, Tuple[float, float, float]]
+
+
+def _init_analysis_worker() -> None:
+    """워커 프로세스 시작 시 컴파일된 룰/테이블과 캐시를 미리 데워 둡니다."""
+    _sentence_batch_rows(["이사회 산하 ESG위원회는 2030년 Scope 1 배출량 시나리오 분석을 검토한다."])
+    _ELEMENT_DETECTORS.detect("2030년 기준연도 대비 감축 목표 50%")
+
+
+def _shard_text(text: str, shard_count: int) -> List[str]:
+    """텍스트를 줄바꿈 바로 뒤에서 잘라 대략 같은 크기의 샤드 shard_count개로 나눕니다."""
+    if shard_count <= 1:
+        return [text]
+    target = max(1, len(text) // shard_count)
+    shards: List[str] = []
+    start = 0
+    while start < len(text) and len(shards) < shard_count - 1:
+        cut = text.find("\n", start + target)
+        if cut < 0:
+            break
+        shards.append(text[start:cut + 1])
+        start = cut + 1
+    shards.append(text[start:])
+    return shards
+
+
+def _analyze_shard(shard: str) -> _ShardResult:
+    """워커에서 실행: 샤드 하나의 문장 분석 행과 필수 요소 raw 판정 결과를 계산합니다."""
+    started = time.perf_counter()
+    spans = list(_iter_sentence_spans(shard))
+    split_seconds = time.perf_counter() - started
+    raw_mask, has_number = _ELEMENT_DETECTORS.detect_raw(shard)
+    rows, (rule_seconds, validation_seconds) = _span_batch_rows_timed(shard, spans)
+    return len(spans), rows, raw_mask, has_number, (split_seconds, rule_seconds, validation_seconds)
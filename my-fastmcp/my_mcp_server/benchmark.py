@@ -0,0 +1,351 @@
+"""
+IFRS S2 Navigator 핫패스 벤치마크
+
+룰 매핑 / 문장 분리 / 문장 분석 / 검증 / 체크리스트 함수와 REST 엔드포인트를
+결정적(seed 고정) 합성 한국어·영어 ESG 코퍼스(1KB ~ 10MB)로 측정하고,
+처리량, p50/p99 지연, 최대 메모리 할당량을 JSON으로 저장합니다.
+
+사용 예:
+    python benchmark.py                                  # 기본 크기(1KB~1MB), 결과는 stdout 요약 + JSON
+    python benchmark.py --sizes 1KB,10KB,100KB,1MB,10MB --out bench.json
+    python benchmark.py --save-baseline .benchmarks/baseline.json
+    python benchmark.py --baseline .benchmarks/baseline.json --threshold 0.2   # 회귀 시 종료 코드 1
+
+LLM은 호출하지 않습니다. (엔드포인트는 fast 모드/룰 기반 경로만 측정)
+serialize 케이스는 분석 결과 한 건을 응답 바이트로 만드는 CPU 시간만 따로 잽니다.
+(FastAPI 기본 경로 vs FastJSONResponse, gzip/br 압축)
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Union
+
+# server 모듈은 import 시 OpenAI 클라이언트를 만들므로 더미 키를 넣어 둠 (실제 호출 없음)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+import responses  # noqa: E402
+import server  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+
+# =========================
+# 합성 ESG 코퍼스 (seed 고정)
+# =========================
+
+_SUBJECTS = [
+    "당사는", "이사회는", "ESG위원회는", "경영진은", "리스크관리위원회는", "지속가능경영팀은",
+    "The company", "The board", "Management", "The sustainability committee",
+]
+_TOPICS = [
+    "기후 관련 위험 및 기회에 대한 이사회의 감독을", "전환 리스크와 물리적 리스크를",
+    "1.5℃ 시나리오와 2℃ 시나리오 분석 결과를", "Scope 1, Scope 2 온실가스 배출량을",
+    "Scope 3 배출량 산정 범위를", "공급망 협력사의 탄소 감축 활동을", "탄소중립 전환 계획을",
+    "재생에너지 100% 전환 로드맵을", "탄소배출권 가격 변동에 따른 재무 영향을",
+    "기후 리스크 식별 및 평가 절차를", "저탄소 솔루션 매출 기회를",
+    "climate-related risks and opportunities", "scenario analysis under RCP 8.5",
+    "the net zero transition plan", "Scope 3 emissions in the value chain",
+]
+_VERBS = [
+    "정기적으로 검토한다", "분기마다 보고받는다", "평가하고 공시한다", "관리하고 있다",
+    "모니터링한다", "수립하였다", "reviews quarterly", "discloses annually", "oversees",
+]
+_NUMBERS = [
+    "{y}년까지 {p}% 감축을 목표로 한다", "{y}년 기준연도 대비 {p}% 감소하였다",
+    "연간 {n}억 원의 비용이 발생할 것으로 추정된다", "{n},000 tCO2eq를 배출하였다",
+    "by {y} emissions will fall {p}% against the base year",
+]
+_FILLERS = [
+    "날씨가 좋다.", "회사는 신규 채용을 확대하였다.", "고객 만족도 조사를 실시하였다.",
+    "This paragraph describes general business activities.", "자세한 내용은 부록을 참조한다.",
+]
+
+
+def _sentence(rnd: random.Random) -> str:
+    roll = rnd.random()
+    if roll < 0.2:
+        return rnd.choice(_FILLERS)
+    text = f"{rnd.choice(_SUBJECTS)} {rnd.choice(_TOPICS)} {rnd.choice(_VERBS)}"
+    if roll < 0.6:
+        text += ", " + rnd.choice(_NUMBERS).format(
+            y=rnd.randint(2025, 2050), p=rnd.randint(5, 90), n=rnd.randint(1, 999)
+        )
+    return text + "."
+
+
+def generate_corpus(size_bytes: int, seed: int = 0) -> str:
+    """UTF-8 기준 대략 size_bytes 크기의 결정적 합성 ESG 텍스트를 만듭니다."""
+    rnd = random.Random(seed)
+    parts: List[str] = []
+    total = 0
+    while total < size_bytes:
+        paragraph = " ".join(_sentence(rnd) for _ in range(rnd.randint(1, 4)))
+        parts.append(paragraph)
+        total += len(paragraph.encode("utf-8")) + 1
+    return "\n".join(parts)
+
+
+def parse_size(label: str) -> int:
+    units = {"KB": 1024, "MB": 1024 * 1024, "B": 1}
+    label = label.strip().upper()
+    for unit, factor in units.items():
+        if label.endswith(unit):
+            return int(float(label[: -len(unit)]) * factor)
+    return int(label)
+
+
+# =========================
+# 측정
+# =========================
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(
+    fn: Callable[[], object],
+    size_bytes: int,
+    min_reps: int,
+    max_reps: int,
+    min_seconds: float,
+) -> Dict[str, float]:
+    """fn을 반복 실행해 지연 분포와 평균 CPU 시간을 구하고, 별도 1회 실행으로 최대 할당량을 잽니다."""
+    fn()  # 워밍업 (lru_cache, 정규식 컴파일 등)
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    while len(latencies) < max_reps and (
+        len(latencies) < min_reps or time.perf_counter() - started < min_seconds
+    ):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    cpu_mean = (time.process_time() - cpu_started) / len(latencies)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    mean = statistics.fmean(latencies)
+    return {
+        "reps": len(latencies),
+        "mean_ms": round(mean * 1000, 4),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 4),
+        "cpu_mean_ms": round(cpu_mean * 1000, 4),
+        "throughput_mb_s": round(size_bytes / (1024 * 1024) / mean, 3) if mean > 0 else 0.0,
+        "peak_alloc_bytes": peak,
+    }
+
+
+def function_cases(text: str) -> Dict[str, Callable[[], object]]:
+    codes = [code for code, _title in server.ESSENTIAL_CODES]
+    return {
+        "_rule_based_mapping": lambda: server._rule_based_mapping(text),
+        "_split_into_sentences": lambda: server._split_into_sentences(text),
+        "_analyze_pdf_sentences": lambda: server._analyze_pdf_sentences(text, industry="은행"),
+        "_validate_disclosure_internal": lambda: server._validate_disclosure_internal(codes, text, "은행"),
+        "build_checklist_from_text": lambda: server.build_checklist_from_text(text, industry="은행"),
+    }
+
+
+def endpoint_cases(client: TestClient, text: str) -> Dict[str, Callable[[], object]]:
+    codes = [code for code, _title in server.ESSENTIAL_CODES]
+
+    def post(path: str, payload: dict) -> Callable[[], object]:
+        def call():
+            response = client.post(path, json=payload)
+            response.raise_for_status()
+            return response
+        return call
+
+    return {
+        "POST /api/map (fast)": post("/api/map", {"raw_text": text, "industry": "은행", "mode": "fast"}),
+        "POST /api/validate": post("/api/validate", {"codes": codes, "draft_text": text, "industry": "은행"}),
+        "POST /api/demo/analyze-text": post(
+            "/api/demo/analyze-text", {"raw_text": text, "industry": "은행", "include_text": False}
+        ),
+    }
+
+
+def serialization_cases(text: str) -> Dict[str, Callable[[], object]]:
+    """
+    /api/demo/analyze-text 응답 한 건을 바이트로 만드는 비용 (분석 자체는 제외).
+    - legacy: model_dump → response_model 재검증 → JSON 모드 dump → 표준 json (구버전 FastAPI 기본 경로)
+    - dump_json: response_model 재검증 → TypeAdapter.dump_json (최신 FastAPI 기본 경로)
+    - Fast: 재검증 없이 FastJSONResponse로 바로 인코딩 (현재 엔드포인트 경로)
+    """
+    checklist, suggestions = server.analyze_document(text, industry="은행")
+    expanded = server.DemoAnalysisResponse(
+        pdf_text="", pdf_meta=server._text_input_meta(), checklist=checklist, sentence_suggestions=suggestions,
+    )
+    _checklist, rows = server.analyze_document(text, industry="은행", build=server._compact_from_row)
+    compact = server._compact_analysis_response("", server._text_input_meta(), checklist, rows)
+    adapter = TypeAdapter(Union[server.DemoAnalysisResponse, server.CompactAnalysisResponse])
+    body = server.FastJSONResponse(expanded).body
+
+    def legacy(response) -> Callable[[], object]:
+        return lambda: JSONResponse(adapter.dump_python(adapter.validate_python(response.model_dump()), mode="json")).body
+
+    def dump_json(response) -> Callable[[], object]:
+        return lambda: adapter.dump_json(adapter.validate_python(response))
+
+    cases = {
+        "analyze-text legacy": legacy(expanded),
+        "analyze-text dump_json": dump_json(expanded),
+        "analyze-text Fast": lambda: server.FastJSONResponse(expanded).body,
+        "analyze-text compact legacy": legacy(compact),
+        "analyze-text compact dump_json": dump_json(compact),
+        "analyze-text compact Fast": lambda: server.FastJSONResponse(compact).body,
+        "analyze-text gzip": lambda: gzip.compress(body, compresslevel=responses.RESPONSE_GZIP_LEVEL),
+    }
+    if responses.brotli is not None:
+        cases["analyze-text br"] = lambda: responses.brotli.compress(body, quality=responses.RESPONSE_BROTLI_QUALITY)
+    return cases
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    sizes: List[str],
+    seed: int,
+    endpoint_max_bytes: int,
+    min_reps: int,
+    max_reps: int,
+    min_seconds: float,
+    only: Optional[str] = None,
+) -> dict:
+    results: List[dict] = []
+    with TestClient(server.api) as client:
+        for label in sizes:
+            size_bytes = parse_size(label)
+            text = generate_corpus(size_bytes, seed)
+            actual_bytes = len(text.encode("utf-8"))
+            cases = [("function", name, fn) for name, fn in function_cases(text).items()]
+            if actual_bytes <= endpoint_max_bytes:
+                cases += [("endpoint", name, fn) for name, fn in endpoint_cases(client, text).items()]
+                cases += [("serialize", name, fn) for name, fn in serialization_cases(text).items()]
+
+            for kind, name, fn in cases:
+                if only and only not in name:
+                    continue
+                stats = measure(fn, actual_bytes, min_reps, max_reps, min_seconds)
+                row = {"name": name, "kind": kind, "size": label, "size_bytes": actual_bytes, **stats}
+                results.append(row)
+                print(
+                    f"{kind:9s} {name:32s} {label:>6s}  p50 {stats['p50_ms']:10.3f} ms  "
+                    f"p99 {stats['p99_ms']:10.3f} ms  cpu {stats['cpu_mean_ms']:10.3f} ms  "
+                    f"{stats['throughput_mb_s']:8.2f} MB/s  "
+                    f"peak {stats['peak_alloc_bytes'] / 1024:10.1f} KB",
+                    file=sys.stderr,
+                )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, threshold: float) -> List[dict]:
+    """p50이 baseline 대비 threshold(비율) 이상 느려진 항목 목록을 반환합니다."""
+    base_rows = {(r["kind"], r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions: List[dict] = []
+    for row in report["results"]:
+        base = base_rows.get((row["kind"], row["name"], row["size"]))
+        if base is None or base["p50_ms"] <= 0:
+            continue
+        ratio = row["p50_ms"] / base["p50_ms"]
+        row["baseline_p50_ms"] = base["p50_ms"]
+        row["p50_ratio"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(row)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="IFRS S2 Navigator 핫패스 벤치마크")
+    parser.add_argument("--sizes", default="1KB,10KB,100KB,1MB", help="쉼표로 구분한 입력 크기 (예: 1KB,10MB)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--endpoint-max", default="1MB", help="이 크기 이하 입력만 엔드포인트로도 측정")
+    parser.add_argument("--min-reps", type=int, default=5)
+    parser.add_argument("--max-reps", type=int, default=200)
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="케이스별 최소 측정 시간(초)")
+    parser.add_argument("--only", help="이름에 이 문자열이 들어간 케이스만 실행")
+    parser.add_argument("--out", help="결과 JSON 경로 (없으면 stdout)")
+    parser.add_argument("--baseline", help="비교할 baseline JSON 경로")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 회귀 허용 비율 (기본 0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="이번 결과를 baseline으로 저장할 경로")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        sizes=[s for s in args.sizes.split(",") if s.strip()],
+        seed=args.seed,
+        endpoint_max_bytes=parse_size(args.endpoint_max),
+        min_reps=args.min_reps,
+        max_reps=args.max_reps,
+        min_seconds=args.min_seconds,
+        only=args.only,
+    )
+
+    regressions: List[dict] = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f), args.threshold)
+        report["regressions"] = [
+            {k: r[k] for k in ("kind", "name", "size", "p50_ms", "baseline_p50_ms", "p50_ratio")}
+            for r in regressions
+        ]
+        for r in regressions:
+            print(f"REGRESSION {r['kind']} {r['name']} {r['size']}: p50 x{r['p50_ratio']}", file=sys.stderr)
+
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(payload)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+로컬 OpenAI 호환 가짜 chat.completions 서버 (부하/장애 테스트용)
+
+네트워크 없이 auto/accurate 매핑, 배치 매핑, 문단 보완 같은 LLM 경로의
+처리량과 꼬리 지연, 폴백 동작을 측정하기 위한 서버입니다.
+
+- 지연 분포: fixed / uniform / normal / lognormal / exp (초 단위)
+- 토큰 속도: 응답 토큰 수 / tokens-per-second 만큼 추가 지연 (stream=True면 그 속도로 청크 전송)
+- 장애 주입: 429, 500, timeout(응답 지연), malformed(JSON 아님), truncated(잘린 JSON), empty(빈 응답)
+  요청 헤더 X-Fake-Fault: 429|500|timeout|malformed|truncated|empty|none 으로 강제할 수도 있음
+- 응답 내용: 프롬프트 형태(배치 매핑 / 단일 매핑 / 문단 보완)에 맞는 결정적 가짜 응답
+
+사용 예:
+    python fake_llm_server.py --port 8900 --latency lognormal:-1.2,0.5 --tokens-per-second 80 --rate-429 0.05
+    # server.py 쪽
+    LLM_BASE_URL=http://127.0.0.1:8900/v1 LLM_MODEL=fake-gpt OPENAI_API_KEY=fake uv run uvicorn server:api
+
+설정은 FAKE_LLM_* 환경 변수로도 줄 수 있고, 실행 중에는 POST /fake/config 로 바꿀 수 있습니다.
+GET /fake/stats 는 결과별 요청 수와 최대 동시 요청 수를 돌려줍니다.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAULTS = ("429", "500", "timeout", "malformed", "truncated", "empty")
+
+_CODES = ["5–7", "10(a)", "10(b)", "13", "14", "15–16", "22–23,25", "24–25", "29(a)–29(c)", "33–36"]
+
+
+# =========================
+# 설정
+# =========================
+
+@dataclass
+class FakeLLMConfig:
+    latency: str = "lognormal:-1.0,0.5"     # 첫 토큰까지의 지연 분포 (초)
+    tokens_per_second: float = 100.0        # 응답 토큰 생성 속도 (0이면 토큰 지연 없음)
+    rate_429: float = 0.0
+    rate_500: float = 0.0
+    rate_timeout: float = 0.0
+    rate_malformed: float = 0.0
+    rate_truncated: float = 0.0
+    rate_empty: float = 0.0
+    timeout_seconds: float = 120.0          # timeout 장애 시 응답을 붙잡아 두는 시간
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        config = cls()
+        for f in fields(cls):
+            value = os.getenv(f"FAKE_LLM_{f.name.upper()}")
+            if value is not None:
+                setattr(config, f.name, _coerce(f.name, value))
+        return config
+
+    def update(self, values: Dict[str, object]) -> None:
+        for name, value in values.items():
+            if name not in {f.name for f in fields(self)}:
+                raise ValueError(f"unknown config field: {name}")
+            setattr(self, name, _coerce(name, value))
+        parse_latency(self.latency)  # 형식 검증
+
+
+def _coerce(name: str, value: object) -> object:
+    if name == "latency":
+        return str(value)
+    if name == "seed":
+        return None if value in (None, "", "none") else int(value)
+    return float(value)
+
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    """'lognormal:-1.0,0.5' → ('lognormal', [-1.0, 0.5])"""
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x.strip()]
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+    if kind not in expected or len(params) != expected[kind]:
+        raise ValueError(f"invalid latency spec: {spec!r} (예: fixed:0.5, uniform:0.2,1.0, lognormal:-1,0.5, exp:0.5)")
+    return kind, params
+
+
+def sample_latency(spec: str, rnd: random.Random) -> float:
+    kind, p = parse_latency(spec)
+    if kind == "fixed":
+        value = p[0]
+    elif kind == "uniform":
+        value = rnd.uniform(p[0], p[1])
+    elif kind == "normal":
+        value = rnd.gauss(p[0], p[1])
+    elif kind == "lognormal":
+        value = rnd.lognormvariate(p[0], p[1])
+    else:
+        value = rnd.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+    return max(0.0, value)
+
+
+# =========================
+# 가짜 응답 생성
+# =========================
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 2 + 1
+
+
+def _pick_codes(text: str, count: int = 2) -> List[str]:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [_CODES[digest[i] % len(_CODES)] for i in range(count)]
+
+
+def _mapping_entry(text: str) -> dict:
+    return {
+        "candidates": [
+            {"code": code, "reason": f"가짜 LLM 판단: 텍스트가 {code} 문단의 공시 요구사항과 관련된 내용으로 보입니다."}
+            for code in dict.fromkeys(_pick_codes(text))
+        ],
+        "coverage_comment": "가짜 LLM 응답입니다. 실제 IFRS S2 커버리지 판단이 아닙니다.",
+    }
+
+
+def fake_content(user_prompt: str) -> str:
+    """프롬프트 형태를 보고 server.py가 기대하는 형식의 결정적 응답을 만듭니다."""
+    items = re.split(r"\[항목 (\d+)\]\n", user_prompt)
+    if len(items) > 1 and '"results"' in user_prompt:
+        # 배치 매핑: [항목 0]\n본문 … 형식
+        results = []
+        for i in range(1, len(items) - 1, 2):
+            entry = _mapping_entry(items[i + 1])
+            entry["index"] = int(items[i])
+            results.append(entry)
+        return "```json\n" + json.dumps({"results": results}, ensure_ascii=False) + "\n```"
+
+    if '"candidates"' in user_prompt:
+        match = re.search(r"\[분석 대상 텍스트\]\n(.*?)\n\n", user_prompt, re.S)
+        return json.dumps(_mapping_entry(match.group(1) if match else user_prompt), ensure_ascii=False)
+
+    match = re.search(r"\[원문 문단\]\n(.*?)\n\n", user_prompt, re.S)
+    paragraph = (match.group(1) if match else user_prompt[:200]).strip()
+    return (
+        f"{paragraph} 당사는 이와 관련된 재무적 영향을 [필수 입력: 예상되는 비용 절감액 또는 매출 증대 효과]로 추정하며, "
+        "[필수 입력: 2030년 감축 목표 비율]을 목표로 이행 현황을 매년 점검합니다."
+    )
+
+
+def _apply_content_fault(fault: Optional[str], content: str) -> Tuple[str, str]:
+    """(content, finish_reason)"""
+    if fault == "malformed":
+        return "죄송합니다. 요청하신 형식으로 답변을 생성하지 못했습니다. 다시 시도해 주세요.", "stop"
+    if fault == "truncated":
+        return content[: max(1, len(content) // 2)], "length"
+    if fault == "empty":
+        return "", "stop"
+    return content, "stop"
+
+
+# =========================
+# 서버
+# =========================
+
+class FakeLLMState:
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self.rnd = random.Random(config.seed)
+        self.counts: Dict[str, int] = {}
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.started_at = time.time()
+
+    def choose_fault(self, forced: Optional[str]) -> Optional[str]:
+        if forced:
+            return None if forced == "none" else forced
+        roll = self.rnd.random()
+        for fault in FAULTS:
+            roll -= getattr(self.config, f"rate_{fault}")
+            if roll < 0:
+                return fault
+        return None
+
+    def count(self, outcome: str) -> None:
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI chat.completions")
+    state = FakeLLMState(config or FakeLLMConfig.from_env())
+    app.state.fake = state
+
+    def error(status: int, kind: str, message: str, headers: Optional[dict] = None) -> JSONResponse:
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": message, "type": kind, "param": None, "code": kind}},
+            headers=headers,
+        )
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "fake-gpt", "object": "model", "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        cfg = state.config
+        fault = state.choose_fault(request.headers.get("x-fake-fault"))
+        if fault is not None and fault not in FAULTS:
+            return error(400, "invalid_request_error", f"unknown X-Fake-Fault: {fault}")
+
+        state.inflight += 1
+        state.peak_inflight = max(state.peak_inflight, state.inflight)
+        streaming = False   # 스트리밍 응답은 본문 생성기가 끝날 때 inflight를 내림
+        try:
+            if fault == "429":
+                state.count("429")
+                return error(429, "rate_limit_exceeded", "Rate limit reached (fake).", {"retry-after": "1"})
+            if fault == "500":
+                state.count("500")
+                return error(500, "server_error", "The server had an error (fake).")
+            if fault == "timeout":
+                state.count("timeout")
+                await asyncio.sleep(cfg.timeout_seconds)
+                return error(504, "timeout", "Fake upstream timeout.")
+
+            messages = body.get("messages") or []
+            user_prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+            prompt_text = "\n".join(str(m.get("content", "")) for m in messages)
+            content, finish_reason = _apply_content_fault(fault, fake_content(user_prompt))
+
+            max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+            if max_tokens and _estimate_tokens(content) > max_tokens:
+                content, finish_reason = content[: int(max_tokens) * 2], "length"
+
+            usage = {
+                "prompt_tokens": _estimate_tokens(prompt_text),
+                "completion_tokens": _estimate_tokens(content) if content else 0,
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            model = body.get("model") or "fake-gpt"
+            first_token_delay = sample_latency(cfg.latency, state.rnd)
+            state.count(fault or "ok")
+
+            if body.get("stream"):
+                chunks = _stream_chunks(model, content, finish_reason, usage, first_token_delay, cfg.tokens_per_second,
+                                        bool((body.get("stream_options") or {}).get("include_usage")))
+                response = StreamingResponse(_track_inflight(state, chunks), media_type="text/event-stream")
+                streaming = True
+                return response
+
+            token_delay = usage["completion_tokens"] / cfg.tokens_per_second if cfg.tokens_per_second > 0 else 0.0
+            await asyncio.sleep(first_token_delay + token_delay)
+            return {
+                "id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": usage,
+            }
+        finally:
+            if not streaming:
+                state.inflight -= 1
+
+    @app.get("/fake/stats")
+    async def stats():
+        return {
+            "counts": state.counts,
+            "inflight": state.inflight,
+            "peak_inflight": state.peak_inflight,
+            "uptime_seconds": round(time.time() - state.started_at, 3),
+            "config": asdict(state.config),
+        }
+
+    @app.post("/fake/config")
+    async def update_config(request: Request):
+        values = await request.json()
+        try:
+            state.config.update(values)
+        except (TypeError, ValueError) as exc:
+            return error(400, "invalid_request_error", str(exc))
+        if "seed" in values:
+            state.rnd = random.Random(state.config.seed)
+        return asdict(state.config)
+
+    return app
+
+
+async def _track_inflight(state: FakeLLMState, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """스트림이 끝나거나 클라이언트가 끊을 때까지 요청을 inflight로 셉니다."""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        state.inflight -= 1
+
+
+async def _stream_chunks(
+    model: str,
+    content: str,
+    finish_reason: str,
+    usage: dict,
+    first_token_delay: float,
+    tokens_per_second: float,
+    include_usage: bool,
+) -> AsyncIterator[str]:
+    """content를 토큰(대략 2자) 단위 청크로 나눠 tokens_per_second 속도로 SSE 전송합니다."""
+    chunk_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    def chunk(delta: dict, finish: Optional[str] = None, with_usage: Optional[dict] = None) -> str:
+        payload = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if with_usage is None else [],
+        }
+        if with_usage is not None:
+            payload["usage"] = with_usage
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    await asyncio.sleep(first_token_delay)
+    yield chunk({"role": "assistant", "content": ""})
+    step = 8  # 청크당 문자 수 (약 4토큰)
+    for i in range(0, len(content), step):
+        piece = content[i:i + step]
+        if tokens_per_second > 0:
+            await asyncio.sleep(_estimate_tokens(piece) / tokens_per_second)
+        yield chunk({"content": piece})
+    yield chunk({}, finish_reason)
+    if include_usage:
+        yield chunk({}, with_usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+app = create_app()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 가짜 chat.completions 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    defaults = FakeLLMConfig.from_env()
+    for f in fields(FakeLLMConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", default=getattr(defaults, f.name))
+    args = parser.parse_args()
+
+    config = FakeLLMConfig()
+    config.update({f.name: getattr(args, f.name) for f in fields(FakeLLMConfig)})
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,122 @@
-from fastmcp import FastMCP
-from fastapi import FastAPI, HTTPException
+from fastmcp import FastMCP, Context
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from typing import List, Literal, Optional
 import re
 import os
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 import logging
-from typing import List, Literal, Optional, Dict  # ← Dict 추가
+import time
+import asyncio
+import threading
+import weakref
+import hashlib
+import sqlite3
+import zlib
+from abc import ABC, abstractmethod
+import tempfile
+import uuid
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from functools import partial, wraps
+from itertools import islice
+from typing import Any, List, Literal, Optional, Dict  # ← Dict 추가
+from typing import Callable, Iterable, Iterator, Tuple, Union
 from dataclasses import dataclass                # ← 새로 추가
+import numpy as np
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, GCCollector, Histogram, PlatformCollector, ProcessCollector,
+    generate_latest,
+)
+
+
+# 같은 디렉터리의 모듈은 패키지(`my_mcp_server.server`)로 import될 때는 상대 import로,
+# 이 디렉터리에서 평면 모듈(`server`)로 실행될 때는 최상위 import로 가져옴
+if __package__:
+    # 빠른 JSON 응답(FastJSONResponse)과 br/gzip 응답 압축
+    from .responses import CompressionMiddleware, FastJSONResponse
+    # 순수 CPU 분석 엔진 (RULES / 검증 신호 / 필수 요소 감지 / 문장 분리 / 배치 행 계산)
+    # 병렬 분석 워커는 server.py 대신 이 모듈만 import 합니다.
+    from .analysis_engine import (
+        ELEMENT_DETECTORS,
+        RULES,
+        _ELEMENT_DETECTORS,
+        _GROUP_BITS,
+        _SORTED_GROUP_CODES,
+        _ShardResult,
+        _analyze_shard,
+        _first_keyword_by_rule,
+        _init_analysis_worker,
+        _iter_sentence_spans,
+        _sentence_batch_rows_timed,
+        _shard_text,
+        _span_batch_rows_timed,
+        _validation_issue_ids,
+        _validation_signals,
+    )
+else:
+    from responses import CompressionMiddleware, FastJSONResponse
+    from analysis_engine import (
+        ELEMENT_DETECTORS,
+        RULES,
+        _ELEMENT_DETECTORS,
+        _GROUP_BITS,
+        _SORTED_GROUP_CODES,
+        _ShardResult,
+        _analyze_shard,
+        _first_keyword_by_rule,
+        _init_analysis_worker,
+        _iter_sentence_spans,
+        _sentence_batch_rows_timed,
+        _shard_text,
+        _span_batch_rows_timed,
+        _validation_issue_ids,
+        _validation_signals,
+    )
 
 logger = logging.getLogger(__name__)
 
 # 환경 변수 로드
 load_dotenv()
 
-# OpenAI 클라이언트 초기화
-openai_client = OpenAI()
+# OpenAI 클라이언트 초기화 (비동기: LLM 대기 중에 스레드풀 슬롯을 점유하지 않음)
+# LLM_BASE_URL로 OpenAI 호환 서버(예: 로컬 fake_llm_server.py)를 가리킬 수 있음
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+openai_client = AsyncOpenAI(base_url=LLM_BASE_URL)
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+# 워커 프로세스당 동시에 진행할 수 있는 LLM 호출 수
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
 
 mcp = FastMCP(name="IFRS_S2_Navigator")
 
 # =========================
 # FastAPI REST API 래퍼
 # =========================
+
+@asynccontextmanager
+async def _api_lifespan(app: FastAPI):
+    # 병렬 분석이 켜져 있으면 첫 요청 전에 워커 풀을 미리 띄워 둠
+    _get_analysis_pool()
+    try:
+        yield
+    finally:
+        _shutdown_analysis_pool()
+
+
 api = FastAPI(
     title="IFRS S2 Navigator API",
     description="MCP 도구를 REST API로 직접 호출할 수 있는 래퍼",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=_api_lifespan,
 )
 
 # CORS 설정 (Frontend 직접 호출 허용)
@@ -40,6 +127,78 @@ api.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# 응답 압축 (br/gzip, RESPONSE_COMPRESS_MIN_BYTES 이상만). NDJSON/SSE 스트림 엔드포인트는 그대로 통과
+api.add_middleware(CompressionMiddleware, passthrough_suffixes=("/stream",))
+
+
+# =========================
+# Prometheus 메트릭
+#  - 라벨 조합은 모듈 로드 시 미리 바인딩해 두고, 핫패스에서는 perf_counter 2회 + observe/inc 1회만 수행
+#  - 문장 단위 루프 안이 아니라 요청/단계 단위로만 기록 (요청당 수 μs 이내)
+#  - 전역 REGISTRY 대신 모듈 전용 레지스트리에 등록: 이 모듈이 `server`와 `my_mcp_server.server`로
+#    두 번 import돼도 Duplicated timeseries 오류가 나지 않음 (/metrics는 이 레지스트리를 내보냄)
+# =========================
+
+METRICS_REGISTRY = CollectorRegistry()
+ProcessCollector(registry=METRICS_REGISTRY)
+PlatformCollector(registry=METRICS_REGISTRY)
+GCCollector(registry=METRICS_REGISTRY)
+
+_STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+IFRS_STAGE_SECONDS = Histogram(
+    "ifrs_stage_seconds", "IFRS 엔진 단계별 처리 시간(초)", ["stage"], buckets=_STAGE_BUCKETS,
+    registry=METRICS_REGISTRY,
+)
+_RULE_MATCHING_SECONDS = IFRS_STAGE_SECONDS.labels("rule_matching")
+_SENTENCE_SPLIT_SECONDS = IFRS_STAGE_SECONDS.labels("sentence_splitting")
+_VALIDATION_SECONDS = IFRS_STAGE_SECONDS.labels("validation")
+_CHECKLIST_SECONDS = IFRS_STAGE_SECONDS.labels("checklist")
+
+LLM_REQUEST_SECONDS = Histogram(
+    "ifrs_llm_request_seconds", "LLM API 호출 시간(초, 캐시 적중 제외)", buckets=_LLM_BUCKETS,
+    registry=METRICS_REGISTRY,
+)
+MAPPING_MODE_TOTAL = Counter("ifrs_mapping_mode_total", "모드별 매핑 처리 건수", ["mode"], registry=METRICS_REGISTRY)
+_MAPPING_MODE_COUNTERS = {m: MAPPING_MODE_TOTAL.labels(m) for m in ("fast", "semantic", "accurate", "auto")}
+AUTO_ESCALATIONS_TOTAL = Counter(
+    "ifrs_auto_escalations_total", "auto 모드에서 룰 기반 신뢰도가 낮아 상위 단계로 넘긴 건수", ["target"],
+    registry=METRICS_REGISTRY,
+)
+_AUTO_TO_SEMANTIC = AUTO_ESCALATIONS_TOTAL.labels("semantic")
+_AUTO_TO_LLM = AUTO_ESCALATIONS_TOTAL.labels("llm")
+LLM_FALLBACKS_TOTAL = Counter(
+    "ifrs_llm_fallbacks_total", "LLM 결과 대신 룰 기반 결과로 폴백한 건수", ["reason"], registry=METRICS_REGISTRY,
+)
+LLM_JSON_PARSE_FAILURES_TOTAL = Counter(
+    "ifrs_llm_json_parse_failures_total", "LLM 응답 JSON 파싱 실패 건수", registry=METRICS_REGISTRY,
+)
+LLM_TOKENS_TOTAL = Counter(
+    "ifrs_llm_tokens_total", "LLM 토큰 사용량 (API usage 기준)", ["type"], registry=METRICS_REGISTRY,
+)
+_LLM_PROMPT_TOKENS = LLM_TOKENS_TOTAL.labels("prompt")
+_LLM_COMPLETION_TOKENS = LLM_TOKENS_TOTAL.labels("completion")
+
+
+def _timed(histogram):
+    """함수 실행 시간을 histogram(라벨 바인딩된 자식)에 기록하는 데코레이터."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _observe_batch_stages(rule_seconds: float, validation_seconds: float) -> None:
+    """analysis_engine 배치 행 계산(_span_batch_rows_timed)의 단계별 시간을 기록합니다."""
+    _RULE_MATCHING_SECONDS.observe(rule_seconds)
+    _VALIDATION_SECONDS.observe(validation_seconds)
 
 
 # =========================
@@ -57,6 +216,31 @@ class MappingResult(BaseModel):
     candidates: List[MappingCandidate]
     coverage_comment: str   # 전체 커버리지에 대한 한 줄 코멘트
     confidence: float = 0.0  # 전체 신뢰도 (0~1)
+    degraded: bool = False   # LLM 장애(타임아웃/서킷 오픈 등)로 룰 기반 결과를 대신 돌려준 경우 True
+
+class MapBatchResponse(BaseModel):
+    results: List[MappingResult]   # 요청한 문단 순서와 동일
+    llm_calls: int = 0             # 실제로 수행한 LLM 호출 수
+    llm_items: int = 0             # LLM으로 보낸 문단 수
+    llm_fallbacks: int = 0         # LLM이 빠뜨려 룰 기반 결과로 대체한 문단 수
+
+class SearchHit(BaseModel):
+    doc_id: str
+    kind: Literal["standard", "company"]
+    page: int          # 1부터 시작
+    offset: int        # 페이지 내 패시지 시작 문자 오프셋
+    score: float       # BM25 점수
+    snippet: str       # 패시지 앞부분
+
+class SearchResponse(BaseModel):
+    query: str
+    hits: List[SearchHit]
+    took_ms: float
+
+class IndexDocumentsResponse(BaseModel):
+    segment: str                 # 새로 만든 세그먼트 이름
+    documents: int
+    stats: dict
 
 class ValidationIssue(BaseModel):
     code: str                     # 어떤 IFRS S2 코드/섹션과 관련된 이슈인지
@@ -90,6 +274,9 @@ class SentenceSuggestion(BaseModel):
     ifrs_titles: List[str]            # 예: ["거버넌스(이사회/위원회 역할)", "기후 시나리오 분석"] - UI 표시용 한글 제목
     overall_status: Literal["pass", "partial", "fail"]
     issues: List[ValidationIssue]     # 이 문장에 대해 필요한 수정/추가 정보
+    page: Optional[int] = None        # 파일 업로드 분석에서 문장이 시작한 페이지 (1부터)
+    start: Optional[int] = None       # 원문 내 문장 시작 문자 오프셋 (파일 분석은 page 텍스트 기준)
+    end: Optional[int] = None         # 원문 내 문장 끝 문자 오프셋 (text[start:end] == sentence_text)
 
 
 
@@ -100,6 +287,30 @@ class DemoAnalysisResponse(BaseModel):
     sentence_suggestions: List[SentenceSuggestion]  # 👈 추가
 
 
+class CompactSentenceSuggestion(BaseModel):
+    """
+    SentenceSuggestion의 압축 형태입니다.
+    이슈 본문과 그룹 제목은 응답의 issue_catalog / group_titles에 한 번만 싣고 ID로 참조합니다.
+    """
+    sentence_index: int
+    start: Optional[int] = None
+    end: Optional[int] = None
+    page: Optional[int] = None
+    sentence_text: Optional[str] = None   # 오프셋으로 원문을 복원할 수 없을 때만 (파일 분석)
+    ifrs_codes: List[str]                 # group_titles의 키
+    overall_status: Literal["pass", "partial", "fail"]
+    issue_ids: List[str]                  # issue_catalog의 키
+
+
+class CompactAnalysisResponse(BaseModel):
+    pdf_text: str
+    pdf_meta: dict
+    checklist: List[ChecklistItem]
+    issue_catalog: Dict[str, ValidationIssue]   # 이슈 ID → 이슈 (응답에 등장한 것만)
+    group_titles: Dict[str, str]                # 그룹 코드 → UI 표시용 한글 제목
+    sentence_suggestions: List[CompactSentenceSuggestion]
+
+
 class ElementCheckResult(BaseModel):
     key: str
     label: str
@@ -114,11 +325,32 @@ class EnhanceParagraphRequest(BaseModel):
     user_message: Optional[str] = None   # 사용자가 채팅으로 남긴 추가 요청
 
 
+class EnhanceParagraphStreamRequest(EnhanceParagraphRequest):
+    format: Literal["ndjson", "sse"] = "sse"
+
+
+class EnhanceParagraphBatchRequest(BaseModel):
+    items: List[EnhanceParagraphRequest]
+    concurrency: Optional[int] = None      # 동시 LLM 호출 수 (기본/최대 ENHANCE_BATCH_CONCURRENCY)
+    item_timeout: Optional[float] = None   # 항목별 LLM 데드라인(초) (기본/최대 ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS)
+
+
+class EnhanceParagraphBatchStreamRequest(EnhanceParagraphBatchRequest):
+    format: Literal["ndjson", "sse"] = "sse"
+    order: Literal["ordered", "completed"] = "completed"   # 입력 순서대로 / 끝나는 대로
+
+
 class EnhanceParagraphResponse(BaseModel):
     ifrs_code: str
     ifrs_title: str
     missing_elements: List[ElementCheckResult]
     completed_paragraph: str
+    degraded: bool = False  # LLM 장애로 원문 문단을 그대로 돌려준 경우 True
+
+
+class EnhanceParagraphBatchResponse(BaseModel):
+    results: List[EnhanceParagraphResponse]   # 요청한 항목 순서와 동일
+    degraded: int = 0                         # 원문으로 대체된 항목 수
 
 
 # =========================
@@ -183,87 +415,6 @@ def display_group_name(group_code: str) -> str:
     return group_code
 
 
-# =========================
-# 간단한 키워드 → IFRS S2 코드 룰
-# (데모/프로토타입용)
-# =========================
-
-RULES = [
-    # (키워드 리스트, 코드, 이유)
-    (["governance", "거버넌스", "이사회",
-    "ESG위원회", "ESG 위원회", "ESG 협의체",
-    "기후 관련 위험 및 기회에 대한 이사회의 감독",
-    "기후 관련 위험 및 기회에 대한 경영진의 책임"],
-    "5–7",
-    "기후 관련 리스크와 기회를 감독·관리하는 이사회/위원회/경영진의 역할을 설명하는 내용으로 보입니다."),
-
-
-    (["기후 리스크 관리", "기후 관련 리스크 관리", "기후 관련 위험 관리",
-    "climate risk management",
-    "기후 리스크 식별", "기후 관련 위험 식별",
-    "기후 관련 리스크 평가", "기후 관련 위험 평가"],
-    "24–25",
-    "기후 관련 리스크를 식별·평가·우선순위화·모니터링하는 프로세스를 설명하는 내용으로 보입니다."),
-
-    (["기후 관련 비즈니스 기회", "기후 관련 기회", "climate-related opportunity",
-    "기후 관련 비즈니스", "저탄소 솔루션", "저탄소 서비스", "저탄소 물류"],
-    "10(a)",
-    "기후 관련 비즈니스 기회(저탄소 솔루션·서비스 등)를 설명하는 내용으로 보입니다."),
-
-    (["climate risk", "climate-related risk", "climate-related risks",
-    "기후 리스크", "기후 관련 리스크", "기후변화 리스크",
-    "기후 관련 위험", "전환 리스크", "물리적 리스크",
-    "탄소세", "탄소배출권", "배출권"],
-    "10(b)",
-    "기후 관련 리스크(전환/물리적, 탄소세·배출권 등)가 기업 전망과 재무에 미치는 영향을 다루는 내용으로 보입니다."),
-
-
-    (["value chain", "가치사슬", "supply chain", "밸류체인",
-    "공급망", "협력사", "협력회사", "업스트림 운송", "다운스트림"],
-    "13",
-    "기후 관련 리스크와 기회가 비즈니스 모델과 가치사슬(공급망, 협력사 등)에 미치는 영향을 설명하는 내용으로 보입니다."),
-
-    (["기후변화 대응 전략", "기후변화 대응", "기후 관련 대응 방안",
-    "탄소중립", "탄소 중립", "Net Zero Roadmap", "넷제로 로드맵",
-    "온실가스 감축 활동", "재생에너지 확대", "전환 계획", "transition plan"],
-    "14",
-    "기후 관련 리스크와 기회에 대응하기 위한 전략·전환 계획(transition plan)과 주요 실행 과제를 설명하는 내용으로 보입니다."),
-
-
-
-    (["재무영향", "재무 영향", "재무적 영향",
-    "매출", "영업이익", "비용", "손익",
-    "현금흐름", "cash flow", "cash flows",
-    "재무상태표", "손익계산서"],
-    "15–16",
-    "기후 관련 리스크와 기회가 재무상태·재무성과·현금흐름에 미치는 현재 및 예상 재무적 영향을 설명하는 내용으로 보입니다."),
-
-
-    (["기후 시나리오", "시나리오 분석", "scenario analysis",
-    "1.5℃ 시나리오", "2℃ 시나리오", "RCP", "탄소가격 시나리오"],
-    "22–23,25",
-    "기후 관련 시나리오 분석과 그 결과를 활용한 기후 탄력성 평가 및 리스크 식별을 설명하는 내용으로 보입니다."),
-
-
-    (["감축 목표", "온실가스 감축", "배출량 감축 목표",
-    "net zero", "Net Zero", "넷제로",
-    "재생에너지 100", "재생에너지 100%"],
-    "33–36",
-    "온실가스 배출 및 에너지 전환과 관련된 정량적 목표와 그 이행 현황을 설명하는 내용으로 보입니다."),
-
-
-    (["Scope 1", "Scope 2", "Scope 3", "scope 1", "scope 2", "scope 3",
-    "스코프1", "스코프2", "스코프3",
-    "tCO2eq", "온실가스 배출량"],
-    "29(a)–29(c)",
-    "Scope 1/2/3 온실가스 배출량 등 핵심 배출 지표를 공시하는 내용으로 보입니다."),
-]
-
-def _has_number(text: str) -> bool:
-    """정량 정보(숫자)가 들어있는지 간단히 체크."""
-    return bool(re.search(r"\d", text))
-
-
 def _calculate_confidence(result: MappingResult) -> float:
     """
     MappingResult의 신뢰도를 계산합니다.
@@ -310,21 +461,23 @@ def _calculate_confidence(result: MappingResult) -> float:
     return confidence
 
 
+@_timed(_RULE_MATCHING_SECONDS)
 def _rule_based_mapping(raw_text: str) -> MappingResult:
-    text_lower = raw_text.lower()
+    # 룰별 대표 키워드 (공백/대소문자 변형 포함)
+    first_keywords = _first_keyword_by_rule(raw_text)
 
     # code별로 매칭된 키워드를 모아두기
     hits_by_code: dict[str, dict] = {}
-    for keywords, code, reason in RULES:
-        for kw in keywords:
-            if kw.lower() in text_lower:
-                if code not in hits_by_code:
-                    hits_by_code[code] = {
-                        "reason": reason,
-                        "keywords": set(),
-                    }
-                hits_by_code[code]["keywords"].add(kw)
-                break  # 같은 룰에서 키워드는 하나만 잡고 다음 룰로
+    for rule_index, (_keywords, code, reason) in enumerate(RULES):
+        kw = first_keywords.get(rule_index)
+        if kw is None:
+            continue
+        if code not in hits_by_code:
+            hits_by_code[code] = {
+                "reason": reason,
+                "keywords": set(),
+            }
+        hits_by_code[code]["keywords"].add(kw)  # 같은 룰에서 키워드는 하나만
 
     candidates: List[MappingCandidate] = []
 
@@ -370,6 +523,1012 @@ def _rule_based_mapping(raw_text: str) -> MappingResult:
     return result
 
 
+# =========================
+# LLM 응답 캐시
+#  - 키: (모델, 시스템 프롬프트, 사용자 프롬프트, temperature, max_tokens)의 SHA-256
+#  - 1단계: 메모리 LRU (바이트 크기 제한)
+#  - 2단계: 디스크 SQLite (TTL + 항목 수 제한)
+#  - 2단계 저장소는 LLMCacheBackend를 구현해 교체 가능 (레플리카 간 공유 캐시 등)
+# =========================
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MEMORY_MAX_BYTES = int(os.getenv("LLM_CACHE_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_SQLITE_PATH = os.getenv(
+    "LLM_CACHE_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache", "llm_cache.sqlite3"),
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+
+def llm_cache_key(model: str, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+    payload = json.dumps([model, system_prompt, user_prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCacheBackend(ABC):
+    """
+    LLM 응답 캐시 저장소 인터페이스.
+    여러 레플리카가 캐시를 공유하려면 이 클래스를 구현(Redis 등)해서 set_llm_cache_backend로 교체하면 됩니다.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryLRUCache(LLMCacheBackend):
+    """값의 UTF-8 바이트 합계가 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 버리는 LRU."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _key, (_value, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class SQLiteCache(LLMCacheBackend):
+    """
+    TTL이 지난 항목은 무시하고, max_entries를 넘으면 가장 오래 안 쓴 항목부터 지우는 디스크 캐시.
+    디렉터리/DB 파일은 처음 사용할 때 만듭니다. (import만 하는 프로세스는 디스크를 건드리지 않음)
+    """
+
+    # set 몇 번마다 만료/초과 항목을 정리할지
+    _EVICT_EVERY = 64
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sets = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """self._lock을 잡은 상태에서 호출합니다."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._sets += 1
+            if self._sets % self._EVICT_EVERY == 0:
+                self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"path": self.path, "entries": entries, "ttl_seconds": self.ttl_seconds, "max_entries": self.max_entries}
+
+
+class TieredLLMCache:
+    """
+    메모리 LRU → 영속 백엔드 순으로 조회하고, 하위 단계 히트는 메모리로 올립니다.
+    이벤트 루프에서는 aget / set_nowait를 사용합니다. (영속 단계의 디스크/네트워크 I/O는 스레드에서 실행)
+    """
+
+    def __init__(self, memory: Optional[MemoryLRUCache], persistent: Optional[LLMCacheBackend]):
+        self.memory = memory
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "bytes_served": 0, "bytes_stored": 0}
+        self._pending_writes: set = set()   # 진행 중인 백그라운드 영속 쓰기 (GC 방지용 참조)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        if self.memory is None:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            self._count("bytes_served", len(value.encode("utf-8")))
+        return value
+
+    def _persistent_get(self, key: str) -> Optional[str]:
+        if self.persistent is None:
+            return None
+        try:
+            value = self.persistent.get(key)
+        except Exception as e:
+            logger.error(f"LLM cache backend get error: {e}")
+            return None
+        if value is not None:
+            self._count("persistent_hits")
+            self._count("bytes_served", len(value.encode("utf-8")))
+            if self.memory is not None:
+                self.memory.set(key, value)
+        return value
+
+    def _persistent_set(self, key: str, value: str) -> None:
+        try:
+            self.persistent.set(key, value)
+        except Exception as e:
+            logger.error(f"LLM cache backend set error: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._memory_get(key)
+        if value is None:
+            value = self._persistent_get(key)
+        if value is None:
+            self._count("misses")
+        return value
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get의 비동기 버전. 메모리 미스일 때만 영속 단계 조회를 스레드로 넘깁니다."""
+        value = self._memory_get(key)
+        if value is None and self.persistent is not None:
+            value = await asyncio.to_thread(self._persistent_get, key)
+        if value is None:
+            self._count("misses")
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._count("bytes_stored", len(value.encode("utf-8")))
+        if self.memory is not None:
+            self.memory.set(key, value)
+        if self.persistent is not None:
+            self._persistent_set(key, value)
+
+    def set_nowait(self, key: str, value: str) -> None:
+        """
+        set의 이벤트 루프용 버전. 메모리에는 바로 넣고, 영속 단계 쓰기는 스레드에서 백그라운드로 진행합니다.
+        (실행 중인 이벤트 루프 안에서만 호출)
+        """
+        self._count("bytes_stored", len(value.encode("utf-8")))
+        if self.memory is not None:
+            self.memory.set(key, value)
+        if self.persistent is not None:
+            task = asyncio.ensure_future(asyncio.to_thread(self._persistent_set, key, value))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["memory_hits"] + counters["persistent_hits"] + counters["misses"]
+        counters["hit_rate"] = (lookups - counters["misses"]) / lookups if lookups else 0.0
+        return {
+            "enabled": LLM_CACHE_ENABLED,
+            "counters": counters,
+            "memory": self.memory.stats() if self.memory is not None else None,
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+        }
+
+
+def _build_default_llm_cache() -> TieredLLMCache:
+    persistent: Optional[LLMCacheBackend] = None
+    if LLM_CACHE_SQLITE_PATH:
+        # 디스크를 열다 실패하면 TieredLLMCache가 로그만 남기고 메모리 단계로 계속 동작
+        persistent = SQLiteCache(LLM_CACHE_SQLITE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_DISK_MAX_ENTRIES)
+    return TieredLLMCache(MemoryLRUCache(LLM_CACHE_MEMORY_MAX_BYTES), persistent)
+
+
+llm_cache = _build_default_llm_cache()
+
+
+def set_llm_cache_backend(backend: Optional[LLMCacheBackend]) -> None:
+    """영속 캐시 단계를 교체합니다 (None이면 메모리 LRU만 사용)."""
+    llm_cache.persistent = backend
+
+
+# 이벤트 루프별 LLM 동시 호출 제한 (MCP 서버와 REST API가 서로 다른 루프에서 돌 수 있음)
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _llm_semaphores[loop] = semaphore
+    return semaphore
+
+
+# =========================
+# LLM 토큰 사용량 집계 & 예산
+#  - 호출마다 usage(prompt/completion 토큰)를 (테넌트 헤더, 엔드포인트)별로 누적
+#  - 분/일 단위 토큰·요청 예산(0이면 무제한). 사용률이 LLM_BUDGET_SOFT_RATIO를 넘으면
+#    auto 모드의 LLM 승격 임계값을 선형으로 낮추고, 예산이 다 차면 룰 기반 결과만 반환
+#  - 호출을 허용하는 시점에 추정 토큰(프롬프트 + max_tokens)을 예약하고 응답 usage로 정산:
+#    동시에 들어온 호출들이 아직 usage가 반영되지 않은 예산을 같이 보고 한도를 넘기지 않도록 함
+#  - 예산은 프로세스 단위이며, 캐시 적중은 사용량에 포함하지 않음
+# =========================
+
+LLM_TENANT_HEADER = os.getenv("LLM_TENANT_HEADER", "X-Tenant-Id")
+LLM_BUDGET_TOKENS_PER_MINUTE = int(os.getenv("LLM_BUDGET_TOKENS_PER_MINUTE", "0"))
+LLM_BUDGET_TOKENS_PER_DAY = int(os.getenv("LLM_BUDGET_TOKENS_PER_DAY", "0"))
+LLM_BUDGET_REQUESTS_PER_MINUTE = int(os.getenv("LLM_BUDGET_REQUESTS_PER_MINUTE", "0"))
+LLM_BUDGET_REQUESTS_PER_DAY = int(os.getenv("LLM_BUDGET_REQUESTS_PER_DAY", "0"))
+LLM_BUDGET_SOFT_RATIO = float(os.getenv("LLM_BUDGET_SOFT_RATIO", "0.8"))
+# (테넌트, 엔드포인트) 조합 수 상한. 넘으면 "(other)"로 합산
+LLM_USAGE_MAX_KEYS = int(os.getenv("LLM_USAGE_MAX_KEYS", "1024"))
+
+AUTO_ESCALATION_THRESHOLD = 0.7
+# 사용률이 LLM_BUDGET_SOFT_RATIO를 넘어 승격 임계값이 낮아진 경우 / 예산이 다 찬 경우
+LLM_BUDGET_THROTTLED_NOTE = "(LLM 사용 예산 소진이 가까워 LLM 분석 대상을 줄였으며, 이 결과는 룰 기반입니다.)"
+LLM_BUDGET_EXHAUSTED_NOTE = "(LLM 사용 예산 한도에 도달해 룰 기반 결과만 제공합니다.)"
+
+# 현재 요청의 (테넌트, 엔드포인트). REST 요청은 미들웨어가 설정하고, 그 외(MCP 툴 등)는 기본값
+_llm_call_context: "contextvars.ContextVar[Tuple[str, str]]" = contextvars.ContextVar(
+    "llm_call_context", default=("default", "internal")
+)
+
+
+@dataclass
+class LLMBudgetReservation:
+    """호출 허용 시 잡아 둔 예산. 예약한 분/일 윈도가 지나면 정산 때 빼지 않습니다."""
+    minute: int
+    day: int
+    tokens: int
+    requests: int
+    claimed: bool = False   # 실제 LLM 호출이 이 예약을 넘겨받았으면 True (요청 수는 되돌리지 않음)
+
+
+class LLMUsageTracker:
+    """
+    LLM 호출 사용량 집계와 분/일 고정 윈도 예산을 관리합니다.
+    호출을 허용할 때 요청 수와 추정 토큰을 예약하고, 응답의 usage를 받으면 추정치를 실제 값으로 바꿉니다.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        tokens_per_day: int,
+        requests_per_minute: int,
+        requests_per_day: int,
+        soft_ratio: float,
+        max_keys: int,
+    ):
+        self.limits = {
+            "tokens_per_minute": tokens_per_minute,
+            "tokens_per_day": tokens_per_day,
+            "requests_per_minute": requests_per_minute,
+            "requests_per_day": requests_per_day,
+        }
+        self.soft_ratio = min(max(soft_ratio, 0.0), 1.0)
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._minute = -1
+        self._day = -1
+        self._used = dict.fromkeys(self.limits, 0)
+        # (tenant, endpoint) → [calls, prompt_tokens, completion_tokens]
+        self._by_key: Dict[Tuple[str, str], List[int]] = {}
+
+    def _roll(self, now: float) -> None:
+        minute, day = int(now // 60), int(now // 86400)
+        if minute != self._minute:
+            self._minute = minute
+            self._used["tokens_per_minute"] = self._used["requests_per_minute"] = 0
+        if day != self._day:
+            self._day = day
+            self._used["tokens_per_day"] = self._used["requests_per_day"] = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._roll(time.time())
+            self._used["requests_per_minute"] += 1
+            self._used["requests_per_day"] += 1
+
+    def _utilization_locked(self, extra_tokens: int = 0, extra_requests: int = 0) -> float:
+        ratios = [
+            (self._used[k] + (extra_tokens if k.startswith("tokens") else extra_requests)) / limit
+            for k, limit in self.limits.items()
+            if limit > 0
+        ]
+        return max(ratios, default=0.0)
+
+    def _reserve_locked(self, tokens: int, requests: int) -> LLMBudgetReservation:
+        self._used["tokens_per_minute"] += tokens
+        self._used["tokens_per_day"] += tokens
+        self._used["requests_per_minute"] += requests
+        self._used["requests_per_day"] += requests
+        return LLMBudgetReservation(self._minute, self._day, tokens, requests)
+
+    def _release_locked(self, reservation: LLMBudgetReservation) -> None:
+        requests = 0 if reservation.claimed else reservation.requests
+        if reservation.minute == self._minute:
+            self._used["tokens_per_minute"] -= reservation.tokens
+            self._used["requests_per_minute"] -= requests
+        if reservation.day == self._day:
+            self._used["tokens_per_day"] -= reservation.tokens
+            self._used["requests_per_day"] -= requests
+        reservation.tokens = 0
+        reservation.requests -= requests
+
+    def reserve(self, tokens: int, requests: int = 1) -> LLMBudgetReservation:
+        """한도와 관계없이 예약합니다. (이미 허용된 호출, 예산 대상이 아닌 모드의 호출)"""
+        with self._lock:
+            self._roll(time.time())
+            return self._reserve_locked(tokens, requests)
+
+    def admit(
+        self,
+        confidence: float,
+        tokens: int,
+        requests: int = 1,
+        base: float = AUTO_ESCALATION_THRESHOLD,
+    ) -> Tuple[Optional[LLMBudgetReservation], Optional[str]]:
+        """
+        auto 모드 LLM 승격 여부를 판단하고, 허용하면 같은 잠금 안에서 예산을 예약합니다.
+        (예약, None) 또는 (None, 거절 사유 문구)를 반환합니다.
+        """
+        with self._lock:
+            self._roll(time.time())
+            if self._utilization_locked(tokens, requests) > 1.0:
+                return None, LLM_BUDGET_EXHAUSTED_NOTE
+            if confidence >= self._threshold(self._utilization_locked(), base):
+                return None, LLM_BUDGET_THROTTLED_NOTE
+            return self._reserve_locked(tokens, requests), None
+
+    def release(self, reservations: Iterable[LLMBudgetReservation]) -> None:
+        """쓰지 않은(또는 정산할) 예약을 되돌립니다. 여러 번 호출해도 안전합니다."""
+        with self._lock:
+            self._roll(time.time())
+            for reservation in reservations:
+                self._release_locked(reservation)
+
+    def record_usage(
+        self,
+        tenant: str,
+        endpoint: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        reservations: Iterable[LLMBudgetReservation] = (),
+    ) -> None:
+        total = prompt_tokens + completion_tokens
+        with self._lock:
+            self._roll(time.time())
+            for reservation in reservations:
+                self._release_locked(reservation)
+            self._used["tokens_per_minute"] += total
+            self._used["tokens_per_day"] += total
+            key = (tenant, endpoint)
+            row = self._by_key.get(key)
+            if row is None:
+                if len(self._by_key) >= self.max_keys:
+                    key = ("(other)", "(other)")
+                row = self._by_key.setdefault(key, [0, 0, 0])
+            row[0] += 1
+            row[1] += prompt_tokens
+            row[2] += completion_tokens
+
+    def utilization(self) -> float:
+        """설정된 예산 중 가장 많이 소진된 비율 (예산이 없으면 0, 예약분 포함)."""
+        with self._lock:
+            self._roll(time.time())
+            return self._utilization_locked()
+
+    def escalation_threshold(self, base: float = AUTO_ESCALATION_THRESHOLD) -> float:
+        """
+        auto 모드의 LLM 승격 임계값. 사용률이 soft_ratio 이하면 base 그대로,
+        그 이상이면 1.0에서 0이 되도록 선형으로 낮춤 (0이면 LLM 승격 없음).
+        """
+        return self._threshold(self.utilization(), base)
+
+    def _threshold(self, usage: float, base: float) -> float:
+        if usage <= self.soft_ratio:
+            return base
+        if usage >= 1.0 or self.soft_ratio >= 1.0:
+            return 0.0
+        return base * (1.0 - usage) / (1.0 - self.soft_ratio)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._roll(time.time())
+            used = dict(self._used)
+            rows = [
+                {
+                    "tenant": tenant,
+                    "endpoint": endpoint,
+                    "calls": calls,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                }
+                for (tenant, endpoint), (calls, prompt_tokens, completion_tokens) in self._by_key.items()
+            ]
+        return {
+            "budgets": {k: {"limit": limit, "used": used[k]} for k, limit in self.limits.items()},
+            "utilization": self.utilization(),
+            "escalation_threshold": self.escalation_threshold(),
+            "usage": rows,
+        }
+
+
+llm_usage = LLMUsageTracker(
+    LLM_BUDGET_TOKENS_PER_MINUTE,
+    LLM_BUDGET_TOKENS_PER_DAY,
+    LLM_BUDGET_REQUESTS_PER_MINUTE,
+    LLM_BUDGET_REQUESTS_PER_DAY,
+    LLM_BUDGET_SOFT_RATIO,
+    LLM_USAGE_MAX_KEYS,
+)
+
+
+class _LLMUsageContextMiddleware:
+    """요청의 테넌트 헤더와 경로를 LLM 사용량 집계 컨텍스트로 설정하는 ASGI 미들웨어."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        header = LLM_TENANT_HEADER.lower().encode("latin-1")
+        tenant = "default"
+        for name, value in scope.get("headers", ()):
+            if name == header:
+                tenant = value.decode("latin-1")[:64] or "default"
+                break
+        token = _llm_call_context.set((tenant, scope.get("path", "")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _llm_call_context.reset(token)
+
+
+api.add_middleware(_LLMUsageContextMiddleware)
+
+
+def _budget_limited(result: MappingResult, note: str) -> MappingResult:
+    """예산 때문에 LLM으로 승격하지 못한 결과임을 coverage_comment에 표시합니다. (note: admit의 거절 사유)"""
+    return result.model_copy(update={"coverage_comment": f"{result.coverage_comment} {note}"})
+
+
+# auto 모드가 admit으로 잡아 둔 예약. 이 컨텍스트 안의 LLM 호출이 넘겨받아 응답 usage로 정산
+_llm_budget_reservations: "contextvars.ContextVar[Tuple[LLMBudgetReservation, ...]]" = contextvars.ContextVar(
+    "llm_budget_reservations", default=()
+)
+
+
+def _claim_budget_reservations(estimated_tokens: int) -> List[LLMBudgetReservation]:
+    """
+    LLM 호출 직전에 호출합니다. 컨텍스트에 아직 안 쓴 예약이 있으면 넘겨받고,
+    없으면(accurate 모드, 문단 보강 등) 추정 토큰만큼 새로 예약합니다.
+    """
+    reservations = [r for r in _llm_budget_reservations.get() if not r.claimed]
+    if not reservations:
+        return [llm_usage.reserve(estimated_tokens)]
+    if not any(r.requests for r in reservations):
+        llm_usage.record_request()   # 배치 항목 예약은 토큰만 잡으므로 요청 수는 여기서 반영
+    for reservation in reservations:
+        reservation.claimed = True
+    return reservations
+
+
+async def _with_budget_reservations(reservations: List[LLMBudgetReservation], call: Callable[[], Any]) -> Any:
+    """reservations를 컨텍스트에 두고 call()을 실행합니다. 끝나면 정산되지 않은 예약을 되돌립니다."""
+    token = _llm_budget_reservations.set(tuple(reservations))
+    try:
+        return await call()
+    finally:
+        _llm_budget_reservations.reset(token)
+        llm_usage.release(reservations)
+
+
+# =========================
+# Single-flight: 동시에 들어온 동일 LLM 작업 합치기
+#  - 같은 키의 작업이 진행 중이면 새로 호출하지 않고 그 결과(또는 예외)를 함께 받음
+#  - 영속 캐시가 아님: 작업이 끝나는 즉시 키를 지움
+#  - 작업은 별도 Task로 돌리므로 먼저 온 요청이 취소돼도 나머지는 결과를 받음
+# =========================
+
+SINGLEFLIGHT_TOTAL = Counter(
+    "ifrs_singleflight_total", "single-flight 호출 수 (leader: 실제 실행, shared: 진행 중 작업 결과 공유)", ["flight", "role"],
+    registry=METRICS_REGISTRY,
+)
+
+
+def _normalize_flight_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._leader = SINGLEFLIGHT_TOTAL.labels(name, "leader")
+        self._shared = SINGLEFLIGHT_TOTAL.labels(name, "shared")
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+    async def do(self, key: tuple, factory):
+        """key가 같은 작업이 진행 중이면 그 결과를, 아니면 factory()를 실행한 결과를 반환합니다."""
+        loop = asyncio.get_running_loop()
+        calls = self._calls.get(loop)
+        if calls is None:
+            calls = self._calls[loop] = {}
+
+        task = calls.get(key)
+        if task is None:
+            task = loop.create_task(factory())
+            calls[key] = task
+            task.add_done_callback(lambda t: self._finish(calls, key, t))
+            self._leader.inc()
+        else:
+            self._shared.inc()
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finish(calls: Dict[tuple, asyncio.Task], key: tuple, task: asyncio.Task) -> None:
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            task.exception()  # 기다리던 요청이 모두 취소된 경우 "never retrieved" 경고 방지
+
+
+llm_mapping_flight = SingleFlight("llm_mapping")
+enhance_paragraph_flight = SingleFlight("enhance_paragraph")
+
+
+# =========================
+# LLM 호출 보호: 데드라인 / 헤지 요청 / 서킷 브레이커
+#  - 호출마다 LLM_CALL_TIMEOUT_SECONDS(배치는 LLM_BATCH_CALL_TIMEOUT_SECONDS) 안에 끝나지 않으면 취소
+#  - LLM_HEDGE_ENABLED=1이면 최근 지연 p95만큼 기다려도 응답이 없을 때 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+#  - 최근 호출 중 실패(예외/타임아웃/LLM_BREAKER_SLOW_SECONDS 초과)가 일정 비율을 넘으면 서킷을 열고,
+#    LLM_BREAKER_COOLDOWN_SECONDS 동안 호출 없이 바로 실패 → 호출부는 룰 기반 결과/원문으로 degraded 응답
+#  - 쿨다운 뒤에는 시험 호출 1건만 허용해 성공하면 닫고, 실패하면 다시 엶
+#  - allow()가 준 티켓으로 결과를 기록: 서킷이 열리기 전에 허용된 호출의 늦은 결과는 무시하고,
+#    half_open 판정은 시험 호출 티켓의 결과로만 내림
+#  - 동시 호출 슬롯 대기도 데드라인에 포함하고, 헤지 요청은 빈 슬롯이 있을 때만 보냄 (LLM_MAX_CONCURRENCY 준수)
+# =========================
+
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "30"))
+LLM_BATCH_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_BATCH_CALL_TIMEOUT_SECONDS", "90"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))       # p95를 믿을 만한 최소 표본 수
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))             # 최근 호출 몇 건으로 판단할지
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_FAILURE_RATIO = float(os.getenv("LLM_BREAKER_FAILURE_RATIO", "0.5"))
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "20"))  # 0이면 지연은 실패로 보지 않음
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+LLM_HEDGES_TOTAL = Counter(
+    "ifrs_llm_hedges_total", "헤지 요청 수 (sent: 보냄, won: 헤지 응답이 먼저 옴)", ["outcome"], registry=METRICS_REGISTRY,
+)
+_LLM_HEDGES_SENT = LLM_HEDGES_TOTAL.labels("sent")
+_LLM_HEDGES_WON = LLM_HEDGES_TOTAL.labels("won")
+LLM_TIMEOUTS_TOTAL = Counter(
+    "ifrs_llm_timeouts_total", "데드라인을 넘겨 취소된 LLM 호출 수", registry=METRICS_REGISTRY,
+)
+LLM_SHORT_CIRCUITS_TOTAL = Counter(
+    "ifrs_llm_short_circuits_total", "서킷이 열려 있어 보내지 않은 LLM 호출 수", registry=METRICS_REGISTRY,
+)
+
+
+class LLMUnavailableError(Exception):
+    """서킷 브레이커가 열려 LLM을 호출하지 않았음을 나타냅니다."""
+
+
+class _LatencyWindow:
+    """최근 성공 호출 지연을 보관하고 헤지 대기 시간(p95)을 계산합니다."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(p95, LLM_HEDGE_MIN_DELAY_SECONDS)
+
+
+@dataclass(eq=False)
+class BreakerTicket:
+    """CircuitBreaker.allow()가 허용한 호출 1건. record()/release()에 그대로 넘깁니다."""
+    generation: int       # 허용 시점의 서킷 세대 (서킷이 열릴 때마다 1 증가)
+    probe: bool = False   # half_open 시험 호출이면 True
+
+
+class CircuitBreaker:
+    """최근 N건의 실패 비율로 열리고, 쿨다운 후 시험 호출 1건으로 닫히는 서킷 브레이커."""
+
+    def __init__(self, window: int, min_calls: int, failure_ratio: float, slow_seconds: float, cooldown_seconds: float):
+        self.min_calls = max(1, min_calls)
+        self.failure_ratio = failure_ratio
+        self.slow_seconds = slow_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._outcomes: deque = deque(maxlen=max(1, window))  # True = 실패
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._generation = 0
+        self._probe: Optional[BreakerTicket] = None   # 진행 중인 시험 호출
+        self._opens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> Optional[BreakerTicket]:
+        """호출해도 되면 티켓, 아니면 None. half_open에서는 시험 호출 1건만 허용합니다."""
+        with self._lock:
+            if self._opened_at is None:
+                return BreakerTicket(self._generation)
+            if time.monotonic() - self._opened_at < self.cooldown_seconds or self._probe is not None:
+                return None
+            self._probe = BreakerTicket(self._generation, probe=True)
+            return self._probe
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._generation += 1
+
+    def record(self, ticket: BreakerTicket, ok: bool, elapsed: float) -> None:
+        failed = not ok or (self.slow_seconds > 0 and elapsed >= self.slow_seconds)
+        with self._lock:
+            if ticket.probe:
+                if ticket is not self._probe:
+                    return   # 이미 정리된 시험 호출
+                self._probe = None
+                if failed:
+                    self._open()
+                else:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                    self._failures = 0
+                return
+            if ticket.generation != self._generation or self._opened_at is not None:
+                return   # 서킷이 열리기 전에 허용된 호출의 늦은 결과
+            if len(self._outcomes) == self._outcomes.maxlen and self._outcomes[0]:
+                self._failures -= 1
+            self._outcomes.append(failed)
+            self._failures += failed
+            if len(self._outcomes) >= self.min_calls and self._failures / len(self._outcomes) >= self.failure_ratio:
+                self._open()
+                self._opens += 1
+                logger.warning(f"LLM circuit opened: {self._failures}/{len(self._outcomes)} recent calls failed")
+
+    def release(self, ticket: BreakerTicket) -> None:
+        """결과 없이 끝난 호출(취소, 슬롯 대기 초과 등). 시험 호출이었다면 다음 요청이 다시 시험할 수 있게 합니다."""
+        with self._lock:
+            if ticket is self._probe:
+                self._probe = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent, failures = len(self._outcomes), self._failures
+        return {"state": self.state, "recent_calls": recent, "recent_failures": failures, "opens": self._opens}
+
+
+llm_breaker = CircuitBreaker(
+    LLM_BREAKER_WINDOW,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_FAILURE_RATIO,
+    LLM_BREAKER_SLOW_SECONDS,
+    LLM_BREAKER_COOLDOWN_SECONDS,
+)
+llm_latency = _LatencyWindow()
+
+
+async def _acquire_llm_slot(
+    semaphore: asyncio.Semaphore,
+    deadline: float,
+    ticket: BreakerTicket,
+    reservations: List[LLMBudgetReservation],
+) -> None:
+    """
+    데드라인(perf_counter 기준) 안에 동시 호출 슬롯을 얻습니다.
+    못 얻으면(타임아웃/취소) 요청이 LLM에 가지 않았으므로 서킷 판정 없이 티켓과 예산 예약을 되돌리고 예외를 올립니다.
+    """
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, deadline - time.perf_counter()))
+    except BaseException as e:   # TimeoutError, CancelledError
+        if isinstance(e, asyncio.TimeoutError):
+            LLM_TIMEOUTS_TOTAL.inc()
+        llm_breaker.release(ticket)
+        llm_usage.release(reservations)
+        raise
+
+
+async def _hedged_completion(semaphore: asyncio.Semaphore, **request):
+    """
+    chat.completions.create를 호출하고, 헤지가 켜져 있으면 p95 지연 뒤 두 번째 요청을 보내
+    먼저 성공한 응답을 반환합니다. 둘 다 실패하면 마지막 예외를 올립니다.
+    호출부가 잡은 슬롯은 첫 요청용이며, 헤지 요청은 semaphore에 빈 슬롯이 있을 때만 하나 더 잡아 보냅니다.
+    """
+    delay = llm_latency.hedge_delay() if LLM_HEDGE_ENABLED else None
+    if delay is None:
+        return await openai_client.chat.completions.create(**request)
+
+    first = asyncio.ensure_future(openai_client.chat.completions.create(**request))
+    tasks = [first]
+    try:
+        done, _pending = await asyncio.wait(tasks, timeout=delay)
+        if not done and not semaphore.locked():
+            await semaphore.acquire()   # 빈 슬롯이 있으므로 바로 반환
+            _LLM_HEDGES_SENT.inc()
+            llm_usage.record_request()
+            hedge = asyncio.ensure_future(openai_client.chat.completions.create(**request))
+            hedge.add_done_callback(lambda _task: semaphore.release())
+            tasks.append(hedge)
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        _LLM_HEDGES_WON.inc()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _chat_completion_text(
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    timeout: Optional[float] = None,
+    validate: Optional[Callable[[str], bool]] = None,
+    caller_deadline: bool = False,
+) -> str:
+    """
+    chat.completions 호출 결과 텍스트를 반환합니다. 같은 입력은 캐시에서 바로 돌려줍니다.
+    비어 있는 응답과 예외, validate(응답)가 False인 응답(파싱 불가 등)은 캐시하지 않습니다.
+    동시 호출 수는 LLM_MAX_CONCURRENCY로 제한됩니다.
+    timeout(기본 LLM_CALL_TIMEOUT_SECONDS, 슬롯 대기 포함)을 넘기면 asyncio.TimeoutError,
+    서킷이 열려 있으면 LLMUnavailableError를 올립니다.
+    caller_deadline=True면 timeout은 호출부(API 요청자)가 기본보다 짧게 정한 데드라인이므로,
+    넘겨도 서킷 브레이커에 LLM 실패로 기록하지 않습니다.
+    """
+    key = llm_cache_key(LLM_MODEL, system_prompt, user_prompt, temperature, max_tokens)
+    if LLM_CACHE_ENABLED:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return cached
+
+    ticket = llm_breaker.allow()
+    if ticket is None:
+        LLM_SHORT_CIRCUITS_TOTAL.inc()
+        raise LLMUnavailableError("LLM circuit breaker is open")
+
+    reservations = _claim_budget_reservations(
+        _estimate_tokens(system_prompt) + _estimate_tokens(user_prompt) + max_tokens
+    )
+    deadline = time.perf_counter() + (LLM_CALL_TIMEOUT_SECONDS if timeout is None else timeout)
+    semaphore = _llm_semaphore()
+    await _acquire_llm_slot(semaphore, deadline, ticket, reservations)
+    try:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                _hedged_completion(
+                    semaphore,
+                    model=LLM_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                ),
+                timeout=deadline - started,
+            )
+        except asyncio.CancelledError:
+            llm_breaker.release(ticket)
+            llm_usage.release(reservations)
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                LLM_TIMEOUTS_TOTAL.inc()
+            if caller_deadline and isinstance(e, asyncio.TimeoutError):
+                llm_breaker.release(ticket)
+            else:
+                llm_breaker.record(ticket, False, time.perf_counter() - started)
+            llm_usage.release(reservations)
+            raise
+        elapsed = time.perf_counter() - started
+        llm_breaker.record(ticket, True, elapsed)
+        llm_latency.add(elapsed)
+        LLM_REQUEST_SECONDS.observe(elapsed)
+    finally:
+        semaphore.release()
+    content = response.choices[0].message.content or ""
+    _record_llm_usage(system_prompt, user_prompt, getattr(response, "usage", None), content, reservations)
+
+    if LLM_CACHE_ENABLED and content.strip() and (validate is None or validate(content)):
+        llm_cache.set_nowait(key, content)
+    return content
+
+
+async def _stream_chat_completion_text(
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    _chat_completion_text의 스트리밍 버전. 생성되는 텍스트 조각을 차례로 내보냅니다.
+    캐시 적중이면 전체 텍스트를 한 번에 내보내고, 끝까지 받은 응답은 같은 키로 캐시에 저장합니다.
+    timeout은 동시 호출 슬롯 대기부터 마지막 토큰까지 전체에 적용됩니다. 스트리밍은 헤지하지 않습니다.
+    """
+    key = llm_cache_key(LLM_MODEL, system_prompt, user_prompt, temperature, max_tokens)
+    if LLM_CACHE_ENABLED:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+
+    ticket = llm_breaker.allow()
+    if ticket is None:
+        LLM_SHORT_CIRCUITS_TOTAL.inc()
+        raise LLMUnavailableError("LLM circuit breaker is open")
+
+    reservations = _claim_budget_reservations(
+        _estimate_tokens(system_prompt) + _estimate_tokens(user_prompt) + max_tokens
+    )
+    deadline = time.perf_counter() + (LLM_CALL_TIMEOUT_SECONDS if timeout is None else timeout)
+    parts: List[str] = []
+    usage = None
+    semaphore = _llm_semaphore()
+    await _acquire_llm_slot(semaphore, deadline, ticket, reservations)
+    try:
+        started = time.perf_counter()
+        stream = None
+        try:
+            stream = await asyncio.wait_for(
+                openai_client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                timeout=deadline - time.perf_counter(),
+            )
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - time.perf_counter())
+                except StopAsyncIteration:
+                    break
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    delta = chunk.choices[0].delta.content
+                    parts.append(delta)
+                    yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            llm_breaker.release(ticket)
+            llm_usage.release(reservations)
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                LLM_TIMEOUTS_TOTAL.inc()
+            llm_breaker.record(ticket, False, time.perf_counter() - started)
+            llm_usage.release(reservations)
+            raise
+        finally:
+            if stream is not None:
+                await stream.close()
+        elapsed = time.perf_counter() - started
+        llm_breaker.record(ticket, True, elapsed)
+        LLM_REQUEST_SECONDS.observe(elapsed)
+    finally:
+        semaphore.release()
+
+    content = "".join(parts)
+    _record_llm_usage(system_prompt, user_prompt, usage, content, reservations)
+    if LLM_CACHE_ENABLED and content.strip():
+        llm_cache.set_nowait(key, content)
+
+
+def _record_llm_usage(
+    system_prompt: str,
+    user_prompt: str,
+    usage,
+    content: str,
+    reservations: Iterable[LLMBudgetReservation] = (),
+) -> None:
+    """응답의 usage(없으면 추정치)를 메트릭과 테넌트/엔드포인트별 사용량에 반영하고, 예약분을 정산합니다."""
+    if usage is not None:
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+    else:
+        # usage를 주지 않는 호환 서버: 추정치로 집계
+        prompt_tokens = _estimate_tokens(system_prompt) + _estimate_tokens(user_prompt)
+        completion_tokens = _estimate_tokens(content)
+    _LLM_PROMPT_TOKENS.inc(prompt_tokens)
+    _LLM_COMPLETION_TOKENS.inc(completion_tokens)
+    tenant, endpoint = _llm_call_context.get()
+    llm_usage.record_usage(tenant, endpoint, prompt_tokens, completion_tokens, reservations)
+    logger.debug(f"LLM usage tenant={tenant} endpoint={endpoint} prompt={prompt_tokens} completion={completion_tokens}")
+
+
 def _build_llm_prompt(raw_text: str, industry: str, jurisdiction: str, rule_hints: Optional[MappingResult] = None) -> str:
     """
     LLM에게 전달할 프롬프트를 생성합니다.
@@ -410,7 +1569,83 @@ def _build_llm_prompt(raw_text: str, industry: str, jurisdiction: str, rule_hint
     return base_prompt
 
 
-def _llm_based_mapping(
+def _extract_json_text(content: str) -> str:
+    """LLM 응답에서 JSON 문자열 부분을 꺼냅니다."""
+    # JSON 파싱 (```json ... ``` 블록 추출)
+    json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
+    if json_match:
+        return json_match.group(1)
+    # { 로 시작하는 JSON 찾기
+    json_match2 = re.search(r'\{[\s\S]*\}', content)
+    if json_match2:
+        return json_match2.group(0)
+    # ```json 없이 바로 JSON인 경우
+    return content.strip()
+
+
+def _json_object_reply(content: str) -> Optional[dict]:
+    """LLM 응답에서 JSON 객체를 꺼냅니다. 없거나 깨졌으면 None."""
+    try:
+        data = json.loads(_extract_json_text(content))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _is_mapping_reply(content: str) -> bool:
+    """캐시 저장 조건: 단건 매핑 응답이 후보가 있는 MappingResult로 변환되는지."""
+    data = _json_object_reply(content)
+    try:
+        return data is not None and _mapping_from_llm_data(data) is not None
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
+def _is_batch_mapping_reply(content: str) -> bool:
+    """캐시 저장 조건: 배치 매핑 응답이 {"results": [...]} 형태인지."""
+    data = _json_object_reply(content)
+    return data is not None and isinstance(data.get("results"), list)
+
+
+def _llm_str(value: Any, default: str = "") -> str:
+    """LLM JSON의 문자열 필드: 없거나 null이면 default, 그 밖의 타입은 str()."""
+    if value is None:
+        return default
+    return value if isinstance(value, str) else str(value)
+
+
+def _mapping_from_llm_data(data: dict) -> Optional[MappingResult]:
+    """
+    LLM이 돌려준 {"candidates": [...], "coverage_comment": ...}를 MappingResult로 변환합니다. 후보가 없으면 None.
+    candidates가 리스트가 아니거나 후보가 dict가 아니면 무시하고, 문자열 필드는 str로 맞춥니다.
+    """
+    raw_candidates = data.get("candidates")
+    candidates = []
+    for c in raw_candidates if isinstance(raw_candidates, list) else []:
+        if not isinstance(c, dict):
+            continue
+        candidates.append(MappingCandidate(
+            code=_llm_str(c.get("code")),
+            reason=_llm_str(c.get("reason")),
+            matched_keywords=[],  # LLM은 키워드 매칭 없음
+            score=0.9,  # LLM 결과는 높은 점수
+        ))
+
+    if not candidates:
+        return None
+
+    return MappingResult(
+        candidates=candidates,
+        coverage_comment=_llm_str(data.get("coverage_comment"), "LLM 분석 완료"),
+        confidence=0.9,  # LLM 결과는 높은 신뢰도
+    )
+
+
+# 단일 문단 LLM 매핑 응답 토큰 상한 (auto 모드 예산 예약에도 사용)
+LLM_MAPPING_MAX_TOKENS = 2000
+
+
+async def _llm_based_mapping(
     raw_text: str, 
     industry: str, 
     jurisdiction: str,
@@ -419,45 +1654,47 @@ def _llm_based_mapping(
     """
     OpenAI API를 사용한 LLM 기반 매핑.
     accurate 모드에서는 룰 기반 결과를 힌트로 활용합니다.
+    같은 입력(공백 정규화 기준)이 동시에 들어오면 LLM 호출 1회를 공유합니다.
     """
+    hint_codes = tuple(c.code for c in rule_hints.candidates) if rule_hints else None
+    key = (_normalize_flight_text(raw_text), industry, jurisdiction, hint_codes)
+    return await llm_mapping_flight.do(
+        key, lambda: _llm_based_mapping_once(raw_text, industry, jurisdiction, rule_hints)
+    )
+
+
+async def _llm_based_mapping_once(
+    raw_text: str,
+    industry: str,
+    jurisdiction: str,
+    rule_hints: Optional[MappingResult] = None
+) -> MappingResult:
+    """_llm_based_mapping의 실제 LLM 호출 부분 (single-flight 없이 1회 실행)."""
     prompt = _build_llm_prompt(raw_text, industry, jurisdiction, rule_hints)
     
     try:
-        # OpenAI API 호출
-        response = openai_client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "당신은 IFRS S2 기후 관련 공시 전문가입니다. 반드시 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요."},
-                {"role": "user", "content": prompt}
-            ],
+        # OpenAI API 호출 (동일 프롬프트는 캐시에서 응답)
+        content = await _chat_completion_text(
+            system_prompt="당신은 IFRS S2 기후 관련 공시 전문가입니다. 반드시 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요.",
+            user_prompt=prompt,
             temperature=0.3,
-            max_tokens=2000,
+            max_tokens=LLM_MAPPING_MAX_TOKENS,
+            validate=_is_mapping_reply,
         )
         
-        content = response.choices[0].message.content
-        
         # 응답이 없는 경우 폴백
         if not content or not content.strip():
             print("LLM 응답이 비어있습니다. 룰 기반 결과로 폴백합니다.")
+            LLM_FALLBACKS_TOTAL.labels("empty").inc()
             if rule_hints:
                 return rule_hints
             return _rule_based_mapping(raw_text)
         
-        # JSON 파싱 (```json ... ``` 블록 추출)
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            # { 로 시작하는 JSON 찾기
-            json_match2 = re.search(r'\{[\s\S]*\}', content)
-            if json_match2:
-                json_str = json_match2.group(0)
-            else:
-                # ```json 없이 바로 JSON인 경우
-                json_str = content.strip()
+        json_str = _extract_json_text(content)
         
         if not json_str or not json_str.strip():
             print("JSON 추출 실패. 룰 기반 결과로 폴백합니다.")
+            LLM_FALLBACKS_TOTAL.labels("no_json").inc()
             if rule_hints:
                 return rule_hints
             return _rule_based_mapping(raw_text)
@@ -465,35 +1702,26 @@ def _llm_based_mapping(
         data = json.loads(json_str)
         
         # MappingResult로 변환
-        candidates = []
-        for c in data.get("candidates", []):
-            candidates.append(MappingCandidate(
-                code=c.get("code", ""),
-                reason=c.get("reason", ""),
-                matched_keywords=[],  # LLM은 키워드 매칭 없음
-                score=0.9,  # LLM 결과는 높은 점수
-            ))
+        result = _mapping_from_llm_data(data)
         
-        if not candidates:
+        if result is None:
             print("LLM 결과에 후보가 없습니다. 룰 기반 결과로 폴백합니다.")
+            LLM_FALLBACKS_TOTAL.labels("no_candidates").inc()
             if rule_hints:
                 return rule_hints
             return _rule_based_mapping(raw_text)
         
-        result = MappingResult(
-            candidates=candidates,
-            coverage_comment=data.get("coverage_comment", "LLM 분석 완료"),
-            confidence=0.9,  # LLM 결과는 높은 신뢰도
-        )
-        
-        print(f"LLM 분석 완료: {len(candidates)}개 후보")
+        print(f"LLM 분석 완료: {len(result.candidates)}개 후보")
         return result
         
     except Exception as e:
         # 에러 발생 시 폴백: 룰 기반 결과 반환 또는 에러 메시지
         print(f"LLM API 호출 오류: {e}")
+        if isinstance(e, json.JSONDecodeError):
+            LLM_JSON_PARSE_FAILURES_TOTAL.inc()
+        LLM_FALLBACKS_TOTAL.labels("error").inc()
         if rule_hints:
-            return rule_hints
+            return rule_hints.model_copy(update={"degraded": True})
         return MappingResult(
             candidates=[MappingCandidate(
                 code="(LLM 오류)",
@@ -503,46 +1731,519 @@ def _llm_based_mapping(
             )],
             coverage_comment="LLM 분석에 실패했습니다. 다시 시도해 주세요.",
             confidence=0.0,
+            degraded=True,
         )
 
 
-def _hybrid_mapping(
-    raw_text: str, 
-    industry: str, 
-    jurisdiction: str,
-    mode: Literal["fast", "accurate", "auto"] = "auto"
-) -> MappingResult:
-    """
-    하이브리드 매핑 함수.
-    
-    - fast: 룰 기반만 사용 (즉시 응답)
-    - accurate: 룰 기반 힌트 + LLM 최종 결정
-    - auto: 룰 기반 먼저 → 신뢰도 0.7 미만이면 LLM 호출
-    """
-    # 1단계: 항상 룰 기반 매핑 먼저 실행
-    rule_result = _rule_based_mapping(raw_text)
-    
-    if mode == "fast":
-        # fast 모드: 룰 기반 결과만 반환
-        return rule_result
-    
-    elif mode == "accurate":
-        # accurate 모드: 룰 기반 결과를 힌트로 LLM에게 전달
-        return _llm_based_mapping(raw_text, industry, jurisdiction, rule_hints=rule_result)
-    
-    else:  # auto 모드
-        # 신뢰도가 0.7 미만이면 LLM 호출
-        if rule_result.confidence < 0.7:
-            return _llm_based_mapping(raw_text, industry, jurisdiction, rule_hints=rule_result)
-        return rule_result
-
-
 # =========================
-# TOOL 1: TCFD → IFRS-S2 매핑 (룰 기반 버전)
+# 시맨틱 매핑 (오프라인 벡터 인덱스)
+#  - RULES 코드마다 설명 문장(룰 이유, 키워드, 그룹 제목, 필수 요소 요약, 보조 설명)을 임베딩해
+#    연속된 float32 행렬 하나에 담아 두고, 질의는 행렬·벡터 곱 한 번으로 코사인 top-k를 구함
+#  - 임베더는 교체 가능(set_semantic_embedder). 기본값은 외부 호출이 없는 문자 n-gram 해싱 임베더
 # =========================
 
-@mcp.tool
-def map_to_ifrs_s2(raw_text: str, industry: str, jurisdiction: str = "IFRS") -> MappingResult:
+SEMANTIC_EMBED_DIM = int(os.getenv("SEMANTIC_EMBED_DIM", "4096"))      # 해싱 임베더 차원
+SEMANTIC_TOP_K = int(os.getenv("SEMANTIC_TOP_K", "3"))                 # 반환할 최대 후보 수
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.15"))    # 이 유사도 미만 후보는 버림
+# auto 모드에서 룰 신뢰도가 낮을 때, 시맨틱 최고 유사도가 이 값 이상이면 LLM 대신 시맨틱 결과 사용 (0이면 끔)
+SEMANTIC_AUTO_MIN_SCORE = float(os.getenv("SEMANTIC_AUTO_MIN_SCORE", "0.3"))
+
+
+# 코드별 보조 설명 문장 (IFRS S2 문단 취지를 풀어 쓴 표현과 흔한 바꿔 말하기)
+# 키워드가 직접 나오지 않는 문장을 잡기 위한 시드이므로, 새 표현은 여기에 추가하면 됨
+SEMANTIC_CODE_DESCRIPTIONS: Dict[str, List[str]] = {
+    "5–7": [
+        "이사회와 위원회, 최고경영진이 기후 관련 사안을 감독하고 정기적으로 보고받는 지배구조",
+        "경영진 감독 기구가 기후 이슈를 검토하고 의사결정에 반영하며 책임과 권한을 부여함",
+        "기후 관련 성과를 임원 보수와 연계하고 담당 조직의 역할을 규정함",
+    ],
+    "24–25": [
+        "기후 관련 위험을 식별하고 평가하며 우선순위를 정하고 모니터링하는 절차",
+        "전사 위험관리 체계에 기후 위험을 통합하고 위험 요인을 정기적으로 점검함",
+    ],
+    "10(a)": [
+        "친환경 제품과 서비스 판매로 새로운 수익원과 시장 기회를 확보함",
+        "에너지 효율 개선, 녹색 기술, 신재생 사업 진출 등 기후 변화에 따른 사업 기회",
+    ],
+    "10(b)": [
+        "폭염, 홍수, 태풍, 가뭄 등 극한 기상으로 인한 설비 피해와 운영 중단 위험",
+        "규제 강화, 탄소 가격, 기술 변화, 시장 선호 변화에 따른 전환 위험",
+        "기후 변화가 사업과 자산에 미치는 위험 요인과 노출 정도",
+    ],
+    "13": [
+        "협력업체와 납품 과정, 원자재 조달, 물류 등 공급망 전반에 걸친 기후 영향",
+        "비즈니스 모델과 가치사슬에서 기후 위험과 기회가 집중된 부분",
+    ],
+    "14": [
+        "기후 변화에 대응하기 위한 중장기 전략과 전환 계획, 자원 배분과 실행 과제",
+        "저탄소 경영으로의 전환을 위한 투자 계획과 사업 구조 개편",
+    ],
+    "15–16": [
+        "기후 관련 위험과 기회가 재무 상태, 재무 성과, 현금 흐름에 미치는 금액 영향",
+        "자산 손상, 보험료 상승, 설비 투자 비용 증가 등 재무제표에 반영되는 효과",
+    ],
+    "22–23,25": [
+        "지구 온난화 경로별 전망과 여러 기온 상승 가정에 따른 미래 상황 분석",
+        "시나리오별 영향 분석을 통해 사업과 전략의 기후 회복력과 탄력성을 점검함",
+    ],
+    "33–36": [
+        "배출 제로와 탄소 감축을 위한 연도별 정량 목표와 이행 현황",
+        "2030년, 2050년 등 목표 연도까지 배출량을 줄이겠다는 장기 계획과 달성률",
+    ],
+    "29(a)–29(c)": [
+        "직접 배출과 간접 배출, 가치사슬 배출 총량을 이산화탄소 환산톤으로 공시",
+        "사업장 연료 사용과 구매 전력에 따른 온실가스 배출 실적과 전년 대비 증감",
+    ],
+}
+
+
+class TextEmbedder(ABC):
+    """시맨틱 인덱스용 임베더 인터페이스. embed()는 (len(texts), dim) 행렬을 반환합니다."""
+
+    name = "base"
+    dim = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        ...
+
+
+class HashingNgramEmbedder(TextEmbedder):
+    """
+    문자 n-gram을 CRC32로 해싱해 고정 차원 벡터로 만드는 임베더 (모델/네트워크 불필요).
+    공백을 기준으로 단어를 나누고 단어 양끝에 경계 문자를 붙여 n-gram을 뽑으므로
+    "경영진 감독 기구"와 "경영진의 감독 책임"처럼 어미·조사가 달라도 겹치는 n-gram이 생깁니다.
+    """
+
+    name = "hashing-ngram"
+
+    def __init__(self, dim: int = 4096, ngram_range: Tuple[int, int] = (2, 3)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> List[int]:
+        lo, hi = self.ngram_range
+        features: List[int] = []
+        for word in text.lower().split():
+            padded = f"<{word}>"
+            for n in range(lo, hi + 1):
+                for i in range(len(padded) - n + 1):
+                    features.append(zlib.crc32(padded[i:i + n].encode("utf-8")))
+        return features
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if features:
+                counts = np.bincount(np.asarray(features, dtype=np.int64) % self.dim, minlength=self.dim)
+                # 반복 n-gram이 벡터를 지배하지 않도록 로그 스케일
+                out[row] = np.log1p(counts)
+        return out
+
+
+def _l2_normalize(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _semantic_seed_texts() -> List[Tuple[str, str]]:
+    """RULES 코드별 인덱스 문장 (코드, 문장) 목록을 만듭니다."""
+    seeds: List[Tuple[str, str]] = []
+    for keywords, code, reason in RULES:
+        seeds.append((code, reason))
+        seeds.append((code, " ".join(keywords)))
+        group_code = group_code_from_paragraph_code(code)
+        if group_code is not None:
+            seeds.append((code, str(IFRS_S2_GROUPS[group_code]["title"])))
+        req = IFRS_REQUIREMENTS.get(code)
+        if req is not None:
+            seeds.append((code, f"{req.title} {req.summary}"))
+            seeds.append((code, " ".join(e.label for e in req.elements)))
+    for code, descriptions in SEMANTIC_CODE_DESCRIPTIONS.items():
+        seeds.extend((code, text) for text in descriptions)
+    return seeds
+
+
+class SemanticIndex:
+    """
+    코드별 설명 문장 임베딩을 코드 순서로 정렬된 연속 float32 행렬에 보관합니다.
+    질의 시 matrix @ q 한 번으로 모든 문장의 코사인 유사도를 구하고,
+    np.maximum.reduceat으로 코드별 최댓값을 뽑습니다.
+    """
+
+    def __init__(self, embedder: TextEmbedder, seeds: List[Tuple[str, str]]):
+        self.embedder = embedder
+        by_code: Dict[str, List[str]] = {}
+        for code, text in seeds:
+            by_code.setdefault(code, []).append(text)
+
+        self.codes: List[str] = list(by_code)
+        texts: List[str] = []
+        starts: List[int] = []
+        for code in self.codes:
+            starts.append(len(texts))
+            texts.extend(by_code[code])
+        self._starts = np.asarray(starts, dtype=np.intp)
+        self.matrix = np.ascontiguousarray(_l2_normalize(embedder.embed(texts)), dtype=np.float32)
+
+    def query(self, text: str, top_k: int, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        q = _l2_normalize(self.embedder.embed([text])[0].astype(np.float32, copy=False))
+        if not q.any():
+            return []
+        code_scores = np.maximum.reduceat(self.matrix @ q, self._starts)
+        order = np.argsort(-code_scores)[:top_k]
+        return [
+            (self.codes[i], float(code_scores[i]))
+            for i in order
+            if code_scores[i] >= min_score
+        ]
+
+
+_semantic_embedder: TextEmbedder = HashingNgramEmbedder(SEMANTIC_EMBED_DIM)
+_semantic_index: Optional[SemanticIndex] = None
+_semantic_index_lock = threading.Lock()
+
+
+def set_semantic_embedder(embedder: TextEmbedder) -> None:
+    """시맨틱 인덱스 임베더를 교체합니다. 인덱스는 다음 질의 때 새 임베더로 다시 만듭니다."""
+    global _semantic_embedder, _semantic_index
+    with _semantic_index_lock:
+        _semantic_embedder = embedder
+        _semantic_index = None
+
+
+def get_semantic_index() -> SemanticIndex:
+    # IFRS_REQUIREMENTS가 아래쪽에서 등록되므로 첫 질의 때 만듦
+    global _semantic_index
+    index = _semantic_index
+    if index is None:
+        with _semantic_index_lock:
+            if _semantic_index is None:
+                _semantic_index = SemanticIndex(_semantic_embedder, _semantic_seed_texts())
+            index = _semantic_index
+    return index
+
+
+_RULE_REASON_BY_CODE: Dict[str, str] = {}
+for _keywords, _code, _reason in RULES:
+    _RULE_REASON_BY_CODE.setdefault(_code, _reason)
+
+
+def _semantic_mapping(raw_text: str, rule_result: Optional[MappingResult] = None) -> MappingResult:
+    """
+    룰 기반 후보에 시맨틱 인덱스 top-k 후보를 합쳐 MappingResult로 만듭니다.
+    키워드 근거가 있는 룰 후보를 앞에 두고, 키워드 없이 의미로만 찾은 코드를 뒤에 붙입니다.
+    """
+    if rule_result is None:
+        rule_result = _rule_based_mapping(raw_text)
+
+    hits = get_semantic_index().query(raw_text, SEMANTIC_TOP_K, SEMANTIC_MIN_SCORE)
+    if not hits:
+        return rule_result
+    # 1위보다 크게 뒤처지는 후보는 잡음이므로 제외
+    hits = [(code, similarity) for code, similarity in hits if similarity >= hits[0][1] * 0.5]
+
+    candidates = [c for c in rule_result.candidates if c.matched_keywords]
+    rule_codes = {c.code for c in candidates}
+    for code, similarity in hits:
+        if code in rule_codes:
+            continue
+        candidates.append(MappingCandidate(
+            code=code,
+            reason=f"{_RULE_REASON_BY_CODE[code]} (의미 유사도: {similarity:.2f})",
+            matched_keywords=[],
+            score=round(similarity, 4),
+        ))
+
+    # 유사도 0.3 → 0.5, 0.5 이상 → 0.7 정도가 되도록 완만하게 보정 (룰 신뢰도보다 낮아지지는 않음)
+    semantic_confidence = min(0.7, 0.2 + hits[0][1])
+    return MappingResult(
+        candidates=candidates,
+        coverage_comment=(
+            "키워드 룰과 IFRS S2 문단 설명과의 의미 유사도를 함께 기준으로 관련 문단 후보를 제안했습니다. "
+            "키워드가 직접 등장하지 않은 표현도 포함되므로 최종 매핑은 원문과 함께 검토해야 합니다."
+        ),
+        confidence=max(rule_result.confidence, semantic_confidence),
+    )
+
+
+def _semantic_fallback(raw_text: str, rule_result: MappingResult) -> Optional[MappingResult]:
+    """auto 모드용: 시맨틱 최고 유사도가 SEMANTIC_AUTO_MIN_SCORE 이상이면 시맨틱 결과, 아니면 None."""
+    if SEMANTIC_AUTO_MIN_SCORE <= 0:
+        return None
+    hits = get_semantic_index().query(raw_text, 1, SEMANTIC_AUTO_MIN_SCORE)
+    if not hits:
+        return None
+    return _semantic_mapping(raw_text, rule_result)
+
+
+async def _hybrid_mapping(
+    raw_text: str, 
+    industry: str, 
+    jurisdiction: str,
+    mode: Literal["fast", "semantic", "accurate", "auto"] = "auto"
+) -> MappingResult:
+    """
+    하이브리드 매핑 함수.
+    
+    - fast: 룰 기반만 사용 (즉시 응답)
+    - semantic: 룰 기반 + 오프라인 벡터 인덱스 유사도 (즉시 응답, LLM 없음)
+    - accurate: 룰 기반 힌트 + LLM 최종 결정
+    - auto: 룰 기반 먼저 → 신뢰도 0.7 미만이면 시맨틱 → 그래도 애매하면 LLM 호출
+    """
+    _MAPPING_MODE_COUNTERS[mode].inc()
+    # 1단계: 항상 룰 기반 매핑 먼저 실행
+    rule_result = _rule_based_mapping(raw_text)
+    
+    if mode == "fast":
+        # fast 모드: 룰 기반 결과만 반환
+        return rule_result
+    
+    elif mode == "semantic":
+        return _semantic_mapping(raw_text, rule_result)
+    
+    elif mode == "accurate":
+        # accurate 모드: 룰 기반 결과를 힌트로 LLM에게 전달
+        return await _llm_based_mapping(raw_text, industry, jurisdiction, rule_hints=rule_result)
+    
+    else:  # auto 모드
+        # 신뢰도가 0.7 미만이면 시맨틱 인덱스 → 그래도 애매하면 LLM 호출
+        # (LLM 예산이 부족하면 승격 임계값을 낮추고, 소진되면 룰 기반 결과만 반환)
+        if rule_result.confidence < AUTO_ESCALATION_THRESHOLD:
+            semantic_result = _semantic_fallback(raw_text, rule_result)
+            if semantic_result is not None:
+                _AUTO_TO_SEMANTIC.inc()
+                return semantic_result
+            reservation, note = llm_usage.admit(
+                rule_result.confidence,
+                _estimate_tokens(_build_llm_prompt(raw_text, industry, jurisdiction, rule_result)) + LLM_MAPPING_MAX_TOKENS,
+            )
+            if reservation is None:
+                return _budget_limited(rule_result, note)
+            _AUTO_TO_LLM.inc()
+            return await _with_budget_reservations(
+                [reservation], lambda: _llm_based_mapping(raw_text, industry, jurisdiction, rule_hints=rule_result)
+            )
+        return rule_result
+
+
+# =========================
+# 배치 매핑: 룰 엔진 일괄 실행 → 신뢰도 낮은 항목만 묶어서 LLM 호출
+# =========================
+
+# LLM 한 번에 묶을 최대 항목 수 / 프롬프트 토큰 수(추정치)
+MAP_BATCH_MAX_ITEMS_PER_CALL = int(os.getenv("MAP_BATCH_MAX_ITEMS_PER_CALL", "20"))
+MAP_BATCH_MAX_PROMPT_TOKENS = int(os.getenv("MAP_BATCH_MAX_PROMPT_TOKENS", "6000"))
+# 항목 하나당 응답 토큰 예산 (호출당 max_tokens = 항목 수 × 이 값, 상한 4000)
+MAP_BATCH_COMPLETION_TOKENS_PER_ITEM = int(os.getenv("MAP_BATCH_COMPLETION_TOKENS_PER_ITEM", "300"))
+_MAP_BATCH_MAX_COMPLETION_TOKENS = 4000
+# 요청 하나에 받을 수 있는 최대 문단 수
+MAP_BATCH_MAX_ITEMS = int(os.getenv("MAP_BATCH_MAX_ITEMS", "500"))
+_MAP_BATCH_TOO_MANY_ITEMS = "한 번에 최대 {limit}개 문단까지 매핑할 수 있습니다."
+
+
+def _estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 보수적 토큰 수 추정 (한글은 대략 1~2자당 1토큰)."""
+    return len(text) // 2 + 1
+
+
+def _build_batch_item_body(raw_text: str, rule_hints: MappingResult) -> str:
+    """항목 번호 헤더를 제외한 항목 본문 (원문 + 룰 기반 힌트)."""
+    body = f"{raw_text}\n"
+    if rule_hints.candidates and rule_hints.candidates[0].code != "(검토 필요)":
+        hints = "; ".join(f"{c.code}: {', '.join(c.matched_keywords)}" for c in rule_hints.candidates)
+        body += f"(키워드 기반 참고: {hints})\n"
+    return body
+
+
+def _build_batch_llm_prompt(item_blocks: List[str], industry: str, jurisdiction: str) -> str:
+    return (
+        "당신은 IFRS S2 기후 관련 공시 전문가이며, TCFD 권고안과 IFRS S2의 차이를 잘 알고 있습니다.\n"
+        "다음 여러 텍스트 항목을 각각 읽고, IFRS S2 기준에 따라 어떤 문단(또는 문단 범위)에 해당하는지 분석해 주세요.\n"
+        "키워드 기반 참고가 있으면 참고하되, 최종 판단은 항목 전체 맥락을 기반으로 해주세요.\n\n"
+        f"[업종]\n{industry}\n\n"
+        f"[적용 기준]\n{jurisdiction}\n\n"
+        "[분석 대상 항목]\n"
+        + "\n".join(item_blocks)
+        + "\n아래 JSON 형식으로만 답변해 주세요. results에는 모든 항목을 index와 함께 포함해야 합니다.\n"
+        "```json\n"
+        "{\n"
+        '  "results": [\n'
+        "    {\n"
+        '      "index": 0,\n'
+        '      "candidates": [\n'
+        '        {"code": "문단 또는 문단 범위 (예: \\"10\\", \\"13–14\\")", "reason": "해당 문단이라고 판단한 이유(한국어)"}\n'
+        "      ],\n"
+        '      "coverage_comment": "이 항목이 IFRS S2 어디를 어느 정도 커버하는지 요약"\n'
+        "    }\n"
+        "  ]\n"
+        "}\n"
+        "```\n"
+        "반드시 위 JSON 형식을 지키고, 불필요한 설명 문장은 JSON 외부에 쓰지 마세요."
+    )
+
+
+def _pack_batch_items(
+    items: List[Tuple[int, str]],
+    max_items: int,
+    max_prompt_tokens: int,
+) -> List[List[Tuple[int, str]]]:
+    """(항목 인덱스, 항목 본문) 목록을 항목 수/토큰 예산 안에서 순서대로 묶습니다."""
+    packs: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    current_tokens = 0
+    for index, body in items:
+        tokens = _estimate_tokens(body)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_prompt_tokens):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append((index, body))
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def _llm_map_pack(
+    pack: List[Tuple[int, str]],
+    industry: str,
+    jurisdiction: str,
+) -> Optional[Dict[int, MappingResult]]:
+    """
+    묶음 하나를 LLM 한 번으로 매핑합니다. 프롬프트 안의 항목 번호는 0부터 다시 매기고,
+    응답의 index를 원래 항목 인덱스로 되돌립니다. 누락/잘못된 항목은 결과에 포함하지 않습니다.
+    호출 자체가 실패(타임아웃/서킷 오픈 등)하면 None을 반환합니다.
+    """
+    original_indices = [index for index, _body in pack]
+    blocks = [f"[항목 {local}]\n{body}" for local, (_index, body) in enumerate(pack)]
+    prompt = _build_batch_llm_prompt(blocks, industry, jurisdiction)
+    max_tokens = min(_MAP_BATCH_MAX_COMPLETION_TOKENS, MAP_BATCH_COMPLETION_TOKENS_PER_ITEM * len(pack))
+
+    try:
+        content = await _chat_completion_text(
+            system_prompt="당신은 IFRS S2 기후 관련 공시 전문가입니다. 반드시 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요.",
+            user_prompt=prompt,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            timeout=LLM_BATCH_CALL_TIMEOUT_SECONDS,
+            validate=_is_batch_mapping_reply,
+        )
+        json_str = _extract_json_text(content or "")
+        data = json.loads(json_str) if json_str else {}
+    except Exception as e:
+        logger.error(f"LLM batch mapping error: {e}")
+        if isinstance(e, json.JSONDecodeError):
+            LLM_JSON_PARSE_FAILURES_TOTAL.inc()
+            return {}
+        return None
+
+    mapped: Dict[int, MappingResult] = {}
+    for entry in data.get("results", []) if isinstance(data, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        local = entry.get("index")
+        if not isinstance(local, int) or not 0 <= local < len(original_indices):
+            continue
+        try:
+            result = _mapping_from_llm_data(entry)
+        except (TypeError, ValueError) as e:
+            # 항목 하나가 깨졌으면 그 항목만 룰 기반 결과로 폴백
+            logger.warning(f"LLM batch mapping entry {local} skipped: {e}")
+            continue
+        if result is not None:
+            mapped[original_indices[local]] = result
+    return mapped
+
+
+async def _batch_mapping(
+    paragraphs: List[str],
+    industry: str,
+    jurisdiction: str,
+    mode: Literal["fast", "semantic", "accurate", "auto"] = "auto",
+) -> "MapBatchResponse":
+    """
+    여러 문단을 한 번에 매핑합니다.
+    1) 모든 문단에 룰 기반 매핑 실행 (semantic 모드는 시맨틱 인덱스 결과까지만)
+    2) LLM 대상(accurate: 전부, auto: 신뢰도 0.7 미만이고 시맨틱으로도 애매한 것)만 골라 항목 수/토큰 예산 단위로 묶어 LLM 호출
+    3) LLM이 빠뜨린 항목은 룰 기반 결과로 폴백
+    """
+    _MAPPING_MODE_COUNTERS[mode].inc(len(paragraphs))
+    results = [_rule_based_mapping(p) for p in paragraphs]
+    reservations: Dict[int, LLMBudgetReservation] = {}   # auto 모드에서 admit으로 잡은 항목별 예산
+
+    if mode == "fast":
+        targets: List[int] = []
+    elif mode == "semantic":
+        results = [_semantic_mapping(p, r) for p, r in zip(paragraphs, results)]
+        targets = []
+    elif mode == "accurate":
+        targets = list(range(len(paragraphs)))
+    else:
+        targets = []
+        for i, r in enumerate(results):
+            if r.confidence >= AUTO_ESCALATION_THRESHOLD:
+                continue
+            semantic_result = _semantic_fallback(paragraphs[i], r)
+            if semantic_result is not None:
+                results[i] = semantic_result
+                _AUTO_TO_SEMANTIC.inc()
+                continue
+            # 항목별로 예산을 예약 (요청 수는 묶음 단위라 LLM 호출 때 반영)
+            body = _build_batch_item_body(paragraphs[i], r)
+            reservation, note = llm_usage.admit(
+                r.confidence, _estimate_tokens(body) + MAP_BATCH_COMPLETION_TOKENS_PER_ITEM, requests=0,
+            )
+            if reservation is None:
+                results[i] = _budget_limited(r, note)
+            else:
+                targets.append(i)
+                reservations[i] = reservation
+        _AUTO_TO_LLM.inc(len(targets))
+
+    packs = _pack_batch_items(
+        [(i, _build_batch_item_body(paragraphs[i], results[i])) for i in targets],
+        MAP_BATCH_MAX_ITEMS_PER_CALL,
+        MAP_BATCH_MAX_PROMPT_TOKENS,
+    )
+    pack_results = await asyncio.gather(*(
+        _with_budget_reservations(
+            [reservations[index] for index, _body in pack if index in reservations],
+            lambda pack=pack: _llm_map_pack(pack, industry, jurisdiction),
+        )
+        for pack in packs
+    ))
+
+    llm_calls = 0
+    llm_mapped = 0
+    for pack, mapped in zip(packs, pack_results):
+        if mapped is None:
+            # 서킷 오픈/타임아웃으로 호출이 성립하지 않은 묶음은 llm_calls에 넣지 않음
+            for index, _body in pack:
+                results[index] = results[index].model_copy(update={"degraded": True})
+            continue
+        llm_calls += 1
+        for index, result in mapped.items():
+            results[index] = result
+            llm_mapped += 1
+
+    if len(targets) > llm_mapped:
+        LLM_FALLBACKS_TOTAL.labels("batch_missing").inc(len(targets) - llm_mapped)
+    return MapBatchResponse(
+        results=results,
+        llm_calls=llm_calls,
+        llm_items=len(targets),
+        llm_fallbacks=len(targets) - llm_mapped,
+    )
+
+
+# =========================
+# TOOL 1: TCFD → IFRS-S2 매핑 (룰 기반 버전)
+# =========================
+
+@mcp.tool
+def map_to_ifrs_s2(raw_text: str, industry: str, jurisdiction: str = "IFRS") -> MappingResult:
     """
     TCFD/ESG 텍스트를 IFRS S2 요구사항 코드(문단 범위)에 '대략적으로' 매핑합니다.
     - 지금은 키워드 기반 간단 룰이 들어가 있고,
@@ -556,6 +2257,25 @@ def map_to_ifrs_s2(raw_text: str, industry: str, jurisdiction: str = "IFRS") ->
     return _rule_based_mapping(raw_text)
 
 
+@mcp.tool
+async def map_to_ifrs_s2_batch(
+    paragraphs: List[str],
+    industry: str,
+    jurisdiction: str = "IFRS",
+    mode: Literal["fast", "semantic", "accurate", "auto"] = "auto",
+) -> MapBatchResponse:
+    """
+    여러 TCFD/ESG 문단을 한 번에 IFRS S2 요구사항 코드에 매핑합니다.
+    - 모든 문단에 키워드 룰을 먼저 적용하고,
+      신뢰도가 낮고 시맨틱 인덱스로도 애매한 문단(accurate 모드는 전부)만 묶어서 소수의 LLM 호출로 처리합니다.
+    - semantic 모드는 LLM을 호출하지 않습니다.
+    - LLM이 빠뜨린 문단은 룰 기반 결과를 그대로 사용합니다.
+    """
+    if len(paragraphs) > MAP_BATCH_MAX_ITEMS:
+        raise ValueError(_MAP_BATCH_TOO_MANY_ITEMS.format(limit=MAP_BATCH_MAX_ITEMS))
+    return await _batch_mapping(paragraphs, industry, jurisdiction, mode)
+
+
 # =========================
 # PROMPT 1: LLM에게 정교한 매핑을 맡기는 버전
 # (원하면 이 프롬프트를 직접 호출해서 JSON 출력 받기)
@@ -610,120 +2330,84 @@ def draft_ifrs_s2_disclosure(codes: List[str], company_profile: str, source_text
         f"[현재 보유한 원문 텍스트 또는 초안]\n{source_text}\n"
     )
 
-def _validate_disclosure_internal(codes: List[str], draft_text: str, industry: str) -> ValidationResult:
-    """
-    실제 검증 로직. validate_disclosure MCP 툴에서 이 함수를 호출합니다.
-    지금은 룰 기반으로 간단히 체크하고, 나중에 LLM 기반으로 확장 가능.
-    """
-    text_lower = draft_text.lower()
-    issues: List[ValidationIssue] = []
-
-    # 1) 거버넌스(S2-5 / 10(b) 일부) 관련: 이사회/위원회 표현이 있는지
-    if any("s2-5" in c.lower() or "governance" in c.lower() for c in codes):
-        if ("이사회" not in draft_text
-            and "위원회" not in draft_text
-            and "board" not in text_lower):
-            issues.append(
-                ValidationIssue(
-                    code="S2-5",
-                    severity="warning",
-                    title="이사회/위원회 책임 표현 부족",
-                    detail="거버넌스 섹션인데도 이사회 또는 위원회의 역할이 명시적으로 드러나지 않습니다.",
-                    suggestion="지속가능경영위원회, 리스크위원회 등 이사회 산하 위원회의 역할과 보고 라인을 문장에 추가해 주세요."
-                )
-            )
-
-    # 2) 시나리오 분석(S2-15 / 22–23) 관련: '시나리오' 언급 & 어느 정도 정량성
-    if any("s2-15" in c.lower() or "22" in c or "23" in c for c in codes):
-        if "시나리오" not in draft_text and "scenario" not in text_lower:
-            issues.append(
-                ValidationIssue(
-                    code="S2-15",
-                    severity="error",
-                    title="시나리오 분석 언급 누락",
-                    detail="해당 섹션이 시나리오 분석(2℃ 시나리오 등)을 다루는 것으로 예상되지만, 텍스트에서 시나리오 분석을 명시적으로 찾기 어렵습니다.",
-                    suggestion="어떤 기후 시나리오(예: NZE 2050, 2℃ 이하 시나리오)를 사용했는지와, 분석 결과를 간략히 서술해 주세요."
-                )
-            )
-        elif not _has_number(draft_text):
-            issues.append(
-                ValidationIssue(
-                    code="S2-15",
-                    severity="warning",
-                    title="시나리오 분석의 정량 정보 부족",
-                    detail="시나리오 분석을 언급하고 있으나, 연도·비율·손익 영향 등 정량적인 정보가 거의 없습니다.",
-                    suggestion="2050년, 2030년 등 목표 연도, 손실률/위험액과 같이 숫자로 표현되는 결과를 한두 개 이상 포함해 주세요."
-                )
-            )
-
-    # 3) 지표와 목표(S2-9 / 29–36) 관련: Scope 1·2·3, 기준연도, 목표치
-    if any("29" in c or "30" in c or "s2-9" in c.lower() for c in codes):
-        has_scope12 = (
-            "scope 1" in text_lower or "scope1" in text_lower or "스코프1" in draft_text
-            or "scope 2" in text_lower or "scope2" in text_lower or "스코프2" in draft_text
-        )
-        has_scope3 = (
-            "scope 3" in text_lower or "scope3" in text_lower or "스코프3" in draft_text
-        )
-        has_base_year = ("기준연도" in draft_text or "base year" in text_lower)
-        has_target_number = _has_number(draft_text)
-
-        if not has_scope12:
-            issues.append(
-                ValidationIssue(
-                    code="S2-9",
-                    severity="error",
-                    title="Scope 1·2 배출량 언급 누락",
-                    detail="지표와 목표 섹션인데도 Scope 1·2 온실가스 배출량 또는 이에 준하는 표현이 보이지 않습니다.",
-                    suggestion="최소한 Scope 1 및 Scope 2 배출량 수준(예: tCO2e)과 관련 목표를 문단에 포함해 주세요."
-                )
-            )
-
-        if not has_scope3:
-            issues.append(
-                ValidationIssue(
-                    code="S2-9",
-                    severity="warning",
-                    title="Scope 3 배출 정보 미기재",
-                    detail="Scope 3 배출량 또는 해당 여부에 대한 언급이 없습니다.",
-                    suggestion="Scope 3 배출량을 산정했는지, 산정하지 않았다면 그 사유와 향후 계획을 한 문장으로라도 언급해 주세요."
-                )
-            )
+# =========================
+# 검증 로직 (신호 비트 + 이슈 카탈로그)
+#  - 텍스트에서 뽑은 신호(이사회 언급, 시나리오 언급, 숫자 등)를 비트로 계산하고
+#  - 코드 그룹별 규칙이 어떤 이슈를 낼지 결정한 뒤, 카탈로그의 이슈 객체를 그대로 재사용
+#  - 신호/이슈 ID 계산은 analysis_engine (_validation_signals / _validation_issue_ids)
+# =========================
 
-        if not has_base_year:
-            issues.append(
-                ValidationIssue(
-                    code="S2-9",
-                    severity="warning",
-                    title="기준연도(Base year) 미기재",
-                    detail="배출량 또는 감축 목표가 어느 기준연도를 기준으로 하는지 명시되어 있지 않습니다.",
-                    suggestion="\"20XX년 배출량을 기준연도(base year)로 설정하였다\"는 식으로 기준연도를 명시해 주세요."
-                )
-            )
+# 이슈 카탈로그: 검증 결과에 들어가는 이슈는 모두 여기 정의된 객체를 공유합니다. (수정 금지)
+VALIDATION_ISSUES: Dict[str, ValidationIssue] = {
+    "governance_board_missing": ValidationIssue(
+        code="S2-5",
+        severity="warning",
+        title="이사회/위원회 책임 표현 부족",
+        detail="거버넌스 섹션인데도 이사회 또는 위원회의 역할이 명시적으로 드러나지 않습니다.",
+        suggestion="지속가능경영위원회, 리스크위원회 등 이사회 산하 위원회의 역할과 보고 라인을 문장에 추가해 주세요."
+    ),
+    "scenario_missing": ValidationIssue(
+        code="S2-15",
+        severity="error",
+        title="시나리오 분석 언급 누락",
+        detail="해당 섹션이 시나리오 분석(2℃ 시나리오 등)을 다루는 것으로 예상되지만, 텍스트에서 시나리오 분석을 명시적으로 찾기 어렵습니다.",
+        suggestion="어떤 기후 시나리오(예: NZE 2050, 2℃ 이하 시나리오)를 사용했는지와, 분석 결과를 간략히 서술해 주세요."
+    ),
+    "scenario_quantitative_missing": ValidationIssue(
+        code="S2-15",
+        severity="warning",
+        title="시나리오 분석의 정량 정보 부족",
+        detail="시나리오 분석을 언급하고 있으나, 연도·비율·손익 영향 등 정량적인 정보가 거의 없습니다.",
+        suggestion="2050년, 2030년 등 목표 연도, 손실률/위험액과 같이 숫자로 표현되는 결과를 한두 개 이상 포함해 주세요."
+    ),
+    "scope12_missing": ValidationIssue(
+        code="S2-9",
+        severity="error",
+        title="Scope 1·2 배출량 언급 누락",
+        detail="지표와 목표 섹션인데도 Scope 1·2 온실가스 배출량 또는 이에 준하는 표현이 보이지 않습니다.",
+        suggestion="최소한 Scope 1 및 Scope 2 배출량 수준(예: tCO2e)과 관련 목표를 문단에 포함해 주세요."
+    ),
+    "scope3_missing": ValidationIssue(
+        code="S2-9",
+        severity="warning",
+        title="Scope 3 배출 정보 미기재",
+        detail="Scope 3 배출량 또는 해당 여부에 대한 언급이 없습니다.",
+        suggestion="Scope 3 배출량을 산정했는지, 산정하지 않았다면 그 사유와 향후 계획을 한 문장으로라도 언급해 주세요."
+    ),
+    "base_year_missing": ValidationIssue(
+        code="S2-9",
+        severity="warning",
+        title="기준연도(Base year) 미기재",
+        detail="배출량 또는 감축 목표가 어느 기준연도를 기준으로 하는지 명시되어 있지 않습니다.",
+        suggestion="\"20XX년 배출량을 기준연도(base year)로 설정하였다\"는 식으로 기준연도를 명시해 주세요."
+    ),
+    "target_number_missing": ValidationIssue(
+        code="S2-9",
+        severity="warning",
+        title="정량 목표 수치 부족",
+        detail="\"감축한다\", \"줄인다\"와 같은 표현은 있으나, 몇 % 또는 얼마만큼 줄이는지 정량적 수치가 없습니다.",
+        suggestion="예: \"2030년까지 2019년 대비 Scope 1+2 배출량을 50% 감축\"과 같이 수치를 포함한 목표를 작성해 주세요."
+    ),
+}
 
-        if not has_target_number:
-            issues.append(
-                ValidationIssue(
-                    code="S2-9",
-                    severity="warning",
-                    title="정량 목표 수치 부족",
-                    detail="\"감축한다\", \"줄인다\"와 같은 표현은 있으나, 몇 % 또는 얼마만큼 줄이는지 정량적 수치가 없습니다.",
-                    suggestion="예: \"2030년까지 2019년 대비 Scope 1+2 배출량을 50% 감축\"과 같이 수치를 포함한 목표를 작성해 주세요."
-                )
-            )
 
-    # overall_status 계산
-    has_error = any(i.severity == "error" for i in issues)
-    has_warning = any(i.severity == "warning" for i in issues)
+def _overall_status(issues: List[ValidationIssue]) -> Literal["pass", "partial", "fail"]:
+    if any(i.severity == "error" for i in issues):
+        return "fail"
+    if any(i.severity == "warning" for i in issues):
+        return "partial"
+    return "pass"
 
-    if has_error:
-        overall = "fail"
-    elif has_warning:
-        overall = "partial"
-    else:
-        overall = "pass"
 
-    return ValidationResult(overall_status=overall, issues=issues)
+@_timed(_VALIDATION_SECONDS)
+def _validate_disclosure_internal(codes: List[str], draft_text: str, industry: str) -> ValidationResult:
+    """
+    실제 검증 로직. validate_disclosure MCP 툴에서 이 함수를 호출합니다.
+    지금은 룰 기반으로 간단히 체크하고, 나중에 LLM 기반으로 확장 가능.
+    """
+    issue_ids = _validation_issue_ids(tuple(codes), _validation_signals(draft_text))
+    issues = [VALIDATION_ISSUES[i] for i in issue_ids]
+    return ValidationResult(overall_status=_overall_status(issues), issues=issues)
 
 # =========================
 # IFRS S2 필수 요소 정의 & 문단 보완 로직
@@ -797,129 +2481,43 @@ _register_requirement(
 )
 
 
-def _run_required_element_detector(key: str, text: str) -> tuple[bool, str]:
-    lower = text.lower()
-
-    if key == "risk_type":
-        present = any(
-            kw in text
-            for kw in [
-                "전환 리스크", "물리적 리스크", "기후 리스크",
-                "기후 관련 리스크", "기후 관련 위험", "기회", "비즈니스 기회"
-            ]
-        )
-        reason = "기후 관련 리스크/기회 유형이 " + ("언급되어 있습니다." if present else "문단에서 뚜렷이 보이지 않습니다.")
-        return present, reason
-
-    if key == "time_horizon":
-        year_pattern = r"20\d{2}\s*년"
-        present = bool(re.search(year_pattern, text)) or any(
-            kw in text for kw in ["단기", "중기", "장기"]
-        )
-        reason = "시간대(연도 또는 단기/중기/장기)가 " + ("명시되어 있습니다." if present else "명시되어 있지 않습니다.")
-        return present, reason
-
-    if key == "financial_impact":
-        present = _has_number(text) and any(
-            kw in text
-            for kw in ["비용", "매출", "손익", "영업이익", "투자", "현금흐름", "손실", "영향"]
-        )
-        # ✅ S2-9 취지에 맞춰 전략과 재무 영향의 연결고리를 명시하도록 피드백 수정
-        reason = "재무적 영향(비용/매출/손익 등 + 숫자)이 " + ("포함되어 있습니다." if present else "충분히 설명되어 있지 않습니다. 이 전략이 기업의 재무 성과(예: 비용 절감, 매출 증대)에 미치는 영향을 명시해 주세요.")
-        return present, reason
-
-    if key == "strategic_response":
-        present = any(
-            kw in text
-            for kw in ["전략", "계획", "로드맵", "대응", "완화", "전환", "투자 확대", "재생에너지", "감축 활동"]
-        )
-        # ✅ S2-9 취지에 맞춰 어떤 리스크에 대한 대응인지 명시하도록 피드백 수정
-        reason = "대응 전략/전환 계획이 " + ("서술되어 있습니다." if present else "구체적으로 서술되어 있지 않습니다. 이 전략이 어떤 기후 리스크 또는 기회에 대응하기 위한 것인지 명시해 주세요.")
-        return present, reason
-
-    if key == "quantitative_metrics":
-        present = _has_number(text) and any(
-            kw in text
-            for kw in ["비율", "%", "지표", "목표", "감축률"]  # tCO2e와 같은 원시 지표 요구는 제거하고 목표나 비율에 집중
-        )
-        # ✅ S2-9 취지에 맞춰 전략의 효과를 측정하는 목표치에 집중하도록 피드백 수정
-        reason = "전략의 정량적 목표나 지표가 " + ("포함되어 있습니다." if present else "전략의 효과를 측정할 수 있는 정량적 목표(예: 감축 목표 비율, 투자 금액)가 부족합니다.")
-        return present, reason
-
-    if key == "scenario_description":
-        present = any(
-            kw.lower() in lower
-            for kw in ["시나리오", "scenario", "1.5", "2℃", "4℃", "nze", "넷제로"]
-        )
-        reason = "사용한 기후 시나리오가 " + ("언급되어 있습니다." if present else "명시되어 있지 않습니다.")
-        return present, reason
-
-    if key == "key_assumptions":
-        present = any(
-            kw in text
-            for kw in ["가정", "전제", "가정 하에", "탄소 가격", "수요", "성장률", "가격"]
-        )
-        reason = "시나리오에 사용한 주요 가정/전제가 " + ("설명되어 있습니다." if present else "설명되지 않습니다.")
-        return present, reason
+_UNKNOWN_ELEMENT_REASON = "자동으로 판단하기 어려운 요소입니다. 수동 검토가 필요합니다."
 
-    if key == "resilience_evaluation":
-        present = any(
-            kw in text
-            for kw in ["탄력성", "resilience", "견조", "유지 가능", "영향을 흡수", "버틸 수"]
-        )
-        reason = "기후 탄력성(전략이 시나리오를 버틸 수 있는지)에 대한 평가는 " + ("포함되어 있습니다." if present else "거의 포함되어 있지 않습니다.")
-        return present, reason
-
-    if key == "scope_coverage":
-        present = any(
-            kw in lower
-            for kw in ["scope 1", "scope1", "scope 2", "scope2", "scope 3", "scope3"]
-        ) or any(kw in text for kw in ["스코프1", "스코프2", "스코프3"])
-        reason = "Scope 1·2·3 배출 범위가 " + ("언급되어 있습니다." if present else "언급되지 않습니다.")
-        return present, reason
-
-    if key == "base_year":
-        present = ("기준연도" in text) or ("base year" in lower) or bool(
-            re.search(r"20\d{2}\s*년.*기준", text)
-        )
-        reason = "기준연도(Base year)가 " + ("명시되어 있습니다." if present else "명시되어 있지 않습니다.")
-        return present, reason
 
-    if key == "target_value":
-        present = _has_number(text) and any(
-            kw in text for kw in ["감축", "목표", "줄이", "낮추", "달성"]
-        )
-        reason = "정량 목표 수치가 " + ("포함되어 있습니다." if present else "구체적인 수치 없이 서술만 있습니다.")
-        return present, reason
+def detect_required_elements(text: str) -> int:
+    """등록된 모든 필수 요소를 텍스트 1회 스캔으로 판정해 present 비트마스크를 반환합니다."""
+    return _ELEMENT_DETECTORS.detect(text)
 
-    if key == "progress":
-        present = any(
-            kw in text
-            for kw in ["달성률", "진행률", "이행 상황", "성과", "추세", "year-on-year", "YoY"]
-        )
-        reason = "목표 달성 현황/추세가 " + ("설명되어 있습니다." if present else "거의 설명되지 않습니다.")
-        return present, reason
 
-    # 기본: 모르면 수동 검토
-    return False, "자동으로 판단하기 어려운 요소입니다. 수동 검토가 필요합니다."
+def _element_result(element: RequiredElement, mask: int) -> ElementCheckResult:
+    present = _ELEMENT_DETECTORS.is_present(mask, element.key)
+    if present is None:
+        # 기본: 모르면 수동 검토
+        return ElementCheckResult(key=element.key, label=element.label, present=False, reason=_UNKNOWN_ELEMENT_REASON)
+    det = ELEMENT_DETECTORS[element.key]
+    return ElementCheckResult(
+        key=element.key,
+        label=element.label,
+        present=present,
+        reason=det.present_reason if present else det.absent_reason,
+    )
 
 
-def _evaluate_required_elements(paragraph: str, ifrs_code: str) -> tuple[Optional[IfrsRequirement], List[ElementCheckResult]]:
+def _evaluate_required_elements(
+    paragraph: str,
+    ifrs_code: str,
+    present_mask: Optional[int] = None,
+) -> tuple[Optional[IfrsRequirement], List[ElementCheckResult]]:
+    """
+    present_mask를 넘기면(detect_required_elements 결과) 텍스트를 다시 스캔하지 않습니다.
+    """
     req = IFRS_REQUIREMENTS.get(ifrs_code)
     if not req:
         return None, []
 
-    results: List[ElementCheckResult] = []
-    for element in req.elements:
-        present, reason = _run_required_element_detector(element.key, paragraph)
-        results.append(
-            ElementCheckResult(
-                key=element.key,
-                label=element.label,
-                present=present,
-                reason=reason,
-            )
-        )
+    if present_mask is None:
+        present_mask = detect_required_elements(paragraph)
+    results = [_element_result(element, present_mask) for element in req.elements]
     return req, results
 
 
@@ -966,10 +2564,24 @@ def _build_enhance_prompt(paragraph: str, req: IfrsRequirement, elements: List[E
     return prompt.strip()
 
 
-def _enhance_paragraph_internal(paragraph: str, ifrs_code: str, user_message: Optional[str] = None) -> tuple[Optional[IfrsRequirement], List[ElementCheckResult], str]:
+async def _enhance_paragraph_internal(paragraph: str, ifrs_code: str, user_message: Optional[str] = None) -> tuple[Optional[IfrsRequirement], List[ElementCheckResult], str, bool]:
     """
     단일 문단 + IFRS 코드 → 필수 요소 평가 → LLM으로 보완 문단 생성
+    같은 입력(공백 정규화 기준)이 동시에 들어오면 생성 1회를 공유합니다.
+    LLM 호출이 실패하면 원문 문단과 degraded=True를 반환합니다.
     """
+    key = (_normalize_flight_text(paragraph), ifrs_code, _normalize_flight_text(user_message or ""))
+    return await enhance_paragraph_flight.do(
+        key, lambda: _enhance_paragraph_once(paragraph, ifrs_code, user_message)
+    )
+
+
+_ENHANCE_SYSTEM_PROMPT = "당신은 IFRS S2 기후 관련 공시를 작성하는 전문 컨설턴트입니다."
+_ENHANCE_MAX_TOKENS = 800
+
+
+def _prepare_enhance(paragraph: str, ifrs_code: str, user_message: Optional[str] = None) -> tuple[Optional[IfrsRequirement], List[ElementCheckResult], str]:
+    """필수 요소를 평가하고 보완 문단 생성용 프롬프트를 만듭니다 (LLM 호출 없음)."""
     req, elements = _evaluate_required_elements(paragraph, ifrs_code)
 
     if req:
@@ -988,27 +2600,167 @@ def _enhance_paragraph_internal(paragraph: str, ifrs_code: str, user_message: Op
         if user_message:
             prompt += f"\n[사용자의 추가 요청]\n{user_message}\n"
 
+    return req, elements, prompt
+
+
+async def _enhance_paragraph_once(paragraph: str, ifrs_code: str, user_message: Optional[str] = None) -> tuple[Optional[IfrsRequirement], List[ElementCheckResult], str, bool]:
+    """_enhance_paragraph_internal의 실제 평가 + LLM 호출 부분 (single-flight 없이 1회 실행)."""
+    req, elements, prompt = _prepare_enhance(paragraph, ifrs_code, user_message)
+    completed, degraded = await _complete_enhance(paragraph, prompt)
+    return req, elements, completed, degraded
+
+
+async def _complete_enhance(
+    paragraph: str,
+    prompt: str,
+    timeout: Optional[float] = None,
+    caller_deadline: bool = False,
+) -> Tuple[str, bool]:
+    """보완 문단을 생성합니다. 실패하면 (원문, True), 빈 응답이면 (원문, False)를 반환합니다."""
     try:
-        response = openai_client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "당신은 IFRS S2 기후 관련 공시를 작성하는 전문 컨설턴트입니다."
-                },
-                {"role": "user", "content": prompt},
-            ],
+        completed = (await _chat_completion_text(
+            system_prompt=_ENHANCE_SYSTEM_PROMPT,
+            user_prompt=prompt,
             temperature=0.3,
-            max_tokens=800,
-        )
-        completed = (response.choices[0].message.content or "").strip()
-        if not completed:
-            completed = paragraph
+            max_tokens=_ENHANCE_MAX_TOKENS,
+            timeout=timeout,
+            caller_deadline=caller_deadline,
+        )).strip()
     except Exception as e:
         logger.error(f"LLM paragraph enhance error: {e}")
-        completed = paragraph
+        return paragraph, True
+    return completed or paragraph, False
+
+
+async def _iter_enhance_events(paragraph: str, ifrs_code: str, user_message: Optional[str] = None) -> AsyncIterator[Tuple[str, str]]:
+    """
+    보완 문단 생성을 (이벤트명, JSON 문자열) 레코드로 흘려 보냅니다.
+    elements(룰 기반 평가, 즉시) → token(생성 텍스트 조각, 여러 번) → done(최종 EnhanceParagraphResponse)
+    LLM이 실패하면 done의 completed_paragraph는 원문, degraded=True입니다 (앞서 보낸 token은 버리면 됨).
+    """
+    req, elements, prompt = _prepare_enhance(paragraph, ifrs_code, user_message)
+    title = req.title if req else f"IFRS S2 {ifrs_code}"
+    yield "elements", json.dumps(
+        {
+            "ifrs_code": ifrs_code,
+            "ifrs_title": title,
+            "missing_elements": [e.model_dump() for e in elements],
+        },
+        ensure_ascii=False,
+    )
+
+    parts: List[str] = []
+    degraded = False
+    try:
+        async for delta in _stream_chat_completion_text(
+            system_prompt=_ENHANCE_SYSTEM_PROMPT,
+            user_prompt=prompt,
+            temperature=0.3,
+            max_tokens=_ENHANCE_MAX_TOKENS,
+        ):
+            parts.append(delta)
+            yield "token", json.dumps({"text": delta}, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"LLM paragraph enhance stream error: {e}")
+        degraded = True
+
+    completed = "".join(parts).strip() if not degraded else ""
+    response = EnhanceParagraphResponse(
+        ifrs_code=ifrs_code,
+        ifrs_title=title,
+        missing_elements=elements,
+        completed_paragraph=completed or paragraph,
+        degraded=degraded,
+    )
+    yield "done", response.model_dump_json()
+
+
+# =========================
+# 여러 문단 일괄 보완 (LLM 병렬 fan-out)
+#  - 모든 항목의 필수 요소 평가/프롬프트 생성을 먼저 한 번에 끝낸 뒤
+#  - LLM 호출을 최대 concurrency개씩 병렬로 보내고, 항목마다 데드라인 적용
+#  - 실패/타임아웃 항목은 원문 문단으로 대체 (degraded=True)
+#  - 같은 프롬프트의 항목은 호출 1번을 공유
+# =========================
+
+ENHANCE_BATCH_MAX_ITEMS = int(os.getenv("ENHANCE_BATCH_MAX_ITEMS", "200"))
+ENHANCE_BATCH_CONCURRENCY = int(os.getenv("ENHANCE_BATCH_CONCURRENCY", "8"))
+ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS = float(os.getenv("ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS", str(LLM_CALL_TIMEOUT_SECONDS)))
+
+
+async def _iter_enhance_batch(
+    items: List[EnhanceParagraphRequest],
+    concurrency: Optional[int] = None,
+    item_timeout: Optional[float] = None,
+    ordered: bool = True,
+) -> AsyncIterator[Tuple[int, EnhanceParagraphResponse]]:
+    """
+    (항목 인덱스, EnhanceParagraphResponse)를 ordered=True면 입력 순서대로,
+    False면 완료되는 순서대로 내보냅니다. 소비자가 중간에 멈추면 남은 호출은 취소합니다.
+    """
+    limit = max(1, min(concurrency or ENHANCE_BATCH_CONCURRENCY, ENHANCE_BATCH_CONCURRENCY))
+    # 요청자가 정한 데드라인은 (0, ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS]로 제한하고,
+    # 기본보다 짧게 잡은 데드라인 초과는 LLM 장애가 아니므로 서킷 실패로 세지 않음
+    if item_timeout is None or item_timeout <= 0:
+        timeout = ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS
+    else:
+        timeout = min(item_timeout, ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS)
+    caller_deadline = timeout < ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS
+    semaphore = asyncio.Semaphore(limit)
+
+    # 1) 룰 기반 평가 + 프롬프트 (LLM 호출 없음)
+    prepared = [_prepare_enhance(item.paragraph, item.ifrs_code, item.user_message) for item in items]
+
+    # 2) 같은 (문단, 프롬프트)는 태스크 하나로
+    async def complete(paragraph: str, prompt: str) -> Tuple[str, bool]:
+        async with semaphore:
+            return await _complete_enhance(paragraph, prompt, timeout=timeout, caller_deadline=caller_deadline)
+
+    shared: Dict[Tuple[str, str], asyncio.Task] = {}
+    tasks: List[asyncio.Task] = []
+    for item, (_req, _elements, prompt) in zip(items, prepared):
+        key = (item.paragraph, prompt)
+        if key not in shared:
+            shared[key] = asyncio.ensure_future(complete(item.paragraph, prompt))
+        tasks.append(shared[key])
+
+    def build(index: int, completed: str, degraded: bool) -> Tuple[int, EnhanceParagraphResponse]:
+        item = items[index]
+        req, elements, _prompt = prepared[index]
+        return index, EnhanceParagraphResponse(
+            ifrs_code=item.ifrs_code,
+            ifrs_title=req.title if req else f"IFRS S2 {item.ifrs_code}",
+            missing_elements=elements,
+            completed_paragraph=completed,
+            degraded=degraded,
+        )
+
+    async def indexed(index: int) -> Tuple[int, str, bool]:
+        completed, degraded = await tasks[index]
+        return index, completed, degraded
 
-    return req, elements, completed
+    try:
+        if ordered:
+            for index in range(len(items)):
+                yield build(*(await indexed(index)))
+        else:
+            for next_done in asyncio.as_completed([indexed(i) for i in range(len(items))]):
+                yield build(*(await next_done))
+    finally:
+        for task in shared.values():
+            if not task.done():
+                task.cancel()
+
+
+async def _enhance_batch_internal(
+    items: List[EnhanceParagraphRequest],
+    concurrency: Optional[int] = None,
+    item_timeout: Optional[float] = None,
+) -> EnhanceParagraphBatchResponse:
+    results: List[Optional[EnhanceParagraphResponse]] = [None] * len(items)
+    async for index, response in _iter_enhance_batch(items, concurrency, item_timeout, ordered=False):
+        results[index] = response
+    return EnhanceParagraphBatchResponse(results=results, degraded=sum(r.degraded for r in results))
 
 @mcp.tool
 def validate_disclosure(codes: List[str], draft_text: str, industry: str = "은행") -> ValidationResult:
@@ -1027,12 +2779,12 @@ def validate_disclosure(codes: List[str], draft_text: str, industry: str = "은
 
 
 @mcp.tool
-def enhance_paragraph(paragraph: str, ifrs_code: str, industry: str = "IT서비스", user_message: Optional[str] = None) -> EnhanceParagraphResponse:
+async def enhance_paragraph(paragraph: str, ifrs_code: str, industry: str = "IT서비스", user_message: Optional[str] = None) -> EnhanceParagraphResponse:
     """
     단일 문단을 지정된 IFRS S2 코드 기준으로 분석하여
     부족한 요소와 AI가 보완한 최종 문단을 반환합니다.
     """
-    req, elements, completed = _enhance_paragraph_internal(paragraph, ifrs_code, user_message)
+    req, elements, completed, degraded = await _enhance_paragraph_internal(paragraph, ifrs_code, user_message)
     title = req.title if req else f"IFRS S2 {ifrs_code}"
 
     return EnhanceParagraphResponse(
@@ -1040,32 +2792,462 @@ def enhance_paragraph(paragraph: str, ifrs_code: str, industry: str = "IT서비
         ifrs_title=title,
         missing_elements=elements,
         completed_paragraph=completed,
+        degraded=degraded,
     )
 
 
+@mcp.tool
+async def enhance_paragraph_stream(
+    paragraph: str,
+    ifrs_code: str,
+    ctx: Context,
+    industry: str = "IT서비스",
+    user_message: Optional[str] = None,
+) -> EnhanceParagraphResponse:
+    """
+    enhance_paragraph의 스트리밍 버전입니다.
+    progress 알림의 message로 먼저 부족한 요소(elements JSON, progress=0)를 즉시 보내고,
+    이어서 보완 문단 조각을 생성되는 대로(progress=1, 2, ...) 보낸 뒤 최종 EnhanceParagraphResponse를 반환합니다.
+    """
+    final = None
+    received = 0
+    async for event, data_json in _iter_enhance_events(paragraph, ifrs_code, user_message):
+        if event == "elements":
+            await ctx.report_progress(0, message=data_json)
+        elif event == "token":
+            received += 1
+            await ctx.report_progress(received, message=json.loads(data_json)["text"])
+        else:
+            final = EnhanceParagraphResponse.model_validate_json(data_json)
+    return final
+
+
+@mcp.tool
+async def enhance_paragraphs_batch(
+    items: List[EnhanceParagraphRequest],
+    ctx: Context,
+    concurrency: Optional[int] = None,
+    item_timeout: Optional[float] = None,
+    order: Literal["ordered", "completed"] = "completed",
+) -> EnhanceParagraphBatchResponse:
+    """
+    여러 문단을 한 번에 보완합니다. items는 {paragraph, ifrs_code, user_message} 목록이고,
+    LLM 호출은 병렬로 보내며 항목이 끝날 때마다 progress 알림(완료 수/전체)을 보냅니다.
+    실패한 항목은 원문 문단(degraded=True)으로 대체됩니다.
+
+    parameters:
+        concurrency: 동시 LLM 호출 수 (기본/최대 ENHANCE_BATCH_CONCURRENCY)
+        item_timeout: 항목별 LLM 데드라인(초) (기본/최대 ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS)
+        order: progress를 입력 순서대로("ordered") 또는 끝나는 대로("completed") 보냄
+               (results는 어느 쪽이든 입력 순서)
+    """
+    if len(items) > ENHANCE_BATCH_MAX_ITEMS:
+        raise ValueError(f"한 번에 최대 {ENHANCE_BATCH_MAX_ITEMS}개 문단까지 보완할 수 있습니다.")
+    results: List[Optional[EnhanceParagraphResponse]] = [None] * len(items)
+    done = 0
+    async for index, response in _iter_enhance_batch(items, concurrency, item_timeout, ordered=order == "ordered"):
+        results[index] = response
+        done += 1
+        await ctx.report_progress(done, total=len(items))
+    return EnhanceParagraphBatchResponse(results=results, degraded=sum(r.degraded for r in results))
+
 
 # =========================
-# REST API Request 스키마
+# 문서 전문 검색 인덱스 (BM25, 디스크 세그먼트)
+#  - 기준서/회사 문서를 페이지 → 패시지(수백 자 단위)로 나눠 색인하고,
+#    생성 문장이 근거로 인용할 (문서, 페이지, 오프셋, 점수)를 돌려줌
+#  - 토크나이저: 한글 등은 문자 bigram, 영문/숫자는 단어 단위
+#  - 색인은 불변(immutable) 세그먼트 디렉터리의 .npy 파일들로 저장하고 mmap으로 읽음
+#    새 문서는 새 세그먼트로 추가(append)하고 manifest.json만 원자적으로 교체
+#  - 같은 doc_id를 다시 색인하면 가장 최근 세그먼트의 패시지만 검색 대상
 # =========================
 
-class MapRequest(BaseModel):
-    raw_text: str
-    industry: str
-    jurisdiction: str = "IFRS"
-    mode: Literal["fast", "accurate", "auto"] = "auto"  # 하이브리드 모드
+SEARCH_INDEX_DIR = os.getenv(
+    "SEARCH_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".search_index"),
+)
+SEARCH_PASSAGE_CHARS = int(os.getenv("SEARCH_PASSAGE_CHARS", "400"))  # 패시지 목표 길이(문자)
+SEARCH_BM25_K1 = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+SEARCH_BM25_B = float(os.getenv("SEARCH_BM25_B", "0.75"))
+SEARCH_SNIPPET_CHARS = 160
+
+_SEARCH_TOKEN_RUN = re.compile(r"[0-9a-z]+|[^\W0-9a-z_]+")
+
+_PASSAGE_DTYPE = np.dtype([
+    ("doc", "<i4"),         # 세그먼트 내 문서 인덱스 (meta.json의 docs 순서)
+    ("page", "<i4"),        # 1부터 시작하는 페이지 번호
+    ("offset", "<i4"),      # 페이지 내 패시지 시작 문자 오프셋
+    ("length", "<i4"),      # 패시지 토큰 수 (BM25 문서 길이)
+    ("text_start", "<i8"),  # text.bin 내 UTF-8 바이트 범위
+    ("text_end", "<i8"),
+])
+
+
+def _search_terms(text: str) -> List[str]:
+    """검색용 토큰: 영문/숫자는 소문자 단어, 그 외 문자열은 문자 bigram (한 글자면 그대로)."""
+    terms: List[str] = []
+    for run in _SEARCH_TOKEN_RUN.findall(text.lower()):
+        if run.isascii() or len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
 
 
-class ValidateRequest(BaseModel):
-    codes: List[str]
-    draft_text: str
-    industry: str = "은행"
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
 
 
-class TextAnalysisRequest(BaseModel):
-    """텍스트 분석 요청 모델"""
+def _split_passages(page_text: str, target_chars: int) -> List[Tuple[int, str]]:
+    """페이지를 target_chars 근처의 줄바꿈/공백에서 잘라 (페이지 내 오프셋, 패시지) 목록으로 만듭니다."""
+    passages: List[Tuple[int, str]] = []
+    start, n = 0, len(page_text)
+    while start < n:
+        end = min(n, start + target_chars)
+        if end < n:
+            cut = page_text.rfind("\n", start + target_chars // 2, end)
+            if cut < 0:
+                cut = page_text.rfind(" ", start + target_chars // 2, end)
+            if cut >= 0:
+                end = cut + 1
+        chunk = page_text[start:end]
+        if chunk.strip():
+            passages.append((start, chunk))
+        start = end
+    return passages
+
+
+@dataclass
+class IndexedDocument:
+    doc_id: str
+    pages: List[str]
+    kind: Literal["standard", "company"] = "company"
+
+
+class _IndexSegment:
+    """디스크의 불변 세그먼트 하나. 모든 배열은 mmap으로 열어 필요한 부분만 읽습니다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.docs: List[dict] = meta["docs"]
+        self.total_length = int(meta["total_length"])
+        self.terms = np.load(os.path.join(path, "terms.npy"), mmap_mode="r")
+        self.term_offsets = np.load(os.path.join(path, "term_offsets.npy"), mmap_mode="r")
+        self.post_passages = np.load(os.path.join(path, "post_passages.npy"), mmap_mode="r")
+        self.post_tf = np.load(os.path.join(path, "post_tf.npy"), mmap_mode="r")
+        self.passages = np.load(os.path.join(path, "passages.npy"), mmap_mode="r")
+        self.passage_length = np.asarray(self.passages["length"], dtype=np.float32)
+        self._text = np.memmap(os.path.join(path, "text.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(path, "text.bin")) else np.zeros(0, dtype=np.uint8)
+        self.live = np.ones(len(self.passages), dtype=bool)
+
+    def postings(self, term_hash: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        i = int(np.searchsorted(self.terms, np.uint64(term_hash)))
+        if i >= len(self.terms) or int(self.terms[i]) != term_hash:
+            return self.post_passages[:0], self.post_tf[:0]
+        a, b = int(self.term_offsets[i]), int(self.term_offsets[i + 1])
+        return self.post_passages[a:b], self.post_tf[a:b]
+
+    def passage_text(self, passage_index: int) -> str:
+        row = self.passages[passage_index]
+        return bytes(self._text[int(row["text_start"]):int(row["text_end"])]).decode("utf-8")
+
+    @staticmethod
+    def write(path: str, documents: List[IndexedDocument], passage_chars: int) -> None:
+        """문서들을 새 세그먼트 디렉터리로 씁니다. (임시 디렉터리에 쓴 뒤 rename)"""
+        rows: List[tuple] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        text_parts: List[bytes] = []
+        text_pos = 0
+        total_length = 0
+
+        for doc_index, doc in enumerate(documents):
+            for page_number, page_text in enumerate(doc.pages, start=1):
+                for offset, chunk in _split_passages(page_text, passage_chars):
+                    terms = _search_terms(chunk)
+                    if not terms:
+                        continue
+                    passage_index = len(rows)
+                    counts: Dict[str, int] = {}
+                    for term in terms:
+                        counts[term] = counts.get(term, 0) + 1
+                    for term, tf in counts.items():
+                        postings.setdefault(term, []).append((passage_index, tf))
+                    encoded = chunk.encode("utf-8")
+                    rows.append((doc_index, page_number, offset, len(terms), text_pos, text_pos + len(encoded)))
+                    text_parts.append(encoded)
+                    text_pos += len(encoded)
+                    total_length += len(terms)
+
+        hashed = sorted((_term_hash(term), plist) for term, plist in postings.items())
+        term_offsets = np.zeros(len(hashed) + 1, dtype=np.int64)
+        for i, (_h, plist) in enumerate(hashed):
+            term_offsets[i + 1] = term_offsets[i] + len(plist)
+        flat = [p for _h, plist in hashed for p in plist]
+
+        tmp_path = path + ".tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, "terms.npy"), np.array([h for h, _ in hashed], dtype=np.uint64))
+        np.save(os.path.join(tmp_path, "term_offsets.npy"), term_offsets)
+        np.save(os.path.join(tmp_path, "post_passages.npy"), np.array([p for p, _ in flat], dtype=np.int32))
+        np.save(os.path.join(tmp_path, "post_tf.npy"), np.array([tf for _, tf in flat], dtype=np.float32))
+        np.save(os.path.join(tmp_path, "passages.npy"), np.array(rows, dtype=_PASSAGE_DTYPE))
+        with open(os.path.join(tmp_path, "text.bin"), "wb") as f:
+            f.write(b"".join(text_parts))
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "docs": [{"doc_id": d.doc_id, "kind": d.kind, "pages": len(d.pages)} for d in documents],
+                "passages": len(rows),
+                "total_length": total_length,
+                "created_at": time.time(),
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class DocumentIndex:
+    """
+    BM25 전문 검색 인덱스. 세그먼트 목록은 manifest.json에 순서대로 기록합니다.
+    - add_documents(): 새 세그먼트 하나를 쓰고 manifest에 추가 (기존 세그먼트는 건드리지 않음)
+    - search(): 모든 세그먼트를 훑어 BM25 상위 top_k 패시지 반환
+    """
+
+    def __init__(self, path: str, passage_chars: int = 400, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.passage_chars = passage_chars
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._segments: Optional[List[_IndexSegment]] = None
+        self._next_segment = 1
+        self._live_passages = 0
+        self._live_length = 0
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def _load(self) -> List[_IndexSegment]:
+        segments = self._segments
+        if segments is not None:
+            return segments
+        with self._lock:
+            if self._segments is None:
+                names: List[str] = []
+                if os.path.exists(self._manifest_path()):
+                    with open(self._manifest_path(), encoding="utf-8") as f:
+                        manifest = json.load(f)
+                    names = manifest["segments"]
+                    self._next_segment = manifest["next_segment"]
+                self._set_segments([_IndexSegment(os.path.join(self.path, n)) for n in names])
+            return self._segments
+
+    def _set_segments(self, segments: List[_IndexSegment]) -> None:
+        # 문서별로 가장 최근 세그먼트만 살아 있는 것으로 표시하고, BM25 전역 통계를 다시 계산
+        latest: Dict[str, int] = {}
+        for seg_index, segment in enumerate(segments):
+            for doc in segment.docs:
+                latest[doc["doc_id"]] = seg_index
+        live_passages = 0
+        live_length = 0
+        for seg_index, segment in enumerate(segments):
+            doc_live = np.array([latest[d["doc_id"]] == seg_index for d in segment.docs], dtype=bool)
+            segment.live = doc_live[segment.passages["doc"]] if len(segment.passages) else segment.live
+            live_passages += int(segment.live.sum())
+            live_length += int(segment.passage_length[segment.live].sum())
+        self._live_passages = live_passages
+        self._live_length = live_length
+        self._segments = segments
+
+    def add_documents(self, documents: List[IndexedDocument]) -> str:
+        """
+        문서들을 새 세그먼트로 색인하고 세그먼트 이름을 반환합니다.
+        한 번에 같은 doc_id가 여러 번 들어오면 마지막 것만 색인합니다.
+        """
+        documents = list({doc.doc_id: doc for doc in documents}.values())
+        self._load()
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            name = f"seg-{self._next_segment:06d}"
+            _IndexSegment.write(os.path.join(self.path, name), documents, self.passage_chars)
+            segments = self._segments + [_IndexSegment(os.path.join(self.path, name))]
+            self._next_segment += 1
+
+            tmp_manifest = self._manifest_path() + ".tmp"
+            with open(tmp_manifest, "w", encoding="utf-8") as f:
+                json.dump({"segments": [s.name for s in segments], "next_segment": self._next_segment}, f)
+            os.replace(tmp_manifest, self._manifest_path())
+            self._set_segments(segments)
+            return name
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        kind: Optional[str] = None,
+        doc_ids: Optional[List[str]] = None,
+    ) -> List["SearchHit"]:
+        segments = self._load()
+        term_hashes = [_term_hash(t) for t in dict.fromkeys(_search_terms(query))]
+        if not term_hashes or not self._live_passages:
+            return []
+
+        n = self._live_passages
+        avgdl = self._live_length / n
+        k1, b = self.k1, self.b
+
+        # 전역 df로 IDF 계산. n과 같은 기준이 되도록 살아 있는 패시지의 포스팅만 셈
+        # (다시 색인돼 가려진 패시지까지 세면 df > n이 되어 IDF가 음수가 됨)
+        per_segment = [[seg.postings(h) for h in term_hashes] for seg in segments]
+        df = np.zeros(len(term_hashes), dtype=np.float64)
+        for segment, plists in zip(segments, per_segment):
+            for j, (ids, _tf) in enumerate(plists):
+                if len(ids):
+                    df[j] += int(np.count_nonzero(segment.live[ids]))
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+        candidates: List[Tuple[float, int, int]] = []
+        for seg_index, (segment, plists) in enumerate(zip(segments, per_segment)):
+            if not any(len(ids) for ids, _tf in plists):
+                continue
+            scores = np.zeros(len(segment.passages), dtype=np.float32)
+            norm = k1 * (1.0 - b + b * segment.passage_length / avgdl)
+            for j, (ids, tf) in enumerate(plists):
+                if len(ids):
+                    scores[ids] += idf[j] * tf * (k1 + 1.0) / (tf + norm[ids])
+
+            mask = segment.live
+            if kind is not None or doc_ids is not None:
+                wanted = np.array([
+                    (kind is None or d["kind"] == kind) and (doc_ids is None or d["doc_id"] in doc_ids)
+                    for d in segment.docs
+                ], dtype=bool)
+                mask = mask & wanted[segment.passages["doc"]]
+            scores[~mask] = 0.0
+
+            k = min(top_k, int(np.count_nonzero(scores)))
+            if k <= 0:
+                continue
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates.extend((float(scores[i]), seg_index, int(i)) for i in top)
+
+        candidates.sort(key=lambda c: -c[0])
+        hits: List[SearchHit] = []
+        for score, seg_index, passage_index in candidates[:top_k]:
+            segment = segments[seg_index]
+            row = segment.passages[passage_index]
+            doc = segment.docs[int(row["doc"])]
+            hits.append(SearchHit(
+                doc_id=doc["doc_id"],
+                kind=doc["kind"],
+                page=int(row["page"]),
+                offset=int(row["offset"]),
+                score=round(score, 4),
+                snippet=segment.passage_text(passage_index)[:SEARCH_SNIPPET_CHARS],
+            ))
+        return hits
+
+    def stats(self) -> dict:
+        segments = self._load()
+        docs = {d["doc_id"] for s in segments for d in s.docs}
+        return {
+            "path": self.path,
+            "segments": len(segments),
+            "documents": len(docs),
+            "live_passages": self._live_passages,
+            "avg_passage_terms": (self._live_length / self._live_passages) if self._live_passages else 0.0,
+        }
+
+
+document_index = DocumentIndex(SEARCH_INDEX_DIR, SEARCH_PASSAGE_CHARS, SEARCH_BM25_K1, SEARCH_BM25_B)
+
+
+def _search_documents_internal(
+    query: str,
+    top_k: int = 10,
+    kind: Optional[str] = None,
+    doc_ids: Optional[List[str]] = None,
+) -> SearchResponse:
+    started = time.perf_counter()
+    hits = document_index.search(query, top_k, kind, doc_ids)
+    return SearchResponse(query=query, hits=hits, took_ms=round((time.perf_counter() - started) * 1000, 3))
+
+
+@mcp.tool
+def search_documents(
+    query: str,
+    top_k: int = 10,
+    kind: Optional[Literal["standard", "company"]] = None,
+    doc_ids: Optional[List[str]] = None,
+) -> SearchResponse:
+    """
+    색인된 기준서/회사 문서에서 질의와 관련된 패시지를 BM25로 찾습니다.
+    생성한 문장의 근거(문서, 페이지, 오프셋)를 인용할 때 사용합니다.
+
+    parameters:
+        query: 검색 질의 (문장 그대로 넣어도 됨)
+        top_k: 반환할 최대 패시지 수
+        kind: "standard"(기준서) 또는 "company"(회사 문서)로 범위 제한
+        doc_ids: 특정 문서들로 범위 제한
+    """
+    return _search_documents_internal(query, top_k, kind, doc_ids)
+
+
+# =========================
+# REST API Request 스키마
+# =========================
+
+class MapRequest(BaseModel):
+    raw_text: str
+    industry: str
+    jurisdiction: str = "IFRS"
+    mode: Literal["fast", "semantic", "accurate", "auto"] = "auto"  # 하이브리드 모드
+
+
+class MapBatchRequest(BaseModel):
+    paragraphs: List[str]
+    industry: str
+    jurisdiction: str = "IFRS"
+    mode: Literal["fast", "semantic", "accurate", "auto"] = "auto"
+
+
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 10
+    kind: Optional[Literal["standard", "company"]] = None
+    doc_ids: Optional[List[str]] = None
+
+
+class IndexDocumentRequest(BaseModel):
+    doc_id: str
+    pages: List[str]             # 페이지별 텍스트 (페이지 번호는 1부터)
+    kind: Literal["standard", "company"] = "company"
+
+
+class IndexDocumentsRequest(BaseModel):
+    documents: List[IndexDocumentRequest]
+
+
+class ValidateRequest(BaseModel):
+    codes: List[str]
+    draft_text: str
+    industry: str = "은행"
+
+
+class TextAnalysisRequest(BaseModel):
+    """텍스트 분석 요청 모델"""
     raw_text: str
     industry: str = "IT서비스"
     jurisdiction: str = "대한민국"
+    include_text: bool = True   # False면 응답에 원문(pdf_text)을 다시 싣지 않음
+    compact: bool = False       # True면 이슈 카탈로그 + ID/오프셋 참조 형태로 응답 (CompactAnalysisResponse)
+
+
+class TextAnalysisStreamRequest(TextAnalysisRequest):
+    """스트리밍 텍스트 분석 요청 모델"""
+    format: Literal["ndjson", "sse"] = "ndjson"
+    include_text: bool = False  # 스트리밍에서는 기본적으로 원문을 생략
 
 
 # =========================
@@ -1078,8 +3260,9 @@ def read_root():
         "message": "IFRS S2 Navigator API - REST Wrapper for MCP Tools",
         "modes": {
             "fast": "룰 기반만 사용 (즉시 응답)",
+            "semantic": "룰 기반 + 오프라인 의미 유사도 인덱스 (즉시 응답, LLM 없음)",
             "accurate": "룰 기반 힌트 + LLM 최종 결정 (2-3초)",
-            "auto": "룰 기반 먼저 → 신뢰도 낮으면 LLM 호출 (기본값)"
+            "auto": "룰 기반 먼저 → 신뢰도 낮으면 시맨틱 → 그래도 애매하면 LLM 호출 (기본값)"
         }
     }
 
@@ -1090,49 +3273,180 @@ def health_check():
         "status": "healthy",
         "available_tools": ["map_to_ifrs_s2", "validate_disclosure"],
         "llm_model": LLM_MODEL,
+        "llm_base_url": LLM_BASE_URL,
+        "llm_circuit": llm_breaker.state,
     }
 
 
+@api.get("/metrics")
+def metrics() -> Response:
+    """Prometheus 스크레이프 엔드포인트"""
+    return Response(generate_latest(METRICS_REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+@api.get("/api/llm-cache/stats")
+def llm_cache_stats():
+    """LLM 응답 캐시의 히트/미스/바이트 카운터와 단계별 상태를 반환합니다."""
+    return llm_cache.stats()
+
+
+@api.get("/api/llm-usage")
+def llm_usage_stats():
+    """(테넌트, 엔드포인트)별 LLM 토큰 사용량, 분/일 예산 소진 상태, 서킷 브레이커 상태를 반환합니다."""
+    return {**llm_usage.stats(), "circuit_breaker": llm_breaker.stats()}
+
+
 @api.post("/api/map", response_model=MappingResult)
-def api_map(payload: MapRequest) -> MappingResult:
+async def api_map(payload: MapRequest) -> FastJSONResponse:
     """
     TCFD/ESG 텍스트를 IFRS S2 요구사항에 매핑합니다.
     
-    - mode: "fast" (룰만), "accurate" (LLM), "auto" (하이브리드, 기본값)
+    - mode: "fast" (룰만), "semantic" (룰 + 의미 유사도), "accurate" (LLM), "auto" (하이브리드, 기본값)
     """
-    return _hybrid_mapping(
+    return FastJSONResponse(await _hybrid_mapping(
         payload.raw_text, 
         payload.industry, 
         payload.jurisdiction, 
         payload.mode
-    )
+    ))
+
+
+@api.post("/api/map/batch", response_model=MapBatchResponse)
+async def api_map_batch(payload: MapBatchRequest) -> FastJSONResponse:
+    """
+    여러 문단을 한 번에 IFRS S2 요구사항에 매핑합니다.
+    룰 신뢰도가 낮은 문단만 모아 소수의 LLM 호출로 처리합니다.
+    """
+    if len(payload.paragraphs) > MAP_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=_MAP_BATCH_TOO_MANY_ITEMS.format(limit=MAP_BATCH_MAX_ITEMS))
+    return FastJSONResponse(await _batch_mapping(
+        payload.paragraphs,
+        payload.industry,
+        payload.jurisdiction,
+        payload.mode,
+    ))
+
+
+@api.post("/api/search", response_model=SearchResponse)
+def api_search(payload: SearchRequest) -> FastJSONResponse:
+    """
+    색인된 기준서/회사 문서에서 BM25로 패시지를 검색합니다.
+    결과마다 (doc_id, page, offset, score)를 돌려주므로 문장 근거 인용에 사용할 수 있습니다.
+    """
+    return FastJSONResponse(_search_documents_internal(payload.query, payload.top_k, payload.kind, payload.doc_ids))
+
+
+@api.post("/api/search/documents", response_model=IndexDocumentsResponse)
+def api_index_documents(payload: IndexDocumentsRequest) -> IndexDocumentsResponse:
+    """
+    문서들을 검색 인덱스에 추가합니다. (새 세그먼트로 append, 같은 doc_id는 최신 것으로 대체)
+    """
+    if not payload.documents:
+        raise HTTPException(status_code=400, detail="documents가 비어 있습니다.")
+    segment = document_index.add_documents([
+        IndexedDocument(doc_id=d.doc_id, pages=d.pages, kind=d.kind)
+        for d in payload.documents
+    ])
+    return IndexDocumentsResponse(segment=segment, documents=len(payload.documents), stats=document_index.stats())
+
+
+@api.get("/api/search/stats")
+def api_search_stats():
+    """검색 인덱스의 세그먼트/문서/패시지 수를 반환합니다."""
+    return document_index.stats()
 
 
 @api.post("/api/validate", response_model=ValidationResult)
-def api_validate(payload: ValidateRequest) -> ValidationResult:
+def api_validate(payload: ValidateRequest) -> FastJSONResponse:
     """
     작성된 공시 문단이 IFRS S2 요구사항을 충족하는지 검증합니다.
     """
-    return _validate_disclosure_internal(payload.codes, payload.draft_text, payload.industry)
+    return FastJSONResponse(_validate_disclosure_internal(payload.codes, payload.draft_text, payload.industry))
 
 @api.post("/api/enhance-paragraph", response_model=EnhanceParagraphResponse)
-def api_enhance_paragraph(payload: EnhanceParagraphRequest) -> EnhanceParagraphResponse:
+async def api_enhance_paragraph(payload: EnhanceParagraphRequest) -> FastJSONResponse:
     """
     단일 문단을 지정된 IFRS S2 코드 기준으로 분석하여
     부족한 요소를 보여주고, AI가 보완한 완성 문단을 반환합니다.
     """
-    req, elements, completed = _enhance_paragraph_internal(
+    req, elements, completed, degraded = await _enhance_paragraph_internal(
         payload.paragraph,
         payload.ifrs_code,
         payload.user_message,
     )
     title = req.title if req else f"IFRS S2 {payload.ifrs_code}"
 
-    return EnhanceParagraphResponse(
+    return FastJSONResponse(EnhanceParagraphResponse(
         ifrs_code=payload.ifrs_code,
         ifrs_title=title,
         missing_elements=elements,
         completed_paragraph=completed,
+        degraded=degraded,
+    ))
+
+
+@api.post("/api/enhance-paragraph/stream")
+async def api_enhance_paragraph_stream(payload: EnhanceParagraphStreamRequest) -> StreamingResponse:
+    """
+    /api/enhance-paragraph의 스트리밍 버전입니다.
+    레코드 순서: elements(ifrs_code, ifrs_title, missing_elements) → token({"text": 조각}, 여러 번)
+    → done(EnhanceParagraphResponse 전체). 형식은 /api/demo/analyze-text/stream과 같습니다.
+    """
+    fmt = payload.format
+
+    async def body():
+        async for event, data_json in _iter_enhance_events(payload.paragraph, payload.ifrs_code, payload.user_message):
+            yield _encode_stream_record(fmt, event, data_json)
+
+    return StreamingResponse(
+        body(),
+        media_type=_STREAM_MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _check_enhance_batch_size(items: List[EnhanceParagraphRequest]) -> None:
+    if len(items) > ENHANCE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"한 번에 최대 {ENHANCE_BATCH_MAX_ITEMS}개 문단까지 보완할 수 있습니다.",
+        )
+
+
+@api.post("/api/enhance-paragraph/batch", response_model=EnhanceParagraphBatchResponse)
+async def api_enhance_paragraph_batch(payload: EnhanceParagraphBatchRequest) -> FastJSONResponse:
+    """
+    여러 문단을 한 번에 보완합니다. 필수 요소 평가는 한 번에, LLM 호출은 병렬로 수행하므로
+    전체 소요 시간은 대략 가장 느린 문단 하나의 시간입니다. 결과는 요청 순서와 같습니다.
+    """
+    _check_enhance_batch_size(payload.items)
+    return FastJSONResponse(await _enhance_batch_internal(payload.items, payload.concurrency, payload.item_timeout))
+
+
+@api.post("/api/enhance-paragraph/batch/stream")
+async def api_enhance_paragraph_batch_stream(payload: EnhanceParagraphBatchStreamRequest) -> StreamingResponse:
+    """
+    /api/enhance-paragraph/batch의 스트리밍 버전입니다.
+    레코드: item({"index": 요청 내 위치, ...EnhanceParagraphResponse}, order에 따라 입력 순/완료 순) → summary
+    """
+    _check_enhance_batch_size(payload.items)
+    fmt = payload.format
+
+    async def body():
+        degraded = 0
+        async for index, response in _iter_enhance_batch(
+            payload.items, payload.concurrency, payload.item_timeout, ordered=payload.order == "ordered"
+        ):
+            degraded += response.degraded
+            data_json = json.dumps({"index": index, **response.model_dump()}, ensure_ascii=False)
+            yield _encode_stream_record(fmt, "item", data_json)
+        summary = json.dumps({"total": len(payload.items), "degraded": degraded})
+        yield _encode_stream_record(fmt, "summary", summary)
+
+    return StreamingResponse(
+        body(),
+        media_type=_STREAM_MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -1140,10 +3454,42 @@ def api_enhance_paragraph(payload: EnhanceParagraphRequest) -> EnhanceParagraphR
 # 데모: 텍스트 입력 + 분석 엔드포인트
 # =========================
 
-@api.post("/api/demo/analyze-text", response_model=DemoAnalysisResponse)
-async def analyze_text(payload: TextAnalysisRequest):
+def _full_issue_catalog() -> dict:
+    """스트리밍 압축 응답의 meta에 싣는 전체 카탈로그 (어떤 이슈가 나올지 미리 모르므로)."""
+    return {
+        "issue_catalog": {issue_id: issue.model_dump() for issue_id, issue in VALIDATION_ISSUES.items()},
+        "group_titles": {gc: display_group_name(gc) for gc in _SORTED_GROUP_CODES},
+    }
+
+
+def _compact_analysis_response(
+    pdf_text: str,
+    pdf_meta: dict,
+    checklist: List[ChecklistItem],
+    compact: List[CompactSentenceSuggestion],
+) -> CompactAnalysisResponse:
+    """
+    DemoAnalysisResponse 대신 응답에 등장한 이슈/그룹만 카탈로그로 묶은 압축 응답을 만듭니다.
+    compact는 분석 행에서 바로 만든 문장들입니다 (build=_compact_from_row).
+    """
+    issue_ids = {issue_id for item in compact for issue_id in item.issue_ids}
+    group_codes = {gc for item in compact for gc in item.ifrs_codes}
+    return CompactAnalysisResponse(
+        pdf_text=pdf_text,
+        pdf_meta=pdf_meta,
+        checklist=checklist,
+        issue_catalog={issue_id: VALIDATION_ISSUES[issue_id] for issue_id in sorted(issue_ids)},
+        group_titles={gc: display_group_name(gc) for gc in sorted(group_codes)},
+        sentence_suggestions=compact,
+    )
+
+
+@api.post("/api/demo/analyze-text", response_model=Union[DemoAnalysisResponse, CompactAnalysisResponse])
+async def analyze_text(payload: TextAnalysisRequest) -> FastJSONResponse:
     """
     텍스트를 받아 IFRS S2 필수 체크리스트를 계산합니다. (PDF 대체 기능)
+    compact=True면 이슈 본문을 issue_catalog에 한 번만 싣고, 문장은 issue_ids와 오프셋(start/end)만 가집니다.
+    문장 원문은 raw_text[start:end]로 복원합니다.
     """
     input_text = payload.raw_text
     
@@ -1151,169 +3497,914 @@ async def analyze_text(payload: TextAnalysisRequest):
         raise HTTPException(status_code=400, detail="분석할 텍스트를 입력해야 합니다.")
     
     # 4) 체크리스트 계산 (기존 IFRS S2 룰 엔진 재사용)
-    checklist = build_checklist_from_text(input_text, industry=payload.industry)
-    
-    # 5) 문장 단위 분석
-    sentence_suggestions = _analyze_pdf_sentences(
+    # 5) 문장 단위 분석 (큰 문서는 프로세스 풀로 샤딩)
+    checklist, sentence_suggestions = await analyze_document_async(
         input_text,
         industry=payload.industry,
         jurisdiction=payload.jurisdiction,
+        build=_compact_from_row if payload.compact else _suggestion_from_row,
     )
     
     # 6) 응답
-    return DemoAnalysisResponse(
-        pdf_text=input_text,
-        pdf_meta={
-            "filename": "User Input Text",  # 파일명 대신 사용자 입력 텍스트임을 명시
-            "page_index": 0,
-        },
+    if payload.compact:
+        return FastJSONResponse(_compact_analysis_response(
+            input_text if payload.include_text else "",
+            _text_input_meta(),
+            checklist,
+            sentence_suggestions,
+        ))
+    return FastJSONResponse(DemoAnalysisResponse(
+        pdf_text=input_text if payload.include_text else "",
+        pdf_meta=_text_input_meta(),
         checklist=checklist,
         sentence_suggestions=sentence_suggestions,
-    )
+    ))
 
 
 # =========================
-# 데모: PDF 문장 단위 분석 헬퍼
+# 데모: 스트리밍 분석 (NDJSON / SSE)
+#  - 문장 분석 결과를 계산되는 즉시 한 건씩 내보내고, 마지막에 체크리스트와 요약을 보냄
 # =========================
 
-def _paragraph_code_to_group_code(paragraph_code: str) -> Optional[str]:
+# 한 번에 배치 분석할 문장 수 (작을수록 첫 결과가 빨리 나감)
+ANALYZE_STREAM_CHUNK_SIZE = int(os.getenv("ANALYZE_STREAM_CHUNK_SIZE", "32"))
+
+_STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def _text_input_meta() -> dict:
+    return {
+        "filename": "User Input Text",  # 파일명 대신 사용자 입력 텍스트임을 명시
+        "page_index": 0,
+    }
+
+
+def _encode_stream_record(fmt: str, event: str, data_json: str) -> str:
+    """레코드 하나를 NDJSON 한 줄 또는 SSE 이벤트 하나로 인코딩합니다."""
+    if fmt == "sse":
+        return f"event: {event}\ndata: {data_json}\n\n"
+    return f'{{"type": "{event}", "data": {data_json}}}\n'
+
+
+def _iter_analysis_records(payload: TextAnalysisStreamRequest) -> Iterator[Tuple[str, str]]:
     """
-    룰/매핑 결과에서 나오는 IFRS S2 단락 코드(예: "5–7", "22–23,25", "29(a)–29(c)")
-    를 S2 그룹 코드(예: "S2-5", "S2-15", "S2-9")로 변환합니다.
+    (이벤트 이름, JSON 문자열) 레코드를 순서대로 생성합니다.
+    meta → sentence(0개 이상) → checklist → summary
+    문장은 ANALYZE_STREAM_CHUNK_SIZE개씩만 메모리에 올려 분석합니다.
     """
-    if not paragraph_code:
-        return None
+    started = time.perf_counter()
+    text = payload.raw_text
+
+    meta: dict = {"pdf_meta": _text_input_meta()}
+    if payload.include_text:
+        meta["pdf_text"] = text
+    if payload.compact:
+        meta.update(_full_issue_catalog())
+    yield "meta", json.dumps(meta, ensure_ascii=False)
+
+    sentence_count = 0
+    status_counts = {"pass": 0, "partial": 0, "fail": 0}
+    first_result_ms: Optional[float] = None
+    spans = _iter_sentence_spans(text)
+    build = _compact_from_row if payload.compact else _suggestion_from_row
+
+    while True:
+        chunk = list(islice(spans, ANALYZE_STREAM_CHUNK_SIZE))
+        if not chunk:
+            break
+        for suggestion in _analyze_span_batch(
+            text, chunk, industry=payload.industry, index_offset=sentence_count, build=build,
+        ):
+            status_counts[suggestion.overall_status] += 1
+            if first_result_ms is None:
+                first_result_ms = (time.perf_counter() - started) * 1000
+            yield "sentence", suggestion.model_dump_json()
+        sentence_count += len(chunk)
+
+    checklist = build_checklist_from_text(text, industry=payload.industry)
+    yield "checklist", json.dumps([item.model_dump() for item in checklist], ensure_ascii=False)
+
+    yield "summary", json.dumps({
+        "sentence_count": sentence_count,
+        "suggestion_count": sum(status_counts.values()),
+        "suggestion_status": status_counts,
+        "checklist_status": {item.code: item.status for item in checklist},
+        "first_result_ms": round(first_result_ms, 3) if first_result_ms is not None else None,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }, ensure_ascii=False)
+
+
+@api.post("/api/demo/analyze-text/stream")
+def analyze_text_stream(payload: TextAnalysisStreamRequest) -> StreamingResponse:
+    """
+    /api/demo/analyze-text의 스트리밍 버전입니다.
 
-    normalized = paragraph_code.replace(" ", "")
-    # 거버넌스: 5–7
-    if "5–7" in normalized or "5-7" in normalized:
-        return "S2-5"
-    # 시나리오 분석: 22–23, 25
-    if "22–23" in normalized or "22-23" in normalized or "25" in normalized:
-        return "S2-15"
-    # 지표/배출: 29(a)–29(c), 33–36 등
-    if "29(a)" in normalized or "29(a)–29(c)" in normalized or "29(a)-29(c)" in normalized:
-        return "S2-9"
-    if "33" in normalized or "34" in normalized or "35" in normalized or "36" in normalized:
-        return "S2-9"
+    - format="ndjson": 한 줄에 {"type": ..., "data": ...} 레코드 하나
+    - format="sse": event/data 형식의 server-sent events
+    레코드 순서: meta → sentence(SentenceSuggestion, 계산 즉시) → checklist → summary
+    include_text=False(기본값)이면 meta에 원문을 싣지 않습니다.
+    compact=True면 meta에 전체 issue_catalog/group_titles를 싣고 sentence는 CompactSentenceSuggestion입니다.
+    """
+    if not payload.raw_text.strip():
+        raise HTTPException(status_code=400, detail="분석할 텍스트를 입력해야 합니다.")
 
-    return None
+    fmt = payload.format
+    body = (
+        _encode_stream_record(fmt, event, data_json)
+        for event, data_json in _iter_analysis_records(payload)
+    )
+    return StreamingResponse(
+        body,
+        media_type=_STREAM_MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-def _split_into_sentences(text: str) -> List[str]:
+# =========================
+# 데모: 파일 업로드 분석 (PDF / DOCX / XLSX)
+#  - 업로드 파일을 청크 단위로 임시 파일에 쓰고, 페이지를 하나씩 꺼내 바로 문장 분석
+#  - PDF는 페이지 범위 단위로 프로세스 풀에서 병렬 추출 (진행 중 작업 수 제한)
+#  - 페이지 경계에서 끊긴 문장은 다음 페이지 앞에 이어 붙여 분석 (슬라이딩 윈도우)
+#  - 메모리는 파일 전체가 아니라 페이지(+진행 중인 추출 작업) 크기에 비례
+# =========================
+
+INGEST_MAX_UPLOAD_BYTES = int(os.getenv("INGEST_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+INGEST_UPLOAD_CHUNK_BYTES = 1024 * 1024
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "8"))          # 워커 작업 1건당 PDF 페이지 수
+INGEST_DOCX_PARAGRAPHS_PER_PAGE = int(os.getenv("INGEST_DOCX_PARAGRAPHS_PER_PAGE", "40"))  # 페이지 나눔이 없을 때
+INGEST_XLSX_ROWS_PER_PAGE = int(os.getenv("INGEST_XLSX_ROWS_PER_PAGE", "200"))
+# 다음 페이지로 넘길 수 있는 미완성 문장 최대 길이 (넘으면 그 자리에서 분석)
+INGEST_MAX_CARRY_CHARS = 4000
+
+_INGEST_KINDS = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".xlsx": "xlsx",
+}
+
+_SENTENCE_TERMINATORS = ".!?。"
+
+
+def _ingest_kind(filename: str) -> str:
+    kind = _INGEST_KINDS.get(os.path.splitext(filename or "")[1].lower())
+    if kind is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"지원하지 않는 파일 형식입니다. ({', '.join(_INGEST_KINDS)})",
+        )
+    return kind
+
+
+def _pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_pdf_page_range(path: str, start: int, stop: int) -> List[str]:
+    """워커에서 실행: PDF의 [start, stop) 페이지 텍스트를 추출합니다."""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _iter_pdf_pages(path: str) -> Iterator[Tuple[int, str]]:
+    page_count = _pdf_page_count(path)
+    ranges = [
+        (start, min(page_count, start + INGEST_PAGES_PER_TASK))
+        for start in range(0, page_count, INGEST_PAGES_PER_TASK)
+    ]
+    pool = _get_analysis_pool() if len(ranges) > 1 else None
+    if pool is None:
+        for start, stop in ranges:
+            for offset, text in enumerate(_extract_pdf_page_range(path, start, stop)):
+                yield start + offset + 1, text
+        return
+
+    # 진행 중 작업은 워커 수의 2배까지만 유지하고, 결과는 페이지 순서대로 내보냄
+    window = max(2, ANALYSIS_WORKERS * 2)
+    pending = []
+    next_range = 0
+    try:
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < window:
+                start, stop = ranges[next_range]
+                pending.append((start, pool.submit(_extract_pdf_page_range, path, start, stop)))
+                next_range += 1
+            start, future = pending.pop(0)
+            for offset, text in enumerate(future.result()):
+                yield start + offset + 1, text
+    finally:
+        for _start, future in pending:
+            future.cancel()
+
+
+def _docx_paragraph_segments(paragraph, rendered: bool) -> List[str]:
     """
-    매우 단순한 문장 분리:
-    - 줄바꿈(\n) 단위로 먼저 나누고
-    - 마침표/물음표/느낌표/일본어·중국어 마침표(。) 기준으로 다시 분리
+    문단 텍스트를 페이지 나눔 위치에서 자른 조각 목록 (나눔이 k개면 k+1개).
+    rendered=True면 Word가 저장한 rendered page break(lastRenderedPageBreak)만,
+    False(Word로 렌더링된 적 없는 생성 문서)면 직접 넣은 페이지 나눔(w:br type=page)만 봅니다.
     """
-    sentence_end = re.compile(r'(?<=[\.!?。])\s+')
-    sentences: List[str] = []
+    from docx.oxml.ns import qn
+    from docx.text.hyperlink import Hyperlink
+    from docx.text.pagebreak import RenderedPageBreak
+
+    if rendered and not paragraph.contains_page_break:
+        return [paragraph.text]
+    if not rendered and not paragraph._p.xpath("./w:r/w:br[@w:type='page'] | ./w:hyperlink/w:r/w:br[@w:type='page']"):
+        return [paragraph.text]
+
+    segments = [""]
+    for item in paragraph.iter_inner_content():
+        for run in item.runs if isinstance(item, Hyperlink) else [item]:
+            if rendered:
+                for content in run.iter_inner_content():
+                    if isinstance(content, RenderedPageBreak):
+                        segments.append("")
+                    elif isinstance(content, str):
+                        segments[-1] += content
+                continue
+            # Run.iter_inner_content()는 w:br(type=page)를 ""로 합쳐 버리므로 요소를 직접 훑음
+            for element in run._r.xpath("w:br | w:cr | w:noBreakHyphen | w:ptab | w:t | w:tab"):
+                if element.tag == qn("w:br") and element.get(qn("w:type")) == "page":
+                    segments.append("")
+                else:
+                    segments[-1] += str(element)
+    return segments
 
-    for block in text.splitlines():
-        block = block.strip()
-        if not block:
-            continue
-        parts = sentence_end.split(block)
-        for p in parts:
-            p = p.strip()
-            if p:
-                sentences.append(p)
 
-    return sentences
+def _iter_docx_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """
+    페이지 나눔 위치 기준으로 페이지를 나누고, 없으면 문단 N개씩 묶습니다.
+    문단 중간/끝의 나눔은 그 위치에서 문단을 잘라 앞부분은 현재 페이지, 뒷부분은 다음 페이지에 넣습니다.
+    """
+    from docx import Document
+
+    paragraphs = Document(path).paragraphs
+    rendered = any(paragraph.contains_page_break for paragraph in paragraphs)
+    page_number = 1
+    lines: List[str] = []
+    for paragraph in paragraphs:
+        for i, segment in enumerate(_docx_paragraph_segments(paragraph, rendered)):
+            if i and lines:
+                yield page_number, "\n".join(lines)
+                page_number += 1
+                lines = []
+            if segment.strip():
+                lines.append(segment)
+            if len(lines) >= INGEST_DOCX_PARAGRAPHS_PER_PAGE:
+                yield page_number, "\n".join(lines)
+                page_number += 1
+                lines = []
+    if lines:
+        yield page_number, "\n".join(lines)
+
+
+def _iter_xlsx_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """시트를 read-only로 한 행씩 읽고, INGEST_XLSX_ROWS_PER_PAGE행(시트 경계 포함)마다 페이지로 나눕니다."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    page_number = 1
+    try:
+        for sheet in workbook.worksheets:
+            lines: List[str] = []
+            for row in sheet.iter_rows(values_only=True):
+                cells = [str(v).strip() for v in row if v is not None and str(v).strip()]
+                if cells:
+                    lines.append(" | ".join(cells))
+                if len(lines) >= INGEST_XLSX_ROWS_PER_PAGE:
+                    yield page_number, "\n".join(lines)
+                    page_number += 1
+                    lines = []
+            if lines:
+                yield page_number, "\n".join(lines)
+                page_number += 1
+    finally:
+        workbook.close()
+
+
+_PAGE_ITERATORS = {
+    "pdf": _iter_pdf_pages,
+    "docx": _iter_docx_pages,
+    "xlsx": _iter_xlsx_pages,
+}
 
 
-def _analyze_pdf_sentences(
+class _PagedAnalysisState:
+    """페이지 단위 분석 중 누적되는 값 (문장 수, 필수 요소 raw 판정 결과)."""
+
+    def __init__(self) -> None:
+        self.pages = 0
+        self.sentence_count = 0
+        self.raw_mask = 0
+        self.has_number = False
+
+    def checklist(self, industry: str) -> List[ChecklistItem]:
+        present_mask = _ELEMENT_DETECTORS.finalize(self.raw_mask, self.has_number)
+        return build_checklist_from_text("", industry=industry, present_mask=present_mask)
+
+
+# 윈도우 텍스트의 한 구간이 어느 페이지에서 왔는지: (윈도우 시작, 윈도우 끝, 페이지 번호, 페이지 오프셋 - 윈도우 오프셋)
+_PageSegment = Tuple[int, int, int, int]
+
+
+def _analyze_page_window(
     text: str,
-    industry: str = "IT서비스",
-    jurisdiction: str = "대한민국",
+    segments: List[_PageSegment],
+    industry: str,
+    state: _PagedAnalysisState,
+    build: Optional["_RowBuilder"] = None,
 ) -> List[SentenceSuggestion]:
     """
-    PDF 1페이지 텍스트를 문장 단위로 쪼개서:
-    1) 각 문장이 어떤 IFRS S2 단락과 관련 있는지 RULES/매핑으로 판단
-    2) 관련된 S2 그룹 코드(S2-5/S2-15/S2-9)에 대해 _validate_disclosure_internal 실행
-    3) 부족한 정보(ValidationIssue.suggestion)를 SentenceSuggestion으로 묶어서 반환
+    윈도우 텍스트를 분석하고, 문장이 시작한 구간의 페이지로 태그합니다.
+    start/end는 그 페이지 텍스트 기준 오프셋이며, 문장이 페이지 경계를 넘으면 None입니다.
+    build가 없으면 SentenceSuggestion을 만듭니다 (_analyze_span_batch 참고).
     """
-    sentences = _split_into_sentences(text)
-    suggestions: List[SentenceSuggestion] = []
+    raw_mask, has_number = _ELEMENT_DETECTORS.detect_raw(text)
+    state.raw_mask |= raw_mask
+    state.has_number = state.has_number or has_number
 
-    for idx, sent in enumerate(sentences):
-        # 너무 짧은 문장은 제외 (예: 캡션, 제목 등)
-        if len(sent) < 10:
-            continue
+    spans = _split_sentence_spans(text)
+    suggestions = _analyze_span_batch(
+        text, spans, industry=industry, index_offset=state.sentence_count, build=build or _suggestion_from_row,
+    )
+    segment_starts = [segment[0] for segment in segments]
+    for suggestion in suggestions:
+        seg_start, seg_end, page, shift = segments[max(0, bisect_right(segment_starts, suggestion.start) - 1)]
+        suggestion.page = page
+        if suggestion.end <= seg_end:
+            suggestion.start += shift
+            suggestion.end += shift
+        else:
+            suggestion.start = suggestion.end = None
+    state.sentence_count += len(spans)
+    return suggestions
 
-        # 1) 룰 기반 매핑 (빠르게)
-        mapping = _hybrid_mapping(
-            raw_text=sent,
-            industry=industry,
-            jurisdiction=jurisdiction,
-            mode="fast",   # 여기서는 LLM까지 안 쓰고 RULES만 사용
-        )
 
-        # 2) 매핑 결과의 코드(예: "5–7")를 S2 그룹 코드("S2-5")로 변환
-        group_codes: set[str] = set()
-        for cand in mapping.candidates:
-            if cand.code == "(검토 필요)":
-                continue
-            group_code = _paragraph_code_to_group_code(cand.code)
-            if group_code:
-                group_codes.add(group_code)
+def _iter_paged_suggestions(
+    pages: Iterator[Tuple[int, str]],
+    industry: str,
+    state: _PagedAnalysisState,
+    build: Optional["_RowBuilder"] = None,
+) -> Iterator[Tuple[int, List[SentenceSuggestion]]]:
+    """
+    (페이지 번호, 페이지 텍스트)를 받아 (페이지 번호, 그 페이지에서 확정된 문장 제안)을 순서대로 냅니다.
+    페이지 마지막 줄이 문장 부호로 끝나지 않으면 다음 페이지 첫 줄과 공백으로 이어 붙여 분석합니다.
+    """
+    carry = ""
+    carry_segments: List[_PageSegment] = []
+    for page_number, page_text in pages:
+        state.pages += 1
+        if carry:
+            body_text = page_text.lstrip()
+            window = f"{carry} {body_text}"
+            page_start = len(carry) + 1
+            segments = carry_segments + [
+                (page_start, len(window), page_number, len(page_text) - len(body_text) - page_start)
+            ]
+        else:
+            window = page_text
+            segments = [(0, len(window), page_number, 0)]
+
+        stripped = window.rstrip()
+        last_break = max(stripped.rfind("\n"), stripped.rfind("\r"))
+        tail = stripped[last_break + 1:]
+        if tail and tail[-1] not in _SENTENCE_TERMINATORS and len(tail) <= INGEST_MAX_CARRY_CHARS:
+            # 미완성 마지막 줄은 다음 페이지로 넘김 (구간 정보도 carry 기준으로 옮김)
+            body = stripped[:last_break + 1]
+            c0, c1 = last_break + 1, len(stripped)
+            carry_segments = [
+                (max(ws, c0) - c0, min(we, c1) - c0, page, shift + c0)
+                for ws, we, page, shift in segments
+                if ws < c1 and we > c0
+            ]
+            carry = tail
+        else:
+            body = window
+            carry = ""
 
-        # 어떤 S2 그룹과도 연관이 없으면 이 문장은 스킵
-        if not group_codes:
-            continue
+        yield page_number, _analyze_page_window(body, segments, industry, state, build) if body.strip() else []
 
-        # 3) 각 그룹 코드별로 검증 실행
-        all_issues: List[ValidationIssue] = []
-        status_list: List[str] = []
-        for gc in sorted(group_codes):
-            vr = _validate_disclosure_internal([gc], sent, industry)
-            all_issues.extend(vr.issues)
-            status_list.append(vr.overall_status)
+    if carry:
+        yield carry_segments[0][2], _analyze_page_window(carry, carry_segments, industry, state, build)
 
-        # 이 문장에 대해 실제로 문제가 없으면 굳이 노출하지 않음
-        if not all_issues:
-            continue
 
-        # 4) 전체 문장 상태: fail > partial > pass
-        if "fail" in status_list:
-            overall = "fail"
-        elif "partial" in status_list:
-            overall = "partial"
-        else:
-            overall = "pass"
+async def _save_upload(file: UploadFile, suffix: str) -> str:
+    """업로드 파일을 INGEST_UPLOAD_CHUNK_BYTES씩 임시 파일에 씁니다. (최대 INGEST_MAX_UPLOAD_BYTES)"""
+    fd, path = tempfile.mkstemp(prefix="ifrs_upload_", suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(INGEST_UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > INGEST_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="업로드 파일이 너무 큽니다.")
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    if size == 0:
+        os.unlink(path)
+        raise HTTPException(status_code=400, detail="빈 파일입니다.")
+    return path
+
+
+def _file_input_meta(filename: str, kind: str) -> dict:
+    return {
+        "filename": filename,
+        "file_type": kind,
+        "page_index": 0,  # 페이지별 결과는 SentenceSuggestion.page에 1부터 태그
+    }
 
-        # 그룹 코드를 한글 제목으로 변환
-        ifrs_titles = [display_group_name(gc) for gc in sorted(group_codes)]
-        
-        suggestions.append(
-            SentenceSuggestion(
-                sentence_index=idx,
-                sentence_text=sent,
-                ifrs_codes=sorted(group_codes),
-                ifrs_titles=ifrs_titles,
-                overall_status=overall,
-                issues=all_issues,
-            )
-        )
 
-    return suggestions
+def _iter_file_analysis_records(
+    path: str,
+    filename: str,
+    kind: str,
+    industry: str,
+    compact: bool = False,
+) -> Iterator[Tuple[str, str]]:
+    """
+    업로드 파일 스트리밍 분석 레코드: meta → (sentence…, page)×페이지 → checklist → summary
+    compact=True면 meta에 전체 이슈 카탈로그를 싣고 sentence는 CompactSentenceSuggestion입니다.
+    끝나면 임시 파일을 지웁니다.
+    """
+    started = time.perf_counter()
+    state = _PagedAnalysisState()
+    status_counts = {"pass": 0, "partial": 0, "fail": 0}
+    try:
+        meta: dict = {"pdf_meta": _file_input_meta(filename, kind)}
+        if compact:
+            meta.update(_full_issue_catalog())
+        yield "meta", json.dumps(meta, ensure_ascii=False)
+        build = _compact_with_text_from_row if compact else _suggestion_from_row
+        for page_number, suggestions in _iter_paged_suggestions(_PAGE_ITERATORS[kind](path), industry, state, build):
+            for suggestion in suggestions:
+                status_counts[suggestion.overall_status] += 1
+                yield "sentence", suggestion.model_dump_json()
+            yield "page", json.dumps({"page": page_number, "suggestion_count": len(suggestions)})
+
+        checklist = state.checklist(industry)
+        yield "checklist", json.dumps([item.model_dump() for item in checklist], ensure_ascii=False)
+        yield "summary", json.dumps({
+            "page_count": state.pages,
+            "sentence_count": state.sentence_count,
+            "suggestion_count": sum(status_counts.values()),
+            "suggestion_status": status_counts,
+            "checklist_status": {item.code: item.status for item in checklist},
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }, ensure_ascii=False)
+    finally:
+        os.unlink(path)
+
+
+@api.post("/api/demo/analyze-file", response_model=Union[DemoAnalysisResponse, CompactAnalysisResponse])
+async def analyze_file(
+    file: UploadFile = File(...),
+    industry: str = Form("IT서비스"),
+    jurisdiction: str = Form("대한민국"),
+    compact: bool = Form(False),
+) -> FastJSONResponse:
+    """
+    PDF/DOCX/XLSX 파일을 업로드받아 페이지별로 문장 분석을 하고 체크리스트를 계산합니다.
+    문장 제안마다 page(1부터)가 태그되며, 응답에 원문(pdf_text)은 싣지 않습니다.
+    compact=True면 이슈를 issue_catalog로 묶은 압축 응답을 돌려줍니다. (문장 원문은 그대로 포함)
+    """
+    kind = _ingest_kind(file.filename)
+    path = await _save_upload(file, os.path.splitext(file.filename)[1])
+
+    build = _compact_with_text_from_row if compact else _suggestion_from_row
+
+    def run() -> Tuple[List[ChecklistItem], List[SentenceSuggestion]]:
+        state = _PagedAnalysisState()
+        try:
+            suggestions = [
+                suggestion
+                for _page, page_suggestions in _iter_paged_suggestions(_PAGE_ITERATORS[kind](path), industry, state, build)
+                for suggestion in page_suggestions
+            ]
+        finally:
+            os.unlink(path)
+        return state.checklist(industry), suggestions
+
+    checklist, suggestions = await asyncio.to_thread(run)
+    if compact:
+        return FastJSONResponse(_compact_analysis_response(
+            "", _file_input_meta(file.filename, kind), checklist, suggestions,
+        ))
+    return FastJSONResponse(DemoAnalysisResponse(
+        pdf_text="",
+        pdf_meta=_file_input_meta(file.filename, kind),
+        checklist=checklist,
+        sentence_suggestions=suggestions,
+    ))
+
+
+@api.post("/api/demo/analyze-file/stream")
+async def analyze_file_stream(
+    file: UploadFile = File(...),
+    industry: str = Form("IT서비스"),
+    jurisdiction: str = Form("대한민국"),
+    format: Literal["ndjson", "sse"] = Form("ndjson"),
+    compact: bool = Form(False),
+) -> StreamingResponse:
+    """
+    /api/demo/analyze-file의 스트리밍 버전입니다. 페이지를 추출하는 대로 결과를 내보냅니다.
+    레코드 순서: meta → (sentence…, page)×페이지 → checklist → summary
+    """
+    kind = _ingest_kind(file.filename)
+    path = await _save_upload(file, os.path.splitext(file.filename)[1])
+    body = (
+        _encode_stream_record(format, event, data_json)
+        for event, data_json in _iter_file_analysis_records(path, file.filename, kind, industry, compact)
+    )
+    return StreamingResponse(
+        body,
+        media_type=_STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# =========================
+# 데모: 웹소켓 증분 재분석 세션
+#  - 상담형 UX에서 사용자가 문장을 하나씩 고칠 때 전체 텍스트를 다시 분석하지 않도록
+#    세션이 문장별 해시, 분석 결과, 필수 요소별 등장 문장 수를 들고 있음
+#  - 편집이 오면 바뀐 문장만 다시 분석하고 (splice, 새 제안, 상태가 바뀐 체크리스트 항목)만 돌려줌
+#  - 체크리스트는 문장 단위 판정을 합친 결과 (문장 경계를 넘는 패턴은 보지 않음)
+# =========================
+
+ANALYSIS_SESSION_MAX = int(os.getenv("ANALYSIS_SESSION_MAX", "256"))   # 메모리에 유지할 세션 수 (LRU)
+
+
+@dataclass(frozen=True)
+class _SentenceState:
+    group_mask: int                 # 노출 대상이 아니면 0
+    issue_ids: Tuple[str, ...]
+    raw_mask: int                   # 필수 요소 raw 판정 (숫자 조건 적용 전)
+    has_number: bool
+
+
+def _sentence_digest(sentence: str) -> bytes:
+    return hashlib.blake2b(sentence.encode("utf-8"), digest_size=16).digest()
+
+
+class AnalysisSession:
+    """
+    한 편집 세션의 문장 목록과 분석 상태.
+    - splice(): 문장 구간 [index, index+remove)를 새 텍스트의 문장들로 교체
+    - replace_text(): 전체 텍스트를 받아 앞/뒤 공통 문장을 제외한 구간만 splice
+    """
+
+    def __init__(self, session_id: str, industry: str):
+        self.session_id = session_id
+        self.industry = industry
+        self.sentences: List[str] = []
+        self.digests: List[bytes] = []
+        self.states: List[_SentenceState] = []
+        self._known: Dict[bytes, _SentenceState] = {}
+        self._element_counts = [0] * len(_ELEMENT_DETECTORS.bits)
+        self._number_count = 0
+        self._checklist: Dict[str, ChecklistItem] = {}
+        self.lock = asyncio.Lock()
+
+    def _states_for(self, sentences: List[str], digests: List[bytes]) -> Tuple[List[_SentenceState], int]:
+        """캐시에 없는 문장만 배치 분석합니다. (상태 목록, 새로 분석한 문장 수)"""
+        misses = [i for i, d in enumerate(digests) if d not in self._known]
+        if misses:
+            miss_sentences = [sentences[i] for i in misses]
+            batch_rows, stage_seconds = _sentence_batch_rows_timed(miss_sentences)
+            _observe_batch_stages(*stage_seconds)
+            rows = {idx: (group_mask, issue_ids) for idx, _start, _end, group_mask, issue_ids in batch_rows}
+            for k, i in enumerate(misses):
+                group_mask, issue_ids = rows.get(k, (0, ()))
+                raw_mask, has_number = _ELEMENT_DETECTORS.detect_raw(sentences[i])
+                self._known[digests[i]] = _SentenceState(group_mask, issue_ids, raw_mask, has_number)
+        return [self._known[d] for d in digests], len(misses)
+
+    def _count(self, states: List[_SentenceState], delta: int) -> None:
+        counts = self._element_counts
+        for state in states:
+            mask = state.raw_mask
+            bit = 0
+            while mask:
+                if mask & 1:
+                    counts[bit] += delta
+                mask >>= 1
+                bit += 1
+            if state.has_number:
+                self._number_count += delta
+
+    def _prune_known(self) -> None:
+        # 지워진 문장 결과는 되돌리기(undo)에 대비해 어느 정도 남겨 두고, 너무 커지면 현재 문장만 남김
+        if len(self._known) > 2 * len(self.states) + 1024:
+            self._known = dict(zip(self.digests, self.states))
+
+    def suggestions(self, start: int = 0, stop: Optional[int] = None) -> List[SentenceSuggestion]:
+        stop = len(self.states) if stop is None else stop
+        suggestions: List[SentenceSuggestion] = []
+        for i in range(start, stop):
+            state = self.states[i]
+            if state.group_mask:
+                suggestions.append(_suggestion_from_row(i, self.sentences[i], state.group_mask, state.issue_ids))
+        return suggestions
+
+    def checklist_changes(self) -> List[ChecklistItem]:
+        """현재 필수 요소 등장 수로 체크리스트를 다시 계산하고, 상태가 바뀐 항목만 반환합니다."""
+        raw_mask = 0
+        for bit, count in enumerate(self._element_counts):
+            if count:
+                raw_mask |= 1 << bit
+        present_mask = _ELEMENT_DETECTORS.finalize(raw_mask, self._number_count > 0)
+        changed: List[ChecklistItem] = []
+        for item in build_checklist_from_text("", industry=self.industry, present_mask=present_mask):
+            prev = self._checklist.get(item.code)
+            if prev is None or prev.status != item.status or prev.issues != item.issues:
+                changed.append(item)
+            self._checklist[item.code] = item
+        return changed
+
+    def checklist(self) -> List[ChecklistItem]:
+        return list(self._checklist.values())
+
+    def splice(self, index: int, remove: int, text: str) -> dict:
+        if not 0 <= index <= len(self.sentences) or remove < 0 or index + remove > len(self.sentences):
+            raise ValueError(f"잘못된 편집 범위입니다: index={index}, remove={remove}, sentences={len(self.sentences)}")
+        new_sentences = _split_into_sentences(text)
+        return self._apply(index, remove, new_sentences, [_sentence_digest(s) for s in new_sentences])
+
+    def replace_text(self, text: str) -> dict:
+        sentences = _split_into_sentences(text)
+        digests = [_sentence_digest(s) for s in sentences]
+        old = self.digests
+        prefix = 0
+        limit = min(len(old), len(digests))
+        while prefix < limit and old[prefix] == digests[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == digests[-1 - suffix]:
+            suffix += 1
+        stop = len(digests) - suffix
+        return self._apply(prefix, len(old) - suffix - prefix, sentences[prefix:stop], digests[prefix:stop])
+
+    def _apply(self, index: int, remove: int, new_sentences: List[str], new_digests: List[bytes]) -> dict:
+        started = time.perf_counter()
+        new_states, reanalyzed = self._states_for(new_sentences, new_digests)
+
+        self._count(self.states[index:index + remove], -1)
+        self._count(new_states, +1)
+        self.sentences[index:index + remove] = new_sentences
+        self.digests[index:index + remove] = new_digests
+        self.states[index:index + remove] = new_states
+        self._prune_known()
+
+        return {
+            "splice": {"index": index, "removed": remove, "inserted": len(new_sentences)},
+            "suggestions": [s.model_dump() for s in self.suggestions(index, index + len(new_sentences))],
+            "checklist": [item.model_dump() for item in self.checklist_changes()],
+            "sentence_count": len(self.sentences),
+            "reanalyzed": reanalyzed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "industry": self.industry,
+            "sentence_count": len(self.sentences),
+            "suggestions": [s.model_dump() for s in self.suggestions()],
+            "checklist": [item.model_dump() for item in self.checklist()],
+        }
+
+
+_analysis_sessions: "OrderedDict[str, AnalysisSession]" = OrderedDict()
+
+
+def _open_analysis_session(session_id: Optional[str], industry: str) -> AnalysisSession:
+    """
+    서버가 발급한 세션을 이어 쓰거나 새 세션을 만듭니다. 오래 안 쓴 세션부터 버립니다.
+    세션 ID는 항상 서버에서 생성하며, 모르는 ID를 받으면 그 ID를 쓰지 않고 새 ID로 세션을 엽니다.
+    """
+    session = _analysis_sessions.get(session_id) if isinstance(session_id, str) else None
+    if session is None:
+        session = AnalysisSession(uuid.uuid4().hex, industry)
+        session.checklist_changes()
+        _analysis_sessions[session.session_id] = session
+        while len(_analysis_sessions) > ANALYSIS_SESSION_MAX:
+            _analysis_sessions.popitem(last=False)
+    _analysis_sessions.move_to_end(session.session_id)
+    return session
+
+
+@api.websocket("/api/demo/analyze-text/ws")
+async def analyze_text_ws(websocket: WebSocket):
+    """
+    증분 재분석 웹소켓. 메시지는 모두 JSON입니다.
+
+    클라이언트 → 서버
+      {"type": "init", "text": "...", "industry": "은행", "session_id": null}
+          새 세션 시작 (서버가 발급한 session_id를 주면 이어 쓰기, text를 주면 그 텍스트로 맞춤)
+          모르는 session_id는 무시하고 새 ID로 시작하므로, 응답 snapshot의 session_id를 써야 합니다.
+      {"type": "edit", "index": 3, "remove": 1, "text": "고친 문장."}
+          문장 구간 [index, index+remove)를 text의 문장들로 교체
+      {"type": "replace", "text": "..."}
+          전체 텍스트를 보내면 서버가 바뀐 문장 구간을 찾아 교체
+    서버 → 클라이언트
+      {"type": "snapshot", "data": {session_id, sentence_count, suggestions, checklist}}
+      {"type": "diff", "data": {splice, suggestions, checklist, sentence_count, reanalyzed, elapsed_ms}}
+          splice 구간의 기존 제안은 지우고, 그 뒤 제안의 sentence_index는 inserted - removed만큼 이동,
+          suggestions는 새로 들어온 문장들의 제안, checklist는 상태가 바뀐 항목만
+      {"type": "error", "detail": "..."}
+    """
+    await websocket.accept()
+    session: Optional[AnalysisSession] = None
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError("메시지는 JSON 객체여야 합니다.")
+                kind = message.get("type")
+                if kind == "init":
+                    session = _open_analysis_session(message.get("session_id"), message.get("industry") or "IT서비스")
+                    async with session.lock:
+                        if message.get("text") is not None:
+                            await asyncio.to_thread(session.replace_text, message["text"])
+                        snapshot = session.snapshot()
+                    await websocket.send_json({"type": "snapshot", "data": snapshot})
+                elif kind in ("edit", "replace"):
+                    if session is None:
+                        raise ValueError("먼저 init 메시지로 세션을 시작해야 합니다.")
+                    async with session.lock:
+                        if kind == "edit":
+                            diff = await asyncio.to_thread(
+                                session.splice, int(message["index"]), int(message.get("remove", 1)), message.get("text", "")
+                            )
+                        else:
+                            diff = await asyncio.to_thread(session.replace_text, message["text"])
+                    await websocket.send_json({"type": "diff", "data": diff})
+                else:
+                    raise ValueError(f"알 수 없는 메시지 type입니다: {kind}")
+            except (KeyError, TypeError, ValueError, AttributeError) as exc:
+                # json.JSONDecodeError도 ValueError — 잘못된 메시지 하나로 연결을 끊지 않음
+                await websocket.send_json({"type": "error", "detail": str(exc)})
+    except WebSocketDisconnect:
+        pass
+
+
+# =========================
+# 문장 분리 (경계 규칙은 analysis_engine._iter_sentence_spans)
+# =========================
+
+@_timed(_SENTENCE_SPLIT_SECONDS)
+def _split_sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """텍스트 전체의 문장 (start, end) 오프셋 목록."""
+    return list(_iter_sentence_spans(text))
+
+
+def _iter_sentences(text: str) -> Iterator[str]:
+    """_split_into_sentences와 같은 결과를 지연 생성합니다."""
+    for start, end in _iter_sentence_spans(text):
+        yield text[start:end]
+
+
+@_timed(_SENTENCE_SPLIT_SECONDS)
+def _split_into_sentences(text: str) -> List[str]:
+    """
+    문장 문자열 목록이 필요한 곳(편집 세션 등)용. 분석 경로는 _split_sentence_spans를 사용합니다.
+    경계 규칙은 _iter_sentence_spans를 따릅니다.
+    """
+    return list(_iter_sentences(text))
+
+
+# =========================
+# 문장 배치 분석 엔진
+#  - 행 계산(룰 비트셋 → 그룹 비트셋 → 검증 신호)은 analysis_engine._span_batch_rows_timed
+#  - Pydantic 객체는 실제로 반환되는 문장에 대해서만 생성
+# =========================
 
+def _suggestion_from_row(
+    sentence_index: int,
+    sent: str,
+    group_mask: int,
+    issue_ids: Tuple[str, ...],
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> SentenceSuggestion:
+    issues = [VALIDATION_ISSUES[i] for i in issue_ids]
+    group_codes = [gc for gc in _SORTED_GROUP_CODES if group_mask & _GROUP_BITS[gc]]
+    return SentenceSuggestion(
+        sentence_index=sentence_index,
+        sentence_text=sent,
+        ifrs_codes=group_codes,
+        ifrs_titles=[display_group_name(gc) for gc in group_codes],
+        overall_status=_overall_status(issues),
+        issues=issues,
+        start=start,
+        end=end,
+    )
 
 
-def build_checklist_from_text(draft_text: str, industry: str = "IT서비스") -> List[ChecklistItem]:
+def _compact_from_row(
+    sentence_index: int,
+    sent: str,
+    group_mask: int,
+    issue_ids: Tuple[str, ...],
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    with_text: bool = False,
+) -> CompactSentenceSuggestion:
+    """
+    _suggestion_from_row의 압축 응답판. 행의 이슈 ID를 그대로 쓰고 이슈/제목 객체는 만들지 않습니다.
+    with_text=False여도 오프셋이 없는 문장(페이지 경계를 넘는 문장)은 원문을 싣습니다.
+    """
+    return CompactSentenceSuggestion(
+        sentence_index=sentence_index,
+        start=start,
+        end=end,
+        sentence_text=sent if with_text or start is None else None,
+        ifrs_codes=[gc for gc in _SORTED_GROUP_CODES if group_mask & _GROUP_BITS[gc]],
+        overall_status=_overall_status([VALIDATION_ISSUES[i] for i in issue_ids]),
+        issue_ids=list(issue_ids),
+    )
+
+
+# 파일 분석용: 문장 원문을 항상 싣는 압축 행 변환
+_compact_with_text_from_row = partial(_compact_from_row, with_text=True)
+
+# 분석 행 → 응답 문장 객체 변환 함수 (_suggestion_from_row 또는 _compact_from_row 계열)
+_RowBuilder = Callable[..., Union[SentenceSuggestion, CompactSentenceSuggestion]]
+
+
+def _analyze_span_batch(
+    text: str,
+    spans: List[Tuple[int, int]],
+    industry: str = "IT서비스",
+    index_offset: int = 0,
+    build: _RowBuilder = _suggestion_from_row,
+) -> List[SentenceSuggestion]:
+    """
+    text의 문장 spans를 배치로 분석합니다. 결과는 문장마다 _hybrid_mapping(mode="fast") →
+    그룹 코드 변환 → _validate_disclosure_internal을 돌린 것과 동일합니다.
+    index_offset은 sentence_index에 더해집니다 (문서 일부만 넘길 때 사용).
+    start/end는 text 기준 오프셋입니다. build로 압축 응답 객체(_compact_from_row)를 바로 만들 수 있습니다.
+    """
+    rows, stage_seconds = _span_batch_rows_timed(text, spans)
+    _observe_batch_stages(*stage_seconds)
+    return [
+        build(index_offset + idx, text[start:end], group_mask, issue_ids, start, end)
+        for idx, start, end, group_mask, issue_ids in rows
+    ]
+
+
+def _analyze_pdf_sentences(
+    text: str,
+    industry: str = "IT서비스",
+    jurisdiction: str = "대한민국",
+    build: _RowBuilder = _suggestion_from_row,
+) -> List[SentenceSuggestion]:
+    """
+    PDF 1페이지 텍스트를 문장 단위로 쪼개서:
+    1) 각 문장이 어떤 IFRS S2 단락과 관련 있는지 RULES/매핑으로 판단
+    2) 관련된 S2 그룹 코드(S2-5/S2-15/S2-9)에 대해 _validate_disclosure_internal 실행
+    3) 부족한 정보(ValidationIssue.suggestion)를 SentenceSuggestion으로 묶어서 반환
+    실제 계산은 _analyze_span_batch가 문장 전체를 한 번에 처리합니다.
+    """
+    return _analyze_span_batch(text, _split_sentence_spans(text), industry=industry, build=build)
+
+
+
+@_timed(_CHECKLIST_SECONDS)
+def build_checklist_from_text(
+    draft_text: str,
+    industry: str = "IT서비스",
+    present_mask: Optional[int] = None,
+) -> List[ChecklistItem]:
     """
     텍스트로부터 IFRS S2 필수 체크리스트를 생성합니다. 필수 요소별로 검증합니다.
     
     주의: ChecklistItem의 code 필드는 내부 로직용(예: "14", "22–23,25")이며,
     프론트엔드에서는 title 필드를 사용하여 사용자에게 표시해야 합니다.
     title 필드에는 한글 제목(예: "기후 관련 전략 및 전환 계획")이 들어있습니다.
+
+    present_mask(detect_required_elements 결과)를 넘기면 텍스트를 다시 스캔하지 않습니다.
     """
     items: List[ChecklistItem] = []
     
+    # 모든 요구사항의 필수 요소를 텍스트 1회 스캔으로 판정
+    if present_mask is None:
+        present_mask = detect_required_elements(draft_text)
+
     # IFRS_REQUIREMENTS에 정의된 각 필수 요소별로 검증
     for code, req in IFRS_REQUIREMENTS.items():
         # 필수 요소 평가
-        requirement, element_results = _evaluate_required_elements(draft_text, code)
+        requirement, element_results = _evaluate_required_elements(draft_text, code, present_mask)
         
         if not requirement:
             continue
@@ -1358,6 +4449,127 @@ def build_checklist_from_text(draft_text: str, industry: str = "IT서비스") ->
     
     return items
 
+# =========================
+# 병렬 문서 분석 (프로세스 풀 샤딩)
+#  - 분석은 순수 파이썬 CPU 작업이라 GIL 때문에 한 요청이 한 코어만 씀
+#  - 큰 문서는 줄 경계에서 샤드로 나눠 상주 프로세스 풀에 분산하고, 결과를 샤드 순서대로 병합
+#  - 문장은 줄을 넘지 않으므로 줄 경계 샤딩은 순차 분석과 같은 문장 목록을 만듦
+#  - 워커는 spawn으로 띄우며 analysis_engine만 import (샤드 분석 함수/초기화 함수가 그 모듈에 있음)
+#    단, `python server.py`처럼 이 파일을 스크립트로 직접 실행하면 spawn이 __main__을 다시 import하므로
+#    워커를 가볍게 유지하려면 `uvicorn server:api`로 띄우는 것을 권장
+# =========================
+
+# 워커 프로세스 수 (0 또는 1이면 병렬 분석 비활성화)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0"))
+# 이 글자 수 미만의 문서는 IPC 비용을 피하기 위해 순차 분석
+ANALYSIS_PARALLEL_MIN_CHARS = int(os.getenv("ANALYSIS_PARALLEL_MIN_CHARS", "200000"))
+# 워커당 샤드 수 (샤드 크기 편차를 흡수하기 위한 여유)
+ANALYSIS_SHARDS_PER_WORKER = int(os.getenv("ANALYSIS_SHARDS_PER_WORKER", "2"))
+
+_analysis_pool: Optional[ProcessPoolExecutor] = None
+_analysis_pool_lock = threading.Lock()
+
+
+def _get_analysis_pool() -> Optional[ProcessPoolExecutor]:
+    global _analysis_pool
+    if ANALYSIS_WORKERS <= 1:
+        return None
+    with _analysis_pool_lock:
+        if _analysis_pool is None:
+            _analysis_pool = ProcessPoolExecutor(
+                max_workers=ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_analysis_worker,
+            )
+        return _analysis_pool
+
+
+def _shutdown_analysis_pool() -> None:
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is not None:
+            _analysis_pool.shutdown(cancel_futures=True)
+            _analysis_pool = None
+
+
+def _merge_shard_results(
+    text: str,
+    industry: str,
+    shards: List[str],
+    results: List[_ShardResult],
+    build: _RowBuilder = _suggestion_from_row,
+) -> Tuple[List[ChecklistItem], List[SentenceSuggestion]]:
+    """
+    샤드 순서대로 문장 인덱스/오프셋을 이어 붙이고, 필수 요소 판정은 OR로 합칩니다.
+    워커가 잰 단계별 시간은 샤드마다 한 번씩 여기(부모 프로세스)서 기록합니다.
+    """
+    suggestions: List[SentenceSuggestion] = []
+    raw_mask = 0
+    has_number = False
+    index_offset = 0
+    base = 0
+    for shard, (sentence_count, rows, shard_mask, shard_has_number, stage_seconds) in zip(shards, results):
+        split_seconds, rule_seconds, validation_seconds = stage_seconds
+        _SENTENCE_SPLIT_SECONDS.observe(split_seconds)
+        _observe_batch_stages(rule_seconds, validation_seconds)
+        for idx, start, end, group_mask, issue_ids in rows:
+            suggestions.append(build(
+                index_offset + idx, text[base + start:base + end], group_mask, issue_ids, base + start, base + end,
+            ))
+        index_offset += sentence_count
+        base += len(shard)
+        raw_mask |= shard_mask
+        has_number = has_number or shard_has_number
+
+    present_mask = _ELEMENT_DETECTORS.finalize(raw_mask, has_number)
+    checklist = build_checklist_from_text(text, industry=industry, present_mask=present_mask)
+    return checklist, suggestions
+
+
+def _parallel_shards(text: str) -> Optional[List[str]]:
+    """병렬 분석 대상이면 샤드 목록을, 아니면 None을 반환합니다."""
+    if ANALYSIS_WORKERS <= 1 or len(text) < ANALYSIS_PARALLEL_MIN_CHARS:
+        return None
+    shards = _shard_text(text, ANALYSIS_WORKERS * ANALYSIS_SHARDS_PER_WORKER)
+    return shards if len(shards) > 1 else None
+
+
+def analyze_document(
+    text: str,
+    industry: str = "IT서비스",
+    jurisdiction: str = "대한민국",
+    build: _RowBuilder = _suggestion_from_row,
+) -> Tuple[List[ChecklistItem], List[SentenceSuggestion]]:
+    """
+    문서 전체의 (체크리스트, 문장 제안)을 계산합니다.
+    ANALYSIS_WORKERS > 1이고 문서가 ANALYSIS_PARALLEL_MIN_CHARS 이상이면 프로세스 풀로 분산하며,
+    결과는 순차 분석과 동일합니다. build=_compact_from_row면 문장 제안을 압축 형태로 만듭니다.
+    """
+    shards = _parallel_shards(text)
+    pool = _get_analysis_pool() if shards else None
+    if pool is None:
+        checklist = build_checklist_from_text(text, industry=industry)
+        return checklist, _analyze_pdf_sentences(text, industry=industry, jurisdiction=jurisdiction, build=build)
+    return _merge_shard_results(text, industry, shards, list(pool.map(_analyze_shard, shards)), build)
+
+
+async def analyze_document_async(
+    text: str,
+    industry: str = "IT서비스",
+    jurisdiction: str = "대한민국",
+    build: _RowBuilder = _suggestion_from_row,
+) -> Tuple[List[ChecklistItem], List[SentenceSuggestion]]:
+    """analyze_document의 비동기 버전. 병렬 분석 시 이벤트 루프를 막지 않고 샤드 결과를 기다립니다."""
+    shards = _parallel_shards(text)
+    pool = _get_analysis_pool() if shards else None
+    if pool is None:
+        return analyze_document(text, industry=industry, jurisdiction=jurisdiction, build=build)
+    results = await asyncio.gather(
+        *(asyncio.wrap_future(pool.submit(_analyze_shard, shard)) for shard in shards)
+    )
+    return _merge_shard_results(text, industry, shards, list(results), build)
+
+
 # =========================
 # 서버 실행
 # =========================
@@ -0,0 +1,18 @@
+"""
+테스트 공통 설정.
+server.py는 import 시점에 환경 변수를 읽으므로, 캐시/색인 경로와 API 키를 먼저 임시 값으로 맞춥니다.
+"""
+
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="ifrs_tests_")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("LLM_CACHE_SQLITE_PATH", os.path.join(_TMP, "llm_cache.sqlite3"))
+os.environ.setdefault("SEARCH_INDEX_DIR", os.path.join(_TMP, "search_index"))
+os.environ.setdefault("ANALYSIS_WORKERS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
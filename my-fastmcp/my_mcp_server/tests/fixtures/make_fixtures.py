@@ -0,0 +1,107 @@
+"""
+파일 업로드 분석 테스트용 샘플 파일(PDF / DOCX / XLSX)을 다시 만듭니다.
+
+    python tests/fixtures/make_fixtures.py
+
+PDF는 외부 라이브러리 없이 직접 씁니다. (기본 폰트 Helvetica라 영문만 사용)
+DOCX / XLSX는 python-docx / openpyxl이 필요합니다.
+"""
+
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PDF_PAGES = [
+    [
+        "The board oversees climate risk through the sustainability committee.",
+        "Our governance process reviews Scope 1 and Scope 2 emissions every quarter and",
+    ],
+    [
+        "the results are reported to the audit committee.",
+        "We ran a scenario analysis under a 1.5C pathway for 2030 and 2050.",
+    ],
+]
+
+DOCX_PAGES = [
+    [
+        "이사회 산하 ESG위원회는 기후 리스크와 기회를 분기마다 검토한다.",
+        "회사는 2030년까지 Scope 1 배출량을 기준연도 대비 40% 감축하는 목표를 세웠다.",
+    ],
+    [
+        "시나리오 분석 결과 탄소가격 상승 시 영업이익이 5% 감소할 수 있다.",
+    ],
+]
+
+XLSX_SHEETS = {
+    "거버넌스": [
+        ("항목", "내용"),
+        ("감독", "이사회는 기후 관련 위험 및 기회에 대한 이사회의 감독 체계를 운영한다."),
+    ],
+    "지표": [
+        ("구분", "2023", "비고"),
+        ("Scope 1", 12000, "온실가스 배출량 tCO2eq 기준으로 집계한다."),
+    ],
+}
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: str) -> None:
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in PDF_PAGES:
+        stream = "BT /F1 11 Tf 14 TL 50 780 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_docx(path: str) -> None:
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    document = Document()
+    for page_index, paragraphs in enumerate(DOCX_PAGES):
+        for i, text in enumerate(paragraphs):
+            paragraph = document.add_paragraph()
+            if page_index and i == 0:
+                paragraph.add_run().add_break(WD_BREAK.PAGE)
+            paragraph.add_run(text)
+    document.save(path)
+
+
+def make_xlsx(path: str) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in XLSX_SHEETS.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+
+if __name__ == "__main__":
+    make_pdf(os.path.join(HERE, "sample.pdf"))
+    make_docx(os.path.join(HERE, "sample.docx"))
+    make_xlsx(os.path.join(HERE, "sample.xlsx"))
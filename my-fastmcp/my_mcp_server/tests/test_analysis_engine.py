@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import analysis_engine as engine
+import server
+from benchmark import generate_corpus
+
+KEYWORDS = [kw for keywords, _code, _reason in engine.RULES for kw in keywords]
+FILLER = ["다.", "\n", "했다. ", "회사는 ", "x", " . ", "İ", "2030년 ", "  "]
+
+
+def _mutate(rnd: random.Random, keyword: str) -> str:
+    """대소문자를 바꾸고 글자 사이에 공백/줄바꿈을 끼워 넣습니다."""
+    out = []
+    for ch in keyword:
+        out.append(ch.upper() if rnd.random() < 0.2 else ch)
+        if rnd.random() < 0.15:
+            out.append(rnd.choice([" ", "\n", "\t"]))
+    return "".join(out)
+
+
+def _random_texts(count: int, seed: int = 7):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        parts = []
+        for _ in range(rnd.randint(1, 12)):
+            r = rnd.random()
+            if r < 0.3:
+                parts.append(rnd.choice(KEYWORDS))
+            elif r < 0.6:
+                parts.append(_mutate(rnd, rnd.choice(KEYWORDS)))
+            else:
+                parts.append(rnd.choice(FILLER))
+        yield "".join(parts)
+
+
+def _reference_first_keywords(text: str):
+    """기존 `kw.lower() in text.lower()` 규칙 + 공백 무시 재검사를 그대로 옮긴 기준 구현."""
+    lowered = text.lower()
+    shadow = "".join(lowered.split())
+    found = {}
+    for rule_index, (keywords, _code, _reason) in enumerate(engine.RULES):
+        exact = [kw for kw in keywords if kw.lower() in lowered]
+        if exact:
+            found[rule_index] = exact[0]
+            continue
+        spaced = [kw for kw in keywords if "".join(kw.split()).lower() in shadow]
+        if spaced:
+            found[rule_index] = spaced[0]
+    return found
+
+
+def test_keyword_matcher_matches_plain_substring_rules():
+    for text in _random_texts(2000):
+        assert engine._first_keyword_by_rule(text) == _reference_first_keywords(text), text
+
+
+def test_keyword_matcher_ignores_whitespace_and_case():
+    hits = engine._first_keyword_by_rule("우리 회사의 esg\n위원회는 Scope1 배출량을 관리한다")
+    assert hits[0] == "ESG위원회"
+    assert hits[len(engine.RULES) - 1] == "Scope 1"
+
+
+def test_find_rule_hits_returns_offsets_into_the_original_text():
+    text = "우리 회사의 esg\n위원회는 Scope1 배출량과 İ scope 1 목표를 관리한다"
+    hits = engine.find_rule_hits(text)
+    assert (0, "ESG위원회", 7, 14) in hits
+    assert [start for _r, _kw, start, _e in hits] == sorted(start for _r, _kw, start, _e in hits)
+    scope1 = [(start, end) for r, kw, start, end in hits if kw == "Scope 1"]
+    assert [text[start:end] for start, end in scope1] == ["Scope1", "scope 1"]
+
+
+def test_find_rule_hits_agrees_with_first_keywords():
+    for text in _random_texts(1000, seed=5):
+        hits = engine.find_rule_hits(text)
+        assert {r for r, _kw, _s, _e in hits} == set(engine._first_keyword_by_rule(text)), text
+        for _r, kw, start, end in hits:
+            assert "".join(text[start:end].split()).lower() == engine._normalize_keyword(kw), text
+
+
+def test_span_group_masks_match_sentence_by_sentence_mapping():
+    for text in _random_texts(500, seed=11):
+        spans = list(engine._iter_sentence_spans(text))
+        expected = []
+        for start, end in spans:
+            mask = 0
+            for rule_index in engine._first_keyword_by_rule(text[start:end]):
+                mask |= engine._RULE_GROUP_BITS[rule_index]
+            expected.append(mask)
+        assert engine._span_group_masks(text, spans) == expected, text
+
+
+def test_shard_text_cuts_after_newlines_and_keeps_all_text():
+    text = generate_corpus(50_000, seed=3)
+    shards = engine._shard_text(text, 6)
+    assert "".join(shards) == text
+    assert 1 < len(shards) <= 6
+    assert all(shard.endswith("\n") for shard in shards[:-1])
+    assert engine._shard_text(text, 1) == [text]
+    assert engine._shard_text("한 줄짜리 문서", 4) == ["한 줄짜리 문서"]
+
+
+@pytest.mark.parametrize("shard_count", [2, 5, 16])
+def test_sharded_analysis_equals_sequential_analysis(shard_count):
+    text = generate_corpus(80_000, seed=5)
+    checklist, suggestions = server.analyze_document(text, industry="은행")
+
+    shards = engine._shard_text(text, shard_count)
+    results = [engine._analyze_shard(shard) for shard in shards]
+    merged_checklist, merged_suggestions = server._merge_shard_results(text, "은행", shards, results)
+
+    assert [item.model_dump() for item in merged_checklist] == [item.model_dump() for item in checklist]
+    assert [s.model_dump() for s in merged_suggestions] == [s.model_dump() for s in suggestions]
+    assert suggestions, "corpus should produce sentence suggestions"
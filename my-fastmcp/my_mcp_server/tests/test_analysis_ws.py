@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+import server
+
+TEXT = "회사는 온실가스 감축 목표를 세운다. 이사회는 기후 리스크를 검토한다."
+
+
+def test_malformed_messages_get_an_error_reply_and_keep_the_socket_open():
+    with TestClient(server.api) as client, client.websocket_connect("/api/demo/analyze-text/ws") as ws:
+        for raw in ("not json", "[1, 2]", '"init"', "null", '{"type": "edit"}', '{"type": "bogus"}'):
+            ws.send_text(raw)
+            assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"type": "init", "text": TEXT, "industry": "은행"})
+        assert ws.receive_json()["data"]["sentence_count"] == 2
+
+
+def test_session_ids_are_issued_by_the_server():
+    with TestClient(server.api) as client:
+        with client.websocket_connect("/api/demo/analyze-text/ws") as ws:
+            ws.send_json({"type": "init", "text": TEXT, "session_id": "chosen-by-client"})
+            snapshot = ws.receive_json()["data"]
+        assert snapshot["session_id"] != "chosen-by-client"
+        assert "chosen-by-client" not in server._analysis_sessions
+
+        with client.websocket_connect("/api/demo/analyze-text/ws") as ws:
+            ws.send_json({"type": "init", "session_id": snapshot["session_id"]})
+            resumed = ws.receive_json()["data"]
+        assert resumed["session_id"] == snapshot["session_id"]
+        assert resumed["sentence_count"] == 2
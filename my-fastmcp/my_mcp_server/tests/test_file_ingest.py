@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from conftest import FIXTURES_DIR
+
+pytest.importorskip("pypdf")
+pytest.importorskip("docx")
+pytest.importorskip("openpyxl")
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURES_DIR, name)
+
+
+@pytest.mark.parametrize("kind, first_line", [
+    ("pdf", "The board oversees climate risk through the sustainability committee."),
+    ("docx", "이사회 산하 ESG위원회는 기후 리스크와 기회를 분기마다 검토한다."),
+    ("xlsx", "항목 | 내용"),
+])
+def test_page_iterators_read_two_pages(kind, first_line):
+    pages = list(server._PAGE_ITERATORS[kind](fixture_path(f"sample.{kind}")))
+    assert [number for number, _text in pages] == [1, 2]
+    assert pages[0][1].splitlines()[0] == first_line
+
+
+def write_docx(path, paragraphs, rendered=False):
+    """paragraphs 원소의 "|"를 페이지 나눔으로 바꿔 docx를 만듭니다. (rendered=True면 lastRenderedPageBreak)"""
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    from docx.oxml import OxmlElement
+
+    document = Document()
+    for text in paragraphs:
+        paragraph = document.add_paragraph()
+        for i, part in enumerate(text.split("|")):
+            run = paragraph.add_run()
+            if i and rendered:
+                run._r.append(OxmlElement("w:lastRenderedPageBreak"))
+            elif i:
+                run.add_break(WD_BREAK.PAGE)
+            if part:
+                run.add_text(part)
+    document.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("rendered", [False, True])
+def test_docx_page_break_splits_the_paragraph_at_its_position(tmp_path, rendered):
+    path = write_docx(tmp_path / "breaks.docx", ["첫 문단", "페이지 끝 문단|", "앞부분|뒷부분", "마지막 문단"], rendered)
+    pages = list(server._iter_docx_pages(path))
+    assert pages == [
+        (1, "첫 문단\n페이지 끝 문단"),   # 문단 끝의 나눔은 그 문단을 다음 페이지로 넘기지 않음
+        (2, "앞부분"),
+        (3, "뒷부분\n마지막 문단"),
+    ]
+
+
+def test_sentence_split_across_pdf_pages_is_joined_and_tagged_with_its_first_page():
+    state = server._PagedAnalysisState()
+    pages = server._PAGE_ITERATORS["pdf"](fixture_path("sample.pdf"))
+    batches = list(server._iter_paged_suggestions(pages, "은행", state))
+    assert [page for page, _suggestions in batches] == [1, 2]
+
+    joined = [
+        s for _page, suggestions in batches for s in suggestions
+        if s.sentence_text.startswith("Our governance process")
+    ]
+    assert len(joined) == 1
+    assert joined[0].sentence_text.endswith("reported to the audit committee.")
+    assert joined[0].page == 1   # 문장이 시작된 페이지
+    assert joined[0].start is None and joined[0].end is None   # 페이지 경계를 넘는 문장
+    assert state.pages == 2
+
+
+@pytest.mark.parametrize("kind", ["pdf", "docx", "xlsx"])
+def test_analyze_file_endpoint(kind):
+    with TestClient(server.api) as client, open(fixture_path(f"sample.{kind}"), "rb") as f:
+        response = client.post(
+            "/api/demo/analyze-file",
+            files={"file": (f"sample.{kind}", f.read())},
+            data={"industry": "은행"},
+        )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["pdf_meta"]["file_type"] == kind
+    assert body["sentence_suggestions"]
+    assert {s["page"] for s in body["sentence_suggestions"]} <= {1, 2}
+    for suggestion in body["sentence_suggestions"]:
+        if suggestion["start"] is not None:
+            assert suggestion["end"] - suggestion["start"] == len(suggestion["sentence_text"])
+    assert [item["code"] for item in body["checklist"]] == list(server.IFRS_REQUIREMENTS)
+
+
+def test_analyze_file_stream_ends_with_summary():
+    with TestClient(server.api) as client, open(fixture_path("sample.docx"), "rb") as f:
+        response = client.post(
+            "/api/demo/analyze-file/stream",
+            files={"file": ("sample.docx", f.read())},
+            data={"industry": "은행", "format": "ndjson"},
+        )
+    assert response.status_code == 200
+    events = [line for line in response.text.splitlines() if line]
+    assert '"page_count":2' in events[-1].replace(" ", "")
+
+
+def test_unsupported_extension_is_rejected():
+    with TestClient(server.api) as client:
+        response = client.post("/api/demo/analyze-file", files={"file": ("notes.txt", b"hello")})
+    assert response.status_code == 415
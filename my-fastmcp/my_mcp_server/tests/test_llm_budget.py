@@ -0,0 +1,87 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+
+def make_tracker(tokens_per_minute=1000, soft_ratio=0.5, requests_per_minute=0):
+    return server.LLMUsageTracker(tokens_per_minute, 0, requests_per_minute, 0, soft_ratio, 16)
+
+
+def test_admit_distinguishes_throttled_from_exhausted():
+    tracker = make_tracker()
+    reservation, note = tracker.admit(0.1, 600)
+    assert reservation is not None and note is None
+
+    # 사용률 0.6 > soft_ratio 0.5: 임계값이 낮아져 신뢰도 0.6인 항목은 승격하지 않음
+    assert tracker.admit(0.6, 100) == (None, server.LLM_BUDGET_THROTTLED_NOTE)
+    # 예약하면 한도를 넘는 호출은 소진으로 거절
+    assert tracker.admit(0.0, 500) == (None, server.LLM_BUDGET_EXHAUSTED_NOTE)
+
+
+def test_reservations_are_settled_with_actual_usage_or_released():
+    tracker = make_tracker(requests_per_minute=10)
+    used = lambda: {k: v["used"] for k, v in tracker.stats()["budgets"].items()}
+
+    reservation = tracker.reserve(700)
+    assert used()["tokens_per_minute"] == 700 and used()["requests_per_minute"] == 1
+    reservation.claimed = True
+    tracker.record_usage("t", "/e", 100, 50, [reservation])
+    assert used()["tokens_per_minute"] == 150 and used()["requests_per_minute"] == 1
+
+    unused, _note = tracker.admit(0.0, 300)
+    tracker.release([unused])
+    tracker.release([unused])            # 두 번 되돌려도 안전
+    assert used()["tokens_per_minute"] == 150 and used()["requests_per_minute"] == 1
+
+
+def test_budget_limited_appends_the_given_note():
+    result = server.MappingResult(candidates=[], coverage_comment="룰 결과")
+    limited = server._budget_limited(result, server.LLM_BUDGET_THROTTLED_NOTE)
+    assert limited.coverage_comment == f"룰 결과 {server.LLM_BUDGET_THROTTLED_NOTE}"
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        content = json.dumps({"candidates": [{"code": "10", "reason": "테스트"}], "coverage_comment": "LLM"})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=100),
+        )
+
+
+def test_concurrent_auto_calls_cannot_overshoot_the_budget(monkeypatch):
+    texts = [f"문단 {i:02d} 내용 설명입니다." for i in range(10)]
+    estimate = max(
+        server._estimate_tokens(server._build_llm_prompt(t, "은행", "IFRS", server._rule_based_mapping(t)))
+        + server.LLM_MAPPING_MAX_TOKENS
+        for t in texts
+    )
+    tracker = make_tracker(tokens_per_minute=int(estimate * 2.5), soft_ratio=1.0)
+    completions = FakeCompletions()
+    monkeypatch.setattr(server, "llm_usage", tracker)
+    monkeypatch.setattr(server, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(server, "_semantic_fallback", lambda raw_text, rule_result: None)
+    monkeypatch.setattr(server, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    async def main():
+        return await asyncio.gather(*(server._hybrid_mapping(t, "은행", "IFRS", mode="auto") for t in texts))
+
+    results = asyncio.run(main())
+    assert completions.calls == 2
+    assert sum(r.coverage_comment == "LLM" for r in results) == 2
+    assert sum(r.coverage_comment.endswith(server.LLM_BUDGET_EXHAUSTED_NOTE) for r in results) == 8
+    assert tracker.stats()["budgets"]["tokens_per_minute"]["used"] == 400   # 예약분은 실제 usage로 정산
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(server, "llm_breaker", server.CircuitBreaker(20, 10, 0.5, 0, 30))
@@ -0,0 +1,294 @@
+import asyncio
+import time
+import weakref
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+
+def make_breaker(**overrides):
+    options = dict(window=4, min_calls=4, failure_ratio=0.5, slow_seconds=0, cooldown_seconds=0.05)
+    options.update(overrides)
+    return server.CircuitBreaker(**options)
+
+
+def record(breaker, ok, elapsed=0.1):
+    ticket = breaker.allow()
+    assert ticket is not None
+    breaker.record(ticket, ok, elapsed)
+
+
+def test_breaker_stays_closed_below_min_calls_and_ratio():
+    breaker = make_breaker()
+    record(breaker, False)
+    record(breaker, False)
+    assert breaker.state == "closed" and breaker.allow()
+    record(breaker, True)
+    record(breaker, True)
+    assert breaker.state == "open"   # 2/4 실패 = failure_ratio
+    assert breaker.allow() is None
+
+
+def test_breaker_counts_slow_calls_as_failures():
+    breaker = make_breaker(slow_seconds=1.0)
+    for _ in range(4):
+        record(breaker, True, 2.0)
+    assert breaker.state == "open"
+
+
+def test_breaker_half_open_admits_one_probe_and_closes_on_success():
+    breaker = make_breaker()
+    for _ in range(4):
+        record(breaker, False)
+    assert breaker.allow() is None
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    probe = breaker.allow()
+    assert probe is not None and probe.probe
+    assert breaker.allow() is None       # 시험 호출은 1건만
+    breaker.record(probe, True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_calls"] == 0
+
+
+def test_breaker_reopens_when_probe_fails_and_release_allows_new_probe():
+    breaker = make_breaker()
+    for _ in range(4):
+        record(breaker, False)
+    time.sleep(0.06)
+    probe = breaker.allow()
+    breaker.record(probe, False, 0.1)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    probe = breaker.allow()
+    assert probe is not None
+    breaker.release(probe)               # 시험 호출이 결과 없이 취소됨
+    assert breaker.allow() is not None
+
+
+def test_breaker_ignores_results_of_calls_admitted_before_it_opened():
+    breaker = make_breaker()
+    in_flight = [breaker.allow() for _ in range(3)]
+    for _ in range(4):
+        record(breaker, False)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    probe = breaker.allow()
+
+    # 열리기 전에 나간 호출들의 늦은 성공은 시험 호출 결과로 치지 않음
+    for ticket in in_flight:
+        breaker.record(ticket, True, 0.1)
+    assert breaker.state == "half_open"
+    assert breaker.allow() is None
+
+    breaker.record(probe, False, 0.1)
+    assert breaker.state == "open"
+    breaker.record(probe, True, 0.1)     # 이미 정리된 시험 호출 티켓도 무시
+    assert breaker.state == "open"
+
+
+def test_breaker_release_of_a_normal_call_does_not_free_the_probe():
+    breaker = make_breaker()
+    old = breaker.allow()
+    for _ in range(4):
+        record(breaker, False)
+    time.sleep(0.06)
+    assert breaker.allow() is not None
+    breaker.release(old)
+    assert breaker.allow() is None
+
+
+class FakeCompletions:
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def create(self, **request):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.active -= 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=1, completion_tokens=1),
+        )
+
+
+@pytest.fixture
+def llm_env(monkeypatch):
+    def install(delays, concurrency, hedge_delay=None):
+        completions = FakeCompletions(delays)
+        monkeypatch.setattr(server, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        monkeypatch.setattr(server, "LLM_CACHE_ENABLED", False)
+        monkeypatch.setattr(server, "LLM_MAX_CONCURRENCY", concurrency)
+        monkeypatch.setattr(server, "_llm_semaphores", weakref.WeakKeyDictionary())
+        monkeypatch.setattr(server, "llm_breaker", make_breaker(cooldown_seconds=30))
+        monkeypatch.setattr(server, "LLM_HEDGE_ENABLED", hedge_delay is not None)
+        monkeypatch.setattr(server.llm_latency, "hedge_delay", lambda: hedge_delay)
+        return completions
+    return install
+
+
+def call(user_prompt, timeout=None):
+    return server._chat_completion_text("system", user_prompt, 0.0, 10, timeout=timeout)
+
+
+def test_waiting_for_a_concurrency_slot_counts_against_the_deadline(llm_env):
+    completions = llm_env([0.2], concurrency=1)
+
+    async def main():
+        slow = asyncio.create_task(call("first"))
+        await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await call("second", timeout=0.05)
+        waited = time.perf_counter() - started
+        await slow
+        return waited
+
+    assert asyncio.run(main()) < 0.15
+    assert completions.calls == 1                      # 슬롯을 못 얻은 호출은 보내지 않음
+    assert server.llm_breaker.stats()["recent_failures"] == 0   # 로컬 대기 초과는 제공자 실패가 아님
+
+
+def test_hedge_takes_its_own_slot_and_respects_max_concurrency(llm_env):
+    completions = llm_env([0.1, 0.01], concurrency=2, hedge_delay=0.02)
+    assert asyncio.run(call("a")) == "ok"
+    assert completions.calls == 2                      # 빈 슬롯이 있어 헤지를 보냄
+
+    completions = llm_env([0.1], concurrency=2, hedge_delay=0.02)
+
+    async def main():
+        return await asyncio.gather(call("b"), call("c"))
+
+    assert asyncio.run(main()) == ["ok", "ok"]
+    assert completions.calls == 2                      # 슬롯이 모두 차 있어 헤지하지 않음
+    assert completions.peak <= 2
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = server.SingleFlight("test_shared")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        results = await asyncio.gather(*(flight.do(("k",), work) for _ in range(5)))
+        again = await flight.do(("k",), work)     # 끝난 뒤에는 새로 실행
+        other = await flight.do(("other",), work)
+        return results, again, other
+
+    results, again, other = asyncio.run(main())
+    assert results == [1] * 5
+    assert (again, other) == (2, 3)
+
+
+def test_single_flight_propagates_errors_to_every_waiter():
+    flight = server.SingleFlight("test_error")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad")
+
+    async def main():
+        return await asyncio.gather(*(flight.do(("k",), boom) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_single_flight_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = server.SingleFlight("test_cancel")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do(("k",), slow))
+        second = asyncio.create_task(flight.do(("k",), slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_enhance_batch_clamps_item_timeout_and_ignores_caller_deadlines_in_breaker(llm_env, monkeypatch):
+    completions = llm_env([0.2], concurrency=4)
+    monkeypatch.setattr(server, "ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS", 0.1)
+    items = [server.EnhanceParagraphRequest(paragraph=f"문단 {i}", ifrs_code="S2-5") for i in range(3)]
+
+    started = time.perf_counter()
+    response = asyncio.run(server._enhance_batch_internal(items, item_timeout=60))   # 상한 0.1초로 제한
+    assert time.perf_counter() - started < 0.19
+    assert response.degraded == 3
+    assert server.llm_breaker.stats()["recent_failures"] == 3   # 기본 데드라인 초과는 LLM 실패
+
+    monkeypatch.setattr(server, "llm_breaker", make_breaker(cooldown_seconds=30))
+    response = asyncio.run(server._enhance_batch_internal(items, item_timeout=0.02))
+    assert response.degraded == 3
+    assert server.llm_breaker.stats()["recent_failures"] == 0   # 요청자가 줄인 데드라인 초과는 세지 않음
+    assert completions.calls == 6
+
+
+def test_batch_mapping_does_not_count_calls_the_open_breaker_short_circuited(llm_env, monkeypatch):
+    completions = llm_env([0.0], concurrency=4)
+    monkeypatch.setattr(server, "MAP_BATCH_MAX_ITEMS_PER_CALL", 1)
+    breaker = server.llm_breaker
+    for _ in range(4):
+        record(breaker, False)
+    assert breaker.state == "open"
+
+    response = asyncio.run(server._batch_mapping(["문단 1", "문단 2"], "은행", "IFRS", mode="accurate"))
+    assert response.llm_items == 2 and response.llm_fallbacks == 2
+    assert response.llm_calls == 0 and completions.calls == 0
+    assert all(result.degraded for result in response.results)
+
+
+def test_batch_mapping_rejects_too_many_paragraphs(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server, "MAP_BATCH_MAX_ITEMS", 2)
+    payload = {"paragraphs": ["a", "b", "c"], "industry": "은행", "mode": "fast"}
+    with TestClient(server.api) as client:
+        assert client.post("/api/map/batch", json=payload).status_code == 413
+        assert client.post("/api/map/batch", json={**payload, "paragraphs": ["a", "b"]}).status_code == 200
+
+    tool = getattr(server.map_to_ifrs_s2_batch, "fn", server.map_to_ifrs_s2_batch)
+    with pytest.raises(ValueError):
+        asyncio.run(tool(["a", "b", "c"], "은행", mode="fast"))
+
+
+def test_enhance_batch_tool_passes_item_timeout_and_order_through(llm_env, monkeypatch):
+    llm_env([0.2], concurrency=4)
+    monkeypatch.setattr(server, "ENHANCE_BATCH_ITEM_TIMEOUT_SECONDS", 0.1)
+    items = [server.EnhanceParagraphRequest(paragraph=f"문단 {i}", ifrs_code="S2-5") for i in range(3)]
+    progress = []
+
+    async def report_progress(done, total=None):
+        progress.append((done, total))
+
+    tool = getattr(server.enhance_paragraphs_batch, "fn", server.enhance_paragraphs_batch)
+    ctx = SimpleNamespace(report_progress=report_progress)
+    started = time.perf_counter()
+    response = asyncio.run(tool(items, ctx, item_timeout=0.02, order="ordered"))
+    assert time.perf_counter() - started < 0.09
+    assert response.degraded == 3
+    assert [r.completed_paragraph for r in response.results] == ["문단 0", "문단 1", "문단 2"]
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert server.llm_breaker.stats()["recent_failures"] == 0   # 요청자가 줄인 데드라인
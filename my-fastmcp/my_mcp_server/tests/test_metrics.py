@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import analysis_engine as engine
+import server
+
+
+def stage_count(stage):
+    return server.METRICS_REGISTRY.get_sample_value("ifrs_stage_seconds_count", {"stage": stage}) or 0.0
+
+
+def test_server_module_can_be_imported_as_a_package_and_as_a_flat_module():
+    # 배포 형태 두 가지: my-fastmcp에서 `my_mcp_server.server`, 이 디렉터리에서 `server`
+    # 한 프로세스에서 둘 다 import돼도 레지스트리가 따로라 Duplicated timeseries 오류가 나지 않아야 함
+    server_dir = os.path.dirname(os.path.abspath(server.__file__))
+    script = (
+        "import sys\n"
+        "import my_mcp_server.server as pkg\n"
+        "assert pkg.FastJSONResponse.__module__ == 'my_mcp_server.responses'\n"
+        "assert pkg._analyze_shard.__module__ == 'my_mcp_server.analysis_engine'\n"
+        f"sys.path.insert(0, {server_dir!r})\n"
+        "import server as flat\n"
+        "assert flat.METRICS_REGISTRY is not pkg.METRICS_REGISTRY\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(server_dir)}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=os.path.dirname(server_dir), env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_worker_stage_times_are_recorded_by_the_parent():
+    text = "회사는 온실가스 감축 목표를 세우고 이행 현황을 관리한다.\n" * 50
+    shards = engine._shard_text(text, 3)
+    results = [engine._analyze_shard(shard) for shard in shards]   # 워커에서는 메트릭을 기록하지 않음
+    before = {stage: stage_count(stage) for stage in ("sentence_splitting", "rule_matching", "validation")}
+
+    server._merge_shard_results(text, "은행", shards, results)
+
+    for stage, count in before.items():
+        assert stage_count(stage) == count + len(shards)
+
+
+def test_batch_analysis_records_rule_and_validation_stages():
+    before = stage_count("rule_matching"), stage_count("validation")
+    server._analyze_pdf_sentences("이사회는 기후 리스크를 검토한다. 2030년 감축 목표를 세운다.")
+    assert (stage_count("rule_matching"), stage_count("validation")) == (before[0] + 1, before[1] + 1)
+
+
+def test_metrics_endpoint_exports_the_module_registry():
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.api) as client:
+        body = client.get("/metrics").text
+    assert "ifrs_stage_seconds_bucket" in body
+    assert "process_cpu_seconds_total" in body or "python_info" in body
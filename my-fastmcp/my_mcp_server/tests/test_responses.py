@@ -0,0 +1,105 @@
+import os
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import responses
+import server
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("BR;Q=0.5", "br"),
+    ("gzip;q=0", None),
+    ("gzip;q=abc", None),
+    ("deflate, gzip ; q=0.8", "gzip"),
+])
+def test_negotiate_encoding(header, expected):
+    if expected == "br" and responses.brotli is None:
+        expected = "gzip" if "gzip" in header else None
+    assert responses.negotiate_encoding(header) == expected
+
+
+_BIG_TEXT = "회사는 온실가스 감축 목표를 세우고 이행 현황을 관리한다. " * 200
+
+
+def test_large_json_responses_are_compressed_and_small_ones_are_not():
+    with TestClient(server.api) as client:
+        big = client.post(
+            "/api/demo/analyze-text",
+            json={"raw_text": _BIG_TEXT, "industry": "은행"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert big.status_code == 200
+        assert big.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in big.headers["vary"]
+        assert big.json()["sentence_suggestions"]
+
+        small = client.get("/api/llm-cache/stats", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
+        refused = client.post(
+            "/api/demo/analyze-text",
+            json={"raw_text": _BIG_TEXT, "industry": "은행"},
+            headers={"Accept-Encoding": "gzip;q=0"},
+        )
+        assert "content-encoding" not in refused.headers
+
+
+@pytest.mark.skipif(responses.brotli is None, reason="brotli not installed")
+def test_brotli_is_preferred_when_accepted():
+    with TestClient(server.api) as client:
+        resp = client.post(
+            "/api/demo/analyze-text",
+            json={"raw_text": _BIG_TEXT, "industry": "은행"},
+            headers={"Accept-Encoding": "gzip, br"},
+        )
+        assert resp.headers["content-encoding"] == "br"
+        assert resp.json()["sentence_suggestions"]
+
+
+def test_stream_endpoints_are_not_compressed():
+    with TestClient(server.api) as client:
+        resp = client.post(
+            "/api/demo/analyze-text/stream",
+            json={"raw_text": _BIG_TEXT, "industry": "은행"},
+            headers={"Accept-Encoding": "gzip, br"},
+        )
+        assert resp.status_code == 200
+        assert "content-encoding" not in resp.headers
+        assert resp.text.count("\n") > 1
+
+
+def test_fast_json_response_matches_standard_json_response():
+    payload = {"한글": "값", "n": [1, 2.5, None], "nested": {"ok": True}}
+    assert responses.FastJSONResponse(payload).body == JSONResponse(payload).body
+    assert responses.FastJSONResponse({"v": server.np.float32(0.5)}).body == b'{"v":0.5}'
+
+
+def test_compact_rows_match_full_suggestions():
+    text = "회사는 온실가스 감축 목표를 세우고 이행 현황을 관리한다. 이사회는 기후 리스크를 검토한다.\n" * 30
+    _checklist, full = server.analyze_document(text, industry="은행")
+    _checklist, compact = server.analyze_document(text, industry="은행", build=server._compact_from_row)
+
+    assert len(compact) == len(full) > 0
+    for c, f in zip(compact, full):
+        assert (c.sentence_index, c.start, c.end, c.ifrs_codes, c.overall_status) == (
+            f.sentence_index, f.start, f.end, f.ifrs_codes, f.overall_status,
+        )
+        assert [server.VALIDATION_ISSUES[i] for i in c.issue_ids] == f.issues
+        assert c.sentence_text is None and text[c.start:c.end] == f.sentence_text
+
+
+def test_gateway_copy_is_identical():
+    # Gateway는 따로 배포되므로 같은 모듈을 복사해 두고, 복사본이 어긋나지 않게 여기서 막음
+    here = os.path.dirname(os.path.abspath(responses.__file__))
+    with open(os.path.join(here, "responses.py"), "rb") as f:
+        server_copy = f.read()
+    with open(os.path.join(here, os.pardir, "gateway", "app", "responses.py"), "rb") as f:
+        gateway_copy = f.read()
+    assert gateway_copy == server_copy, "gateway/app/responses.py와 my_mcp_server/responses.py를 같이 고치세요"
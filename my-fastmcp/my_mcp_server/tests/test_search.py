@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+import server
+
+
+def bm25(tf, length, avgdl, n, df, k1=1.2, b=0.75):
+    idf = math.log1p((n - df + 0.5) / (df + 0.5))
+    return idf * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * length / avgdl))
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = server.DocumentIndex(str(tmp_path / "index"), passage_chars=400)
+    index.add_documents([
+        server.IndexedDocument("a", ["alpha beta beta"]),
+        server.IndexedDocument("b", ["gamma delta"], kind="standard"),
+        server.IndexedDocument("c", ["alpha gamma"]),
+    ])
+    return index
+
+
+def test_bm25_scores_match_the_formula(index):
+    avgdl = 7 / 3
+    [hit] = index.search("beta")
+    assert (hit.doc_id, hit.page, hit.offset) == ("a", 1, 0)
+    assert hit.score == pytest.approx(bm25(2, 3, avgdl, 3, 1), abs=1e-4)
+
+    hits = index.search("alpha gamma", top_k=3)
+    scores = {hit.doc_id: hit.score for hit in hits}
+    assert scores["c"] == pytest.approx(bm25(1, 2, avgdl, 3, 2) * 2, abs=1e-4)
+    assert scores["a"] == pytest.approx(bm25(1, 3, avgdl, 3, 2), abs=1e-4)
+    assert scores["b"] == pytest.approx(bm25(1, 2, avgdl, 3, 2), abs=1e-4)
+    assert [hit.doc_id for hit in hits] == ["c", "b", "a"]
+
+
+def test_kind_and_doc_filters(index):
+    assert [hit.doc_id for hit in index.search("gamma", kind="standard")] == ["b"]
+    assert [hit.doc_id for hit in index.search("alpha", doc_ids=["c"])] == ["c"]
+    assert index.search("zeta") == []
+    assert index.search("") == []
+
+
+def test_reindexing_a_document_does_not_change_scores(tmp_path, index):
+    before = [(h.doc_id, h.score) for h in index.search("alpha gamma", top_k=3)]
+    for _ in range(6):
+        index.add_documents([server.IndexedDocument("a", ["alpha beta beta"])])
+    after = [(h.doc_id, h.score) for h in index.search("alpha gamma", top_k=3)]
+    assert after == before
+    assert all(score > 0 for _doc, score in after)
+    assert index.stats()["live_passages"] == 3
+
+
+def test_duplicate_doc_ids_in_one_batch_keep_the_last_copy(tmp_path):
+    index = server.DocumentIndex(str(tmp_path / "dup"), passage_chars=400)
+    index.add_documents([
+        server.IndexedDocument("a", ["old text"]),
+        server.IndexedDocument("a", ["new text"]),
+    ])
+    assert index.search("old") == []
+    assert [hit.doc_id for hit in index.search("new")] == ["a"]
+    assert index.stats()["live_passages"] == 1
+
+
+def test_index_reloads_from_disk(tmp_path, index):
+    reopened = server.DocumentIndex(index.path, passage_chars=400)
+    assert [(h.doc_id, h.score) for h in reopened.search("beta")] == [(h.doc_id, h.score) for h in index.search("beta")]
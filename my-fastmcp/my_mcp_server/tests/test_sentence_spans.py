@@ -0,0 +1,44 @@
+from analysis_engine import _iter_sentence_spans
+
+
+def sentences(text):
+    return [text[start:end] for start, end in _iter_sentence_spans(text)]
+
+
+def test_spans_are_offsets_into_the_original_text():
+    text = "  첫 문장입니다.  두 번째 문장!\n\n세 번째  "
+    spans = list(_iter_sentence_spans(text))
+    assert [text[s:e] for s, e in spans] == ["첫 문장입니다.", "두 번째 문장!", "세 번째"]
+    assert all(not text[s].isspace() and not text[e - 1].isspace() for s, e in spans)
+
+
+def test_empty_and_whitespace_only():
+    assert sentences("") == []
+    assert sentences(" \n\t \r\n ") == []
+
+
+def test_line_breaks_always_split():
+    assert sentences("제목\r\n본문 첫 줄 둘째 줄") == ["제목", "본문 첫 줄", "둘째 줄"]
+
+
+def test_terminator_needs_following_whitespace():
+    assert sentences("감축했다. 다음 문장") == ["감축했다.", "다음 문장"]
+    assert sentences("version.txt 파일") == ["version.txt 파일"]
+
+
+def test_korean_ending_without_space():
+    assert sentences("목표를 세웠다.다음 해에는 달성했다.") == ["목표를 세웠다.", "다음 해에는 달성했다."]
+
+
+def test_decimal_numbers_do_not_split():
+    assert sentences("1.5℃ 시나리오와 2.0 시나리오를 비교했다.") == ["1.5℃ 시나리오와 2.0 시나리오를 비교했다."]
+
+
+def test_abbreviations_do_not_split():
+    text = "Costs rose in the U.S. market, e.g. logistics. Dr. Kim reviewed it."
+    assert sentences(text) == ["Costs rose in the U.S. market, e.g. logistics.", "Dr. Kim reviewed it."]
+
+
+def test_closing_quotes_and_brackets_stay_with_the_sentence():
+    assert sentences('그는 "목표를 달성했다." 라고 말했다.') == ['그는 "목표를 달성했다."', "라고 말했다."]
+    assert sentences("(기준연도 2019년.) 다음") == ["(기준연도 2019년.)", "다음"]